@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+"""favorites: move user_settings.data.favorites into a dedicated table
+
+Revision ID: 0003_favorites_table
+Revises: 0002_stage8_meal_status_idempotency
+Create Date: 2026-10-19
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_favorites_table"
+down_revision = "0002_stage8_meal_status_idempotency"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# unique-key columns of a legacy JSONB item ``f.item``, as inserted below
+_NAME = "COALESCE(f.item->>'name', '')"
+_UNIT = "COALESCE(NULLIF(f.item->>'unit', ''), 'g')"
+_AMOUNT = "COALESCE(NULLIF(f.item->>'amount', '')::float8, 0)"
+_KCAL = "COALESCE(NULLIF(f.item->>'kcal', '')::float8, 0)"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "favorites",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("unit", sa.String(length=16), server_default=sa.text("'g'"), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("kcal", sa.Float(), nullable=False),
+        sa.Column("protein_g", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.Column("fat_g", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.Column("carb_g", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.Column("use_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.create_index(
+        "uq_favorites_user_item", "favorites", ["user_id", "name", "unit", "amount", "kcal"], unique=True
+    )
+    op.create_index(
+        "ix_favorites_user_rank",
+        "favorites",
+        ["user_id", sa.text("use_count DESC"), sa.text("last_used_at DESC NULLS LAST")],
+    )
+
+    # One-time move of the JSONB blobs. Legacy rows may lack id/unit or carry empty strings.
+    # Ids are only unique per user, so the table id is always derived from (user_id, legacy id
+    # or position): two users sharing a legacy id must not collide on the global primary key.
+    # Duplicates (by the unique key) collapse to the first occurrence.
+    op.execute(
+        f"""
+        INSERT INTO favorites (id, user_id, name, unit, amount, kcal, protein_g, fat_g, carb_g, created_at)
+        SELECT
+            md5(us.user_id::text || ':' || COALESCE(NULLIF(f.item->>'id', ''), '#' || f.ord::text)),
+            us.user_id,
+            {_NAME},
+            {_UNIT},
+            {_AMOUNT},
+            {_KCAL},
+            COALESCE(NULLIF(f.item->>'protein_g', '')::float8, 0),
+            COALESCE(NULLIF(f.item->>'fat_g', '')::float8, 0),
+            COALESCE(NULLIF(f.item->>'carb_g', '')::float8, 0),
+            COALESCE(us.created_at, now())
+        FROM user_settings us
+        CROSS JOIN LATERAL jsonb_array_elements(us.data->'favorites') WITH ORDINALITY AS f(item, ord)
+        WHERE jsonb_typeof(us.data->'favorites') = 'array'
+          AND jsonb_typeof(f.item) = 'object'
+        ORDER BY us.user_id, f.ord
+        ON CONFLICT DO NOTHING
+        """
+    )
+    # Strip the blob only where every item landed (itself or its duplicate by the unique key);
+    # anything skipped by a conflict keeps its user's blob so no favorite is lost.
+    op.execute(
+        f"""
+        UPDATE user_settings us
+        SET data = us.data - 'favorites'
+        WHERE us.data ? 'favorites'
+          AND NOT EXISTS (
+            SELECT 1
+            FROM jsonb_array_elements(
+                CASE WHEN jsonb_typeof(us.data->'favorites') = 'array' THEN us.data->'favorites' ELSE '[]'::jsonb END
+            ) AS f(item)
+            WHERE jsonb_typeof(f.item) = 'object'
+              AND NOT EXISTS (
+                SELECT 1 FROM favorites fv
+                WHERE fv.user_id = us.user_id
+                  AND fv.name = {_NAME}
+                  AND fv.unit = {_UNIT}
+                  AND fv.amount = {_AMOUNT}
+                  AND fv.kcal = {_KCAL}
+              )
+          )
+        """
+    )
+    kept = op.get_bind().execute(
+        sa.text("SELECT count(*) FROM user_settings WHERE data ? 'favorites'")
+    ).scalar_one()
+    if kept:
+        logger.warning("favorites: %d user(s) kept data.favorites, some items did not fit the table", kept)
+
+def downgrade() -> None:
+    op.execute(
+        """
+        INSERT INTO user_settings (user_id, data)
+        SELECT DISTINCT f.user_id, '{}'::jsonb
+        FROM favorites f
+        WHERE NOT EXISTS (SELECT 1 FROM user_settings us WHERE us.user_id = f.user_id)
+        """
+    )
+    op.execute(
+        """
+        UPDATE user_settings us
+        SET data = COALESCE(us.data, '{}'::jsonb) || jsonb_build_object('favorites', agg.items)
+        FROM (
+            SELECT user_id, jsonb_agg(
+                jsonb_build_object(
+                    'id', id, 'name', name, 'unit', unit, 'amount', amount, 'kcal', kcal,
+                    'protein_g', protein_g, 'fat_g', fat_g, 'carb_g', carb_g
+                ) ORDER BY created_at
+            ) AS items
+            FROM favorites
+            GROUP BY user_id
+        ) agg
+        WHERE agg.user_id = us.user_id
+        """
+    )
+    op.drop_index("ix_favorites_user_rank", table_name="favorites")
+    op.drop_index("uq_favorites_user_item", table_name="favorites")
+    op.drop_table("favorites")
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+"""bodyfat: move user_settings.data.bodyfat_by_date into a time-series table
+
+Revision ID: 0004_bodyfat_series
+Revises: 0003_favorites_table
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_bodyfat_series"
+down_revision = "0003_favorites_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bodyfat",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("percent", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.UniqueConstraint("user_id", "date"),
+        sa.CheckConstraint("percent > 0 AND percent < 100", name="ck_bodyfat_percent_range"),
+    )
+    op.create_index("ix_bodyfat_user_id", "bodyfat", ["user_id"])
+    op.create_index("ix_bodyfat_date", "bodyfat", ["date"])
+
+    # One-time move of the per-day maps; malformed keys/values are skipped
+    op.execute(
+        """
+        INSERT INTO bodyfat (user_id, date, percent)
+        SELECT us.user_id, kv.key::date, (kv.value #>> '{}')::float8
+        FROM user_settings us
+        CROSS JOIN LATERAL jsonb_each(us.data->'bodyfat_by_date') AS kv
+        WHERE jsonb_typeof(us.data->'bodyfat_by_date') = 'object'
+          AND kv.key ~ '^\\d{4}-\\d{2}-\\d{2}$'
+          AND jsonb_typeof(kv.value) IN ('number', 'string')
+          AND (kv.value #>> '{}') ~ '^-?\\d+(\\.\\d+)?$'
+          AND (kv.value #>> '{}')::float8 > 0
+          AND (kv.value #>> '{}')::float8 < 100
+        ON CONFLICT (user_id, date) DO NOTHING
+        """
+    )
+    op.execute(
+        "UPDATE user_settings SET data = data - 'bodyfat_by_date' - 'last_bodyfat' "
+        "WHERE data ?| array['bodyfat_by_date', 'last_bodyfat']"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        INSERT INTO user_settings (user_id, data)
+        SELECT DISTINCT b.user_id, '{}'::jsonb
+        FROM bodyfat b
+        WHERE NOT EXISTS (SELECT 1 FROM user_settings us WHERE us.user_id = b.user_id)
+        """
+    )
+    op.execute(
+        """
+        UPDATE user_settings us
+        SET data = COALESCE(us.data, '{}'::jsonb)
+            || jsonb_build_object('bodyfat_by_date', agg.by_date, 'last_bodyfat', agg.last)
+        FROM (
+            SELECT
+                user_id,
+                jsonb_object_agg(date::text, percent) AS by_date,
+                (array_agg(jsonb_build_object('date', date::text, 'percent', percent) ORDER BY date DESC))[1] AS last
+            FROM bodyfat
+            GROUP BY user_id
+        ) agg
+        WHERE agg.user_id = us.user_id
+        """
+    )
+    op.drop_index("ix_bodyfat_date", table_name="bodyfat")
+    op.drop_index("ix_bodyfat_user_id", table_name="bodyfat")
+    op.drop_table("bodyfat")
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+"""meals/meal_items: monthly range partitions on `at`, BRIN time indexes
+
+Revision ID: 0005_meals_partitioned
+Revises: 0004_bodyfat_series
+Create Date: 2026-10-19
+
+Unique constraints on a partitioned table must contain the partition key, so:
+- primary keys become (id, at); meal_items carries the meal's `at` and references meals (id, at)
+  with ON UPDATE CASCADE, so moving a meal in time moves its items to the matching partition;
+- bot idempotency keys (source_chat_id/message_id/update_id) move to the unpartitioned
+  `meal_sources` table that keeps the old unique constraints;
+- images.meal_id / llm_inferences.meal_id lose their FKs; an AFTER DELETE trigger keeps the
+  old ON DELETE SET NULL behaviour.
+
+Requires PostgreSQL 15+: earlier versions run a cross-partition UPDATE of a referenced row
+as DELETE + INSERT, which would fire ON DELETE CASCADE on the meal's items.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_meals_partitioned"
+down_revision = "0004_bodyfat_series"
+branch_labels = None
+depends_on = None
+
+
+# Partitions are created ahead of time by the app (infra/db/partitions.py); this is the initial window
+_AHEAD = "3 months"
+
+_ENSURE_PARTITIONS_FN = """
+CREATE OR REPLACE FUNCTION ensure_meal_partitions(p_from timestamptz, p_to timestamptz)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- month arithmetic on UTC wall-clock time, independent of the session TimeZone
+    m timestamp := date_trunc('month', p_from AT TIME ZONE 'UTC');
+    last_m timestamp := date_trunc('month', p_to AT TIME ZONE 'UTC');
+    suffix text;
+    created integer := 0;
+BEGIN
+    -- concurrent callers would race on CREATE TABLE
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_meal_partitions'));
+    WHILE m <= last_m LOOP
+        suffix := to_char(m, 'YYYYMM');
+        IF to_regclass('meals_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF meals FOR VALUES FROM (%L) TO (%L)',
+                'meals_p' || suffix, m AT TIME ZONE 'UTC', (m + interval '1 month') AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        IF to_regclass('meal_items_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF meal_items FOR VALUES FROM (%L) TO (%L)',
+                'meal_items_p' || suffix, m AT TIME ZONE 'UTC', (m + interval '1 month') AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        m := m + interval '1 month';
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+_CLEAR_REFS_FN = """
+CREATE OR REPLACE FUNCTION meals_clear_refs() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- a cross-partition UPDATE also fires AFTER DELETE; the meal still exists then
+    IF NOT EXISTS (SELECT 1 FROM meals WHERE id = OLD.id) THEN
+        UPDATE images SET meal_id = NULL WHERE meal_id = OLD.id;
+        UPDATE llm_inferences SET meal_id = NULL WHERE meal_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+_DROP_MEAL_FKS = """
+DO $$
+DECLARE r record;
+BEGIN
+    FOR r IN
+        SELECT c.conrelid::regclass AS tbl, c.conname
+        FROM pg_constraint c
+        WHERE c.contype = 'f' AND c.confrelid = 'meals'::regclass
+          AND c.conrelid IN ('images'::regclass, 'llm_inferences'::regclass)
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.tbl, r.conname);
+    END LOOP;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if int(conn.execute(sa.text("SHOW server_version_num")).scalar()) < 150000:
+        raise RuntimeError("0005_meals_partitioned requires PostgreSQL 15 or newer")
+
+    op.execute("LOCK TABLE meals, meal_items IN ACCESS EXCLUSIVE MODE")
+
+    # 1. idempotency keys -> unpartitioned side table (FK added once meals is rebuilt)
+    op.create_table(
+        "meal_sources",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("meal_id", sa.BigInteger(), nullable=False),
+        sa.Column("meal_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("source_chat_id", sa.BigInteger(), nullable=True),
+        sa.Column("source_message_id", sa.BigInteger(), nullable=True),
+        sa.Column("source_update_id", sa.BigInteger(), nullable=True),
+    )
+    op.execute(
+        """
+        INSERT INTO meal_sources (user_id, meal_id, meal_at, source_chat_id, source_message_id, source_update_id)
+        SELECT user_id, id, at, source_chat_id, source_message_id, source_update_id
+        FROM meals
+        WHERE source_update_id IS NOT NULL OR (source_chat_id IS NOT NULL AND source_message_id IS NOT NULL)
+        """
+    )
+
+    # 2. rebuild meals/meal_items as partitioned tables, keeping ids and their sequences
+    op.execute(_DROP_MEAL_FKS)
+    op.execute("ALTER SEQUENCE meals_id_seq OWNED BY NONE")
+    op.execute("ALTER SEQUENCE meal_items_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE meal_items RENAME TO meal_items_unpartitioned")
+    op.execute("ALTER TABLE meals RENAME TO meals_unpartitioned")
+    op.execute(
+        """
+        CREATE TABLE meals (
+            id bigint NOT NULL DEFAULT nextval('meals_id_seq'),
+            user_id bigint NOT NULL,
+            at timestamptz NOT NULL,
+            type meal_type NOT NULL,
+            status meal_status NOT NULL DEFAULT 'draft',
+            notes text,
+            deleted_at timestamptz
+        ) PARTITION BY RANGE (at)
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE meal_items (
+            id bigint NOT NULL DEFAULT nextval('meal_items_id_seq'),
+            meal_id bigint NOT NULL,
+            at timestamptz NOT NULL,
+            name text NOT NULL,
+            amount double precision NOT NULL,
+            unit varchar(16) NOT NULL,
+            kcal double precision NOT NULL,
+            protein_g double precision NOT NULL,
+            fat_g double precision NOT NULL,
+            carb_g double precision NOT NULL,
+            source varchar(16),
+            created_at timestamptz DEFAULT now(),
+            deleted_at timestamptz,
+            CONSTRAINT ck_meal_items_amount_positive CHECK (amount > 0),
+            CONSTRAINT ck_meal_items_macros_nonneg CHECK (kcal >= 0 AND protein_g >= 0 AND fat_g >= 0 AND carb_g >= 0)
+        ) PARTITION BY RANGE (at)
+        """
+    )
+    op.execute(_ENSURE_PARTITIONS_FN)
+    op.execute(
+        f"SELECT ensure_meal_partitions(COALESCE(min(at), now()), now() + interval '{_AHEAD}') FROM meals_unpartitioned"
+    )
+    op.execute(
+        """
+        INSERT INTO meals (id, user_id, at, type, status, notes, deleted_at)
+        SELECT id, user_id, at, type, status, notes, deleted_at FROM meals_unpartitioned
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO meal_items (id, meal_id, at, name, amount, unit, kcal, protein_g, fat_g, carb_g, source, created_at, deleted_at)
+        SELECT i.id, i.meal_id, m.at, i.name, i.amount, i.unit, i.kcal, i.protein_g, i.fat_g, i.carb_g, i.source, i.created_at, i.deleted_at
+        FROM meal_items_unpartitioned i
+        JOIN meals_unpartitioned m ON m.id = i.meal_id
+        """
+    )
+    op.execute("DROP TABLE meal_items_unpartitioned")
+    op.execute("DROP TABLE meals_unpartitioned")
+    op.execute("ALTER SEQUENCE meals_id_seq OWNED BY meals.id")
+    op.execute("ALTER SEQUENCE meal_items_id_seq OWNED BY meal_items.id")
+
+    # 3. keys and indexes (defined on the parents, inherited by every partition)
+    op.execute("ALTER TABLE meals ADD CONSTRAINT pk_meals PRIMARY KEY (id, at)")
+    op.execute(
+        "ALTER TABLE meals ADD CONSTRAINT fk_meals_user_id_users "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+    op.execute("CREATE INDEX ix_meals_user_at ON meals (user_id, at)")
+    op.execute("CREATE INDEX ix_meals_at_brin ON meals USING brin (at)")
+    op.execute("ALTER TABLE meal_items ADD CONSTRAINT pk_meal_items PRIMARY KEY (id, at)")
+    op.execute(
+        "ALTER TABLE meal_items ADD CONSTRAINT fk_meal_items_meal_id_meals "
+        "FOREIGN KEY (meal_id, at) REFERENCES meals (id, at) ON DELETE CASCADE ON UPDATE CASCADE"
+    )
+    op.execute("CREATE INDEX ix_meal_items_meal_id ON meal_items (meal_id)")
+    op.execute("CREATE INDEX ix_meal_items_at_brin ON meal_items USING brin (at)")
+
+    op.execute(
+        "ALTER TABLE meal_sources ADD CONSTRAINT fk_meal_sources_meal_id_meals "
+        "FOREIGN KEY (meal_id, meal_at) REFERENCES meals (id, at) ON DELETE CASCADE ON UPDATE CASCADE"
+    )
+    op.execute(
+        "ALTER TABLE meal_sources ADD CONSTRAINT uq_meal_sources_user_update "
+        "UNIQUE (user_id, source_update_id) DEFERRABLE INITIALLY IMMEDIATE"
+    )
+    op.execute(
+        "ALTER TABLE meal_sources ADD CONSTRAINT uq_meal_sources_user_chat_msg "
+        "UNIQUE (user_id, source_chat_id, source_message_id) DEFERRABLE INITIALLY IMMEDIATE"
+    )
+    op.create_index("ix_meal_sources_meal_id", "meal_sources", ["meal_id"])
+
+    # 4. ON DELETE SET NULL for images/llm_inferences without FKs
+    op.create_index("ix_images_meal_id", "images", ["meal_id"], postgresql_where=sa.text("meal_id IS NOT NULL"))
+    op.create_index(
+        "ix_llm_inferences_meal_id", "llm_inferences", ["meal_id"], postgresql_where=sa.text("meal_id IS NOT NULL")
+    )
+    op.execute(_CLEAR_REFS_FN)
+    op.execute(
+        "CREATE TRIGGER trg_meals_clear_refs AFTER DELETE ON meals "
+        "FOR EACH ROW EXECUTE FUNCTION meals_clear_refs()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE meals, meal_items IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER IF EXISTS trg_meals_clear_refs ON meals")
+    op.execute("DROP FUNCTION IF EXISTS meals_clear_refs()")
+    op.drop_index("ix_llm_inferences_meal_id", table_name="llm_inferences")
+    op.drop_index("ix_images_meal_id", table_name="images")
+
+    op.execute("ALTER SEQUENCE meals_id_seq OWNED BY NONE")
+    op.execute("ALTER SEQUENCE meal_items_id_seq OWNED BY NONE")
+    op.execute(
+        """
+        CREATE TABLE meals_unpartitioned (
+            id bigint NOT NULL DEFAULT nextval('meals_id_seq'),
+            user_id bigint NOT NULL,
+            at timestamptz NOT NULL,
+            type meal_type NOT NULL,
+            status meal_status NOT NULL DEFAULT 'draft',
+            notes text,
+            deleted_at timestamptz,
+            source_chat_id bigint,
+            source_message_id bigint,
+            source_update_id bigint
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE meal_items_unpartitioned (
+            id bigint NOT NULL DEFAULT nextval('meal_items_id_seq'),
+            meal_id bigint NOT NULL,
+            name text NOT NULL,
+            amount double precision NOT NULL,
+            unit varchar(16) NOT NULL,
+            kcal double precision NOT NULL,
+            protein_g double precision NOT NULL,
+            fat_g double precision NOT NULL,
+            carb_g double precision NOT NULL,
+            source varchar(16),
+            created_at timestamptz DEFAULT now(),
+            deleted_at timestamptz,
+            CONSTRAINT ck_meal_items_amount_positive CHECK (amount > 0),
+            CONSTRAINT ck_meal_items_macros_nonneg CHECK (kcal >= 0 AND protein_g >= 0 AND fat_g >= 0 AND carb_g >= 0)
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO meals_unpartitioned (id, user_id, at, type, status, notes, deleted_at, source_chat_id, source_message_id, source_update_id)
+        SELECT m.id, m.user_id, m.at, m.type, m.status, m.notes, m.deleted_at, s.source_chat_id, s.source_message_id, s.source_update_id
+        FROM meals m
+        LEFT JOIN meal_sources s ON s.meal_id = m.id AND s.meal_at = m.at
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO meal_items_unpartitioned (id, meal_id, name, amount, unit, kcal, protein_g, fat_g, carb_g, source, created_at, deleted_at)
+        SELECT id, meal_id, name, amount, unit, kcal, protein_g, fat_g, carb_g, source, created_at, deleted_at
+        FROM meal_items
+        """
+    )
+    op.drop_table("meal_sources")
+    op.execute("DROP TABLE meal_items")  # drops its partitions
+    op.execute("DROP TABLE meals")
+    op.execute("DROP FUNCTION IF EXISTS ensure_meal_partitions(timestamptz, timestamptz)")
+    op.execute("ALTER TABLE meals_unpartitioned RENAME TO meals")
+    op.execute("ALTER TABLE meal_items_unpartitioned RENAME TO meal_items")
+    op.execute("ALTER SEQUENCE meals_id_seq OWNED BY meals.id")
+    op.execute("ALTER SEQUENCE meal_items_id_seq OWNED BY meal_items.id")
+
+    op.execute("ALTER TABLE meals ADD CONSTRAINT pk_meals PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE meals ADD CONSTRAINT fk_meals_user_id_users "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+    op.execute("CREATE INDEX ix_meals_user_at ON meals (user_id, at)")
+    op.execute(
+        "ALTER TABLE meals ADD CONSTRAINT uq_meals_user_update "
+        "UNIQUE (user_id, source_update_id) DEFERRABLE INITIALLY IMMEDIATE"
+    )
+    op.execute(
+        "ALTER TABLE meals ADD CONSTRAINT uq_meals_user_chat_msg "
+        "UNIQUE (user_id, source_chat_id, source_message_id) DEFERRABLE INITIALLY IMMEDIATE"
+    )
+    op.execute("ALTER TABLE meal_items ADD CONSTRAINT pk_meal_items PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE meal_items ADD CONSTRAINT fk_meal_items_meal_id_meals "
+        "FOREIGN KEY (meal_id) REFERENCES meals (id) ON DELETE CASCADE"
+    )
+    op.execute("CREATE INDEX ix_meal_items_meal_id ON meal_items (meal_id)")
+    op.execute(
+        "ALTER TABLE images ADD CONSTRAINT fk_images_meal_id_meals "
+        "FOREIGN KEY (meal_id) REFERENCES meals (id) ON DELETE SET NULL"
+    )
+    op.execute(
+        "ALTER TABLE llm_inferences ADD CONSTRAINT fk_llm_inferences_meal_id_meals "
+        "FOREIGN KEY (meal_id) REFERENCES meals (id) ON DELETE SET NULL"
+    )
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+"""diary_days: etag/updated_at for materialized day snapshots
+
+Revision ID: 0006_diary_day_snapshots
+Revises: 0005_meals_partitioned
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_diary_day_snapshots"
+down_revision = "0005_meals_partitioned"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("diary_days", sa.Column("etag", sa.String(length=40), nullable=True))
+    op.add_column(
+        "diary_days",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("diary_days", "updated_at")
+    op.drop_column("diary_days", "etag")
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+"""vision/llm inferences: hot columns, compaction markers, archive keys
+
+Revision ID: 0007_inference_retention
+Revises: 0006_diary_day_snapshots
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_inference_retention"
+down_revision = "0006_diary_day_snapshots"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("vision_inferences", sa.Column("items", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column("vision_inferences", sa.Column("quality", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column("vision_inferences", sa.Column("needs_clarification", sa.Boolean(), nullable=True))
+    op.add_column("vision_inferences", sa.Column("compacted_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("vision_inferences", sa.Column("archive_key", sa.String(length=255), nullable=True))
+    op.alter_column("vision_inferences", "response", existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    op.execute(
+        "UPDATE vision_inferences SET items = response->'items', quality = response->'quality',"
+        " needs_clarification = coalesce((response->'quality'->>'needs_clarification')::boolean, false)"
+        " WHERE response IS NOT NULL"
+    )
+    # the compaction job range-scans old, not yet compacted rows; the index shrinks as it catches up
+    op.create_index(
+        "ix_vision_inferences_pending_compaction",
+        "vision_inferences",
+        ["created_at"],
+        postgresql_where=sa.text("compacted_at IS NULL"),
+    )
+
+    op.add_column("llm_inferences", sa.Column("compacted_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("llm_inferences", sa.Column("archive_key", sa.String(length=255), nullable=True))
+    op.alter_column("llm_inferences", "response", existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    op.create_index(
+        "ix_llm_inferences_pending_compaction",
+        "llm_inferences",
+        ["created_at"],
+        postgresql_where=sa.text("compacted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    # compacted rows lost their payload; keep NOT NULL satisfiable with the hot columns
+    op.drop_index("ix_llm_inferences_pending_compaction", table_name="llm_inferences")
+    op.execute("UPDATE llm_inferences SET response = '{}'::jsonb WHERE response IS NULL")
+    op.alter_column("llm_inferences", "response", existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=False)
+    op.drop_column("llm_inferences", "archive_key")
+    op.drop_column("llm_inferences", "compacted_at")
+
+    op.drop_index("ix_vision_inferences_pending_compaction", table_name="vision_inferences")
+    op.execute(
+        "UPDATE vision_inferences SET response = jsonb_build_object('items', coalesce(items, '[]'::jsonb),"
+        " 'quality', coalesce(quality, '{}'::jsonb), 'confidence', confidence) WHERE response IS NULL"
+    )
+    op.alter_column("vision_inferences", "response", existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=False)
+    op.drop_column("vision_inferences", "archive_key")
+    op.drop_column("vision_inferences", "compacted_at")
+    op.drop_column("vision_inferences", "needs_clarification")
+    op.drop_column("vision_inferences", "quality")
+    op.drop_column("vision_inferences", "items")
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+"""llm_inferences as a provider-call ledger: latency, cost, ok
+
+Revision ID: 0008_llm_inference_ledger
+Revises: 0007_inference_retention
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_llm_inference_ledger"
+down_revision = "0007_inference_retention"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("llm_inferences", sa.Column("latency_ms", sa.Integer(), nullable=True))
+    op.add_column("llm_inferences", sa.Column("cost_usd", sa.Float(), nullable=True))
+    op.add_column("llm_inferences", sa.Column("ok", sa.Boolean(), server_default=sa.text("true"), nullable=False))
+    op.create_index("ix_llm_inferences_purpose_created", "llm_inferences", ["purpose", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_inferences_purpose_created", table_name="llm_inferences")
+    op.drop_column("llm_inferences", "ok")
+    op.drop_column("llm_inferences", "cost_usd")
+    op.drop_column("llm_inferences", "latency_ms")
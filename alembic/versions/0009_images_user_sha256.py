@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+"""images: dedupe per (user_id, sha256), plain sha256 lookup index
+
+Revision ID: 0009_images_user_sha256
+Revises: 0008_llm_inference_ledger
+Create Date: 2026-10-19
+
+- The global UNIQUE (sha256) from 0001 linked one user's upload to another user's row.
+  It is replaced by a unique index on (user_id, sha256), the conflict target of
+  ImageRepo.create_or_get's INSERT ... ON CONFLICT DO NOTHING.
+- ix_images_sha256 (non-unique) finds identical images of other users, so their
+  inference results can be reused.
+- Databases built from the models (no 0001 constraint) may hold per-user duplicates.
+  Those are folded into the oldest row first, with their inferences moved onto it.
+  A meal link survives too: a kept row without a meal_id takes the newest duplicate's.
+- Downgrade restores UNIQUE (sha256) and fails if identical images of different users
+  exist by then.
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_images_user_sha256"
+down_revision = "0008_llm_inference_ledger"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE images DROP CONSTRAINT IF EXISTS images_sha256_key")
+    op.execute(
+        """
+        CREATE TEMP TABLE images_dupes AS
+        SELECT id, min(id) OVER (PARTITION BY user_id, sha256) AS keep_id
+        FROM images WHERE user_id IS NOT NULL
+        """
+    )
+    op.execute(
+        "UPDATE vision_inferences v SET image_id = d.keep_id FROM images_dupes d "
+        "WHERE v.image_id = d.id AND d.id <> d.keep_id"
+    )
+    op.execute(
+        """
+        UPDATE images k SET meal_id = coalesce(k.meal_id, dup.meal_id)
+        FROM (
+            SELECT DISTINCT ON (d.keep_id) d.keep_id, i.meal_id
+            FROM images_dupes d JOIN images i ON i.id = d.id
+            WHERE d.id <> d.keep_id AND i.meal_id IS NOT NULL
+            ORDER BY d.keep_id, i.id DESC
+        ) dup
+        WHERE k.id = dup.keep_id AND k.meal_id IS NULL
+        """
+    )
+    op.execute("DELETE FROM images i USING images_dupes d WHERE i.id = d.id AND d.id <> d.keep_id")
+    op.execute("DROP TABLE images_dupes")
+    op.create_index("ix_images_user_sha256", "images", ["user_id", "sha256"], unique=True)
+    op.create_index("ix_images_sha256", "images", ["sha256"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_images_sha256", table_name="images")
+    op.drop_index("ix_images_user_sha256", table_name="images")
+    op.create_unique_constraint("images_sha256_key", "images", ["sha256"])
@@ -8,6 +8,7 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand, MenuButtonWebApp, WebAppInfo
 
 from core.config import settings
+from infra import ledger
 from bot.routers import make_root_router
 from bot.middlewares.logging import LoggingMiddleware
 from bot.middlewares.trace import TraceMiddleware
@@ -55,7 +56,11 @@ async def main() -> None:
 
     # Поллинг без вебхуков для простого запуска на VPS
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    ledger.start()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await ledger.stop()
 
 
 if __name__ == "__main__":
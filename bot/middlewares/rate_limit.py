@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+
+from infra.cache.rate_limit import RULES, limiter
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """Inner message middleware: handlers flagged ``rate_limit="<rule>"`` are checked per Telegram user
+    before they run (and before any download, STT or LLM call)."""
+
+    async def __call__(self, handler, event: Message, data):  # type: ignore[override]
+        name = get_flag(data, "rate_limit")
+        user = getattr(event, "from_user", None)
+        if not name or user is None:
+            return await handler(event, data)
+        decision = await limiter.hit(RULES[name], f"tg:{user.id}")
+        if decision.allowed:
+            return await handler(event, data)
+        await event.answer(f"Слишком много запросов. Попробуйте через {max(1, decision.retry_after_sec)} с.")
+        return None
@@ -9,7 +9,7 @@ from core.config import settings
 from pathlib import Path
 
 from domain.use_cases import CalculateBudgetsInput, calculate_budgets
-from infra.cache.redis import redis_client
+from infra.cache.redis import pipeline as redis_pipeline, redis_client
 from infra.db.session import get_session
 from infra.db.repositories.image_repo import ImageRepo
 from infra.db.repositories.vision_inference_repo import VisionInferenceRepo
@@ -121,8 +121,10 @@ async def on_photo(message: Message) -> None:
         gid = message.media_group_id
         uid = message.from_user.id
         if last_image_id:
-            await redis_client.rpush(f"mediagroup:{uid}:{gid}", last_image_id)
-            await redis_client.expire(f"mediagroup:{uid}:{gid}", 120)
+            async with redis_pipeline() as pipe:
+                pipe.rpush(f"mediagroup:{uid}:{gid}", last_image_id)
+                pipe.expire(f"mediagroup:{uid}:{gid}", 120)
+                await pipe.execute()
         # один шедулер на группу
         if await redis_client.set(f"mediagroup:{uid}:{gid}:lock", "1", ex=5, nx=True):
             async def _finalize():
@@ -167,6 +169,8 @@ async def on_photo(message: Message) -> None:
                         f = int(float(it.get("fat_g", 0) or 0))
                         c = int(float(it.get("carb_g", 0) or 0))
                         lines.append(f"• {name} — {amt}{unit} ≈ {kcal} ккал\n  Протеин: {p} г. | Жиры: {f} г. | Углеводы: {c} г.")
+                        for w in it.get("warnings") or []:
+                            lines.append(f"  ⚠️ {w}")
                     preview = "\n".join(lines)
                     if clar:
                         preview += "\n\nУточните:\n" + "\n".join(f"— {c}" for c in clar[:5])
@@ -198,6 +202,8 @@ async def on_photo(message: Message) -> None:
                                             f = int(float(it.get("fat_g", 0) or 0))
                                             c = int(float(it.get("carb_g", 0) or 0))
                                             lines.append(f"• {name} — {amt}{unit} ≈ {kcal} ккал\n  Протеин: {p} г. | Жиры: {f} г. | Углеводы: {c} г.")
+                                            for w in it.get("warnings") or []:
+                                                lines.append(f"  ⚠️ {w}")
                                         text = "\n".join(lines)
                                         clar2 = (sdata or {}).get("clarifications") or []
                                         if clar2:
@@ -245,8 +251,7 @@ async def cmd_check_photo(message: Message) -> None:
         if not inf:
             await message.answer("Результат распознавания пока не готов")
             return
-        resp = inf["response"]
-        items = resp.get("items", [])
+        items = inf["items"]
         if not items:
             await message.answer("Не удалось распознать блюда. Введите вручную /addmeal")
             return
@@ -271,8 +276,7 @@ async def cmd_save_photo(message: Message) -> None:
         if not inf:
             await message.answer("Результат распознавания не найден")
             return
-        resp = inf["response"]
-        items = resp.get("items", [])
+        items = inf["items"]
         meal_id = await mrepo.create_meal(
             user_id=message.from_user.id,
             at=DT.utcnow(),
@@ -4,8 +4,11 @@ from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import Message
 
+from bot.middlewares.rate_limit import RateLimitMiddleware
+
 
 coach_router = Router()
+coach_router.message.middleware(RateLimitMiddleware())
 
 
 @coach_router.message(Command("coach"))
@@ -17,12 +20,15 @@ from infra.db.session import get_session
 from infra.db.repositories.profile_repo import ProfileRepo
 from infra.db.repositories.goal_repo import GoalRepo
 from infra.db.repositories.daily_summary_repo import DailySummaryRepo
+from infra.db.repositories.user_repo import UserRepo
 from services.llm.openai_coach import chat_coach
 
 
-@coach_router.message(F.text & ~F.text.startswith("/"))
+@coach_router.message(F.text & ~F.text.startswith("/"), flags={"rate_limit": "coach"})
 async def on_coach_text(message: Message) -> None:
     async with get_session() as session:  # type: ignore
+        # users.id for the inference ledger's per-user rollups
+        user_id = await UserRepo(session).get_or_create_by_telegram_id(message.from_user.id)
         prof = await ProfileRepo(session).get_by_user_id(message.from_user.id)
         from datetime import date, timedelta
         today = date.today()
@@ -41,7 +47,7 @@ async def on_coach_text(message: Message) -> None:
                     goal = g
                     break
             goal = goal or goals[0]
-    context = {"profile": prof or {}, "goal": goal or {}, "last_summaries": last}
+    context = {"user_id": user_id, "profile": prof or {}, "goal": goal or {}, "last_summaries": last}
     reply = chat_coach(context, message.text or "")
     await message.answer(reply or "Готов помочь. Сформулируйте вопрос подробнее.")
 
@@ -7,13 +7,17 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 import httpx
 from core.config import settings
+from bot.middlewares.rate_limit import RateLimitMiddleware
 from infra.cache.redis import redis_client
+from infra.db.repositories.user_repo import UserRepo
+from infra.db.session import SessionLocal
 from services.stt.openai_whisper import transcribe_audio_bytes
 import json
 import math
 
 
 meal_router = Router()
+meal_router.message.middleware(RateLimitMiddleware())
 
 
 class AddMealStates(StatesGroup):
@@ -55,6 +59,9 @@ async def on_meal_text(message: Message, state: FSMContext) -> None:
                 await state.set_data({"items": items, "text": text})
                 await state.set_state(AddMealStates.preview)
                 await message.answer(f"Предварительная нормализация:\n{preview}", reply_markup=kb)
+        elif r.status_code == 429:
+            retry = r.headers.get("Retry-After") or "60"
+            await message.answer(f"Слишком много запросов. Попробуйте через {retry} с.")
         else:
             await message.answer("Сервис нормализации временно недоступен")
 @meal_router.message(F.text)
@@ -66,7 +73,7 @@ async def on_free_text(message: Message, state: FSMContext) -> None:
     await state.set_state(AddMealStates.waiting_text)
     await on_meal_text(message, state)
 
-@meal_router.message(F.voice)
+@meal_router.message(F.voice, flags={"rate_limit": "stt"})
 async def on_voice(message: Message, state: FSMContext) -> None:
     # Download voice file
     try:
@@ -81,7 +88,10 @@ async def on_voice(message: Message, state: FSMContext) -> None:
         async with httpx.AsyncClient(timeout=20.0) as client:
             resp = await client.get(url)
             audio_bytes = resp.content
-        text = transcribe_audio_bytes(audio_bytes, filename="voice.ogg", language="ru")
+        async with SessionLocal() as session:
+            # users.id for the inference ledger's per-user rollups
+            user_id = await UserRepo(session).get_or_create_by_telegram_id(message.from_user.id)
+        text = transcribe_audio_bytes(audio_bytes, filename="voice.ogg", language="ru", user_id=user_id)
         if not text:
             await message.answer("Не удалось распознать речь. Попробуйте ещё раз.")
             return
@@ -184,6 +194,9 @@ def _build_preview(items: list[dict]) -> str:
             f"• {name} — {amt}{unit} ≈ {kcal} ккал\n"
             f"  Протеин: {p} г. | Жиры: {f} г. | Углеводы: {c} г."
         )
+        # предупреждения считает API (/api/normalize) по настройкам пользователя
+        for w in it.get("warnings") or []:
+            lines.append(f"  ⚠️ {w}")
     return "\n".join(lines)
 
 
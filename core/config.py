@@ -14,6 +14,8 @@ class Settings(BaseSettings):
     openai_api_key: str | None = Field(None, alias="OPENAI_API_KEY")
     openai_tts_voice: str = Field("alloy", alias="OPENAI_TTS_VOICE")
     openai_model_normalize: str = Field("gpt-4o-mini", alias="OPENAI_MODEL_NORMALIZE")
+    # used by the cost governor once spend crosses a soft threshold; empty = skip straight to local tiers
+    openai_model_normalize_cheap: str | None = Field("gpt-4.1-nano", alias="OPENAI_MODEL_NORMALIZE_CHEAP")
     openai_cost_input_per_1k: float = Field(0.0005, alias="OPENAI_COST_INPUT_PER_1K")
     openai_cost_output_per_1k: float = Field(0.0015, alias="OPENAI_COST_OUTPUT_PER_1K")
     moderation_enabled: bool = Field(True, alias="MODERATION_ENABLED")
@@ -22,22 +24,96 @@ class Settings(BaseSettings):
     # Cost approximations for metrics (USD)
     openai_cost_vision_per_image: float = Field(0.003, alias="OPENAI_COST_VISION_PER_IMAGE")
     openai_cost_normalize_per_req: float = Field(0.0008, alias="OPENAI_COST_NORMALIZE_PER_REQ")
+    openai_cost_stt_per_req: float = Field(0.003, alias="OPENAI_COST_STT_PER_REQ")
+    openai_cost_tts_per_1k_chars: float = Field(0.015, alias="OPENAI_COST_TTS_PER_1K_CHARS")
+    # Inference ledger: provider calls are queued in memory and flushed by a background task
+    ledger_flush_interval_sec: float = Field(2.0, alias="LEDGER_FLUSH_INTERVAL_SEC")
+    ledger_batch_size: int = Field(500, alias="LEDGER_BATCH_SIZE")
+    ledger_buffer_size: int = Field(20000, alias="LEDGER_BUFFER_SIZE")
+    # Cost governor: daily (UTC) spend from the ledger rollups. Soft = cheaper tiers, hard = no provider calls.
+    cost_user_daily_soft_usd: float = Field(0.05, alias="COST_USER_DAILY_SOFT_USD")
+    cost_user_daily_hard_usd: float = Field(0.25, alias="COST_USER_DAILY_HARD_USD")
+    cost_global_daily_soft_usd: float = Field(20.0, alias="COST_GLOBAL_DAILY_SOFT_USD")
+    cost_global_daily_hard_usd: float = Field(50.0, alias="COST_GLOBAL_DAILY_HARD_USD")
+    vision_reduced_max_px: int = Field(768, alias="VISION_REDUCED_MAX_PX")
+    # Vision worker: tasks dequeued and processed together (one session, one INSERT, one status pipeline)
+    vision_worker_batch: int = Field(8, alias="VISION_WORKER_BATCH")
+    # Finished task records (status + compact result) kept in Redis for status polls
+    vision_result_ttl_sec: int = Field(24 * 3600, alias="VISION_RESULT_TTL_SEC")
 
     # Storage / DB / Cache
     database_url: str = Field(..., alias="DATABASE_URL")
+    # Read-only replica for heavy analytics reads (summary/trends/alerts/export); primary if unset
+    database_read_url: str | None = Field(None, alias="DATABASE_READ_URL")
+    db_pool_size: int = Field(5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(1800, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    # asyncpg prepared statement cache per connection (0 disables)
+    db_statement_cache_size: int = Field(100, alias="DB_STATEMENT_CACHE_SIZE")
+    # PgBouncer transaction/statement pooling: no named prepared statements survive across transactions
+    db_pgbouncer: bool = Field(False, alias="DB_PGBOUNCER")
+    # After a user's own write, serve their reads from the primary for this many seconds (replica lag budget)
+    db_read_your_writes_sec: int = Field(10, alias="DB_READ_YOUR_WRITES_SEC")
+    # meals/meal_items are partitioned by month; keep this many future months created
+    meal_partitions_ahead_months: int = Field(3, alias="MEAL_PARTITIONS_AHEAD_MONTHS")
+    # vision/llm inferences keep full payloads this long, then get compacted to hot columns
+    # with the raw rows gzipped to object storage; a run does at most batch x max_batches rows
+    inference_retention_days: int = Field(30, alias="INFERENCE_RETENTION_DAYS")
+    inference_compact_batch: int = Field(200, alias="INFERENCE_COMPACT_BATCH")
+    inference_compact_pause_ms: int = Field(200, alias="INFERENCE_COMPACT_PAUSE_MS")
+    inference_compact_max_batches: int = Field(100, alias="INFERENCE_COMPACT_MAX_BATCHES")
     redis_url: str = Field("redis://localhost:6379/0", alias="REDIS_URL")
-    celery_broker_url: str | None = Field(None, alias="CELERY_BROKER_URL")
-    celery_result_backend: str | None = Field(None, alias="CELERY_RESULT_BACKEND")
+    # Connection pool per process; at the cap callers wait up to the pool timeout for a free one
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout_sec: float = Field(2.0, alias="REDIS_POOL_TIMEOUT_SEC")
+    redis_socket_timeout_sec: float = Field(2.0, alias="REDIS_SOCKET_TIMEOUT_SEC")
+    redis_connect_timeout_sec: float = Field(1.0, alias="REDIS_CONNECT_TIMEOUT_SEC")
+    redis_health_check_interval_sec: int = Field(30, alias="REDIS_HEALTH_CHECK_INTERVAL_SEC")
+    redis_retries: int = Field(2, alias="REDIS_RETRIES")
+    # Read-through cache for user settings/profiles: Redis TTL + per-process LRU.
+    # The LRU TTL bounds staleness after a write made by another process.
+    entity_cache_ttl_sec: int = Field(600, alias="ENTITY_CACHE_TTL_SEC")
+    entity_cache_local_ttl_sec: float = Field(5.0, alias="ENTITY_CACHE_LOCAL_TTL_SEC")
+    entity_cache_lru_size: int = Field(4096, alias="ENTITY_CACHE_LRU_SIZE")
+    # Scheduled jobs runner (python -m infra.jobs): Redis queue, one lock per job
+    jobs_timezone: str = Field("Europe/Madrid", alias="JOBS_TIMEZONE")
+    jobs_concurrency: int = Field(4, alias="JOBS_CONCURRENCY")
+    jobs_max_retries: int = Field(3, alias="JOBS_MAX_RETRIES")
+    jobs_retry_backoff_sec: float = Field(30.0, alias="JOBS_RETRY_BACKOFF_SEC")
+    jobs_disabled: str = Field("", alias="JOBS_DISABLED")  # comma separated job names
+    jobs_reconcile_days: int = Field(3, alias="JOBS_RECONCILE_DAYS")
 
     s3_endpoint_url: str | None = Field(None, alias="S3_ENDPOINT_URL")
     s3_bucket: str | None = Field(None, alias="S3_BUCKET")
     s3_access_key_id: str | None = Field(None, alias="S3_ACCESS_KEY_ID")
     s3_secret_access_key: str | None = Field(None, alias="S3_SECRET_ACCESS_KEY")
+    s3_region: str = Field("us-east-1", alias="S3_REGION")
+    # One client per process; its pool is shared by the storage worker threads
+    s3_max_connections: int = Field(20, alias="S3_MAX_CONNECTIONS")
+    s3_multipart_threshold_mb: int = Field(8, alias="S3_MULTIPART_THRESHOLD_MB")
+    s3_multipart_chunk_mb: int = Field(8, alias="S3_MULTIPART_CHUNK_MB")
     vision_daily_limit: int = Field(100, alias="VISION_DAILY_LIMIT")
+    # Per-user limits on expensive features (Redis token buckets; 0 disables)
+    rate_limit_normalize_per_min: int = Field(30, alias="RATE_LIMIT_NORMALIZE_PER_MIN")
+    rate_limit_coach_per_min: int = Field(10, alias="RATE_LIMIT_COACH_PER_MIN")
+    rate_limit_stt_per_min: int = Field(10, alias="RATE_LIMIT_STT_PER_MIN")
     max_image_px: int = Field(1600, alias="MAX_IMAGE_PX")
+    # Image derivatives (WebP, longest side px): sizes served by /api/images, subset rendered at upload
+    image_derivative_sizes: str = Field("160,480,960", alias="IMAGE_DERIVATIVE_SIZES")
+    image_ingest_sizes: str = Field("160,480", alias="IMAGE_INGEST_SIZES")
+    image_cache_dir: str = Field("data/cache/images", alias="IMAGE_CACHE_DIR")
+    image_cache_max_mb: int = Field(512, alias="IMAGE_CACHE_MAX_MB")
+    image_pool_workers: int = Field(4, alias="IMAGE_POOL_WORKERS")
 
     # CORS / Web
     allowed_origins: str = Field("http://localhost:5173,http://localhost:3000", alias="ALLOWED_ORIGINS")
+    # Response compression (gzip; brotli when the package is installed) for bodies >= min bytes
+    compression_enabled: bool = Field(True, alias="COMPRESSION_ENABLED")
+    compression_min_bytes: int = Field(1024, alias="COMPRESSION_MIN_BYTES")
+    compression_gzip_level: int = Field(6, alias="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(4, alias="COMPRESSION_BROTLI_QUALITY")
 
     # Telegram WebApp URL (optional)
     webapp_url: str | None = Field(None, alias="WEBAPP_URL")
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+
+ALLERGEN_MESSAGE = "Предупреждение: найден аллерген — {}"
+DIET_MESSAGE = "Блюдо может противоречить выбранному режиму питания"
+
+# Stems that contradict a diet mode (очень грубые эвристики, ru + en)
+DIET_BANS: dict[str, tuple[str, ...]] = {
+    "vegan": ("молок", "молоч", "сыр", "сливк", "творог", "йогурт", "кефир", "яйц", "яич", "мяс", "рыб",
+              "куриц", "курин", "говяд", "свин", "бекон", "колбас", "сосис",
+              "milk", "cheese", "cream", "egg", "meat", "fish", "chicken", "beef", "pork", "bacon", "honey"),
+    "vegetarian": ("мяс", "рыб", "куриц", "курин", "говяд", "свин", "бекон", "колбас", "сосис", "фарш",
+                   "meat", "fish", "chicken", "beef", "pork", "bacon", "ham", "sausage"),
+    "keto": ("сахар", "слад", "хлеб", "круп", "рис", "макарон", "картоф", "булк", "печень", "торт",
+             "sugar", "sweet", "bread", "rice", "pasta", "potato", "cake", "cookie"),
+    "low_fat": ("масло", "масл", "жир", "сливк", "сало", "бекон", "майонез",
+                "butter", "oil", "fat", "cream", "bacon", "mayonnaise"),
+}
+
+# Canonical allergen stem -> stems of products that contain it
+ALLERGEN_SYNONYMS: dict[str, tuple[str, ...]] = {
+    "орех": ("орех", "арахис", "миндал", "фундук", "кешью", "фисташ", "пекан", "nut", "peanut", "almond", "cashew", "pistachio", "hazelnut"),
+    "арахис": ("арахис", "peanut"),
+    "молок": ("молок", "молоч", "сыр", "сливк", "творог", "йогурт", "кефир", "ряженк", "сметан", "лактоз",
+              "milk", "cheese", "cream", "yogurt", "lactose"),
+    "лактоз": ("лактоз", "молок", "молоч", "сливк", "творог", "кефир", "lactose", "milk", "cream"),
+    "глютен": ("глютен", "пшениц", "пшен", "рож", "ячм", "хлеб", "макарон", "мук", "булк", "батон", "лаваш", "пицц",
+               "gluten", "wheat", "bread", "pasta", "flour", "pizza"),
+    "яйц": ("яйц", "яич", "омлет", "майонез", "egg", "omelet", "mayonnaise"),
+    "рыб": ("рыб", "лосос", "семг", "сёмг", "тунец", "тунц", "форел", "треск", "селёд", "сельд", "fish", "salmon", "tuna", "cod"),
+    "морепродукт": ("кревет", "краб", "мид", "кальмар", "осьмин", "устриц", "shrimp", "prawn", "crab", "mussel", "squid", "oyster"),
+    "соя": ("соя", "сои", "соев", "тофу", "эдамам", "soy", "tofu", "edamame"),
+    "кунжут": ("кунжут", "тахин", "sesame", "tahini"),
+    "мёд": ("мёд", "мед", "honey"),
+}
+
+# Russian inflection endings stripped from user-entered allergen names (longest first)
+_RU_ENDINGS = (
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ов", "ев", "ей", "ам", "ям", "ах", "ях",
+    "ой", "ый", "ий", "ая", "яя", "ое", "ее", "ые", "ие", "ом", "ем",
+    "а", "я", "ы", "и", "о", "е", "у", "ю", "ь",
+)
+_EN_ENDINGS = ("es", "s")
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _norm(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def stem(word: str) -> str:
+    """Very small stemmer: lowercase and strip one inflection ending if at least 3 chars remain."""
+    w = word.strip().lower()
+    endings = _RU_ENDINGS if re.search("[а-яё]", w) else _EN_ENDINGS
+    for end in endings:
+        if w.endswith(end) and len(w) - len(end) >= 3:
+            return w[: -len(end)]
+    return w
+
+
+def _expand(stem_: str) -> set[str]:
+    # "орехи" -> "орех" -> all products containing nuts
+    stems: set[str] = {stem_}
+    key = _norm(stem_)
+    for canonical, syn in ALLERGEN_SYNONYMS.items():
+        c = _norm(canonical)
+        if key.startswith(c) or c.startswith(key):
+            stems.update(syn)
+    return stems
+
+
+class DietaryRules:
+    """Compiled allergen/diet matcher for one set of preferences; immutable and shareable.
+
+    Stems are indexed by their exact text, so an item is checked by looking up each
+    prefix of each word once, regardless of how many allergens the user listed.
+    Matching is word-start only: "рис" matches "рисовая", but not "ирис".
+    """
+
+    __slots__ = ("allergens", "diet", "_index", "_lengths")
+
+    def __init__(self, allergens: tuple[str, ...], diet: str | None) -> None:
+        self.allergens = allergens
+        self.diet = diet if diet in DIET_BANS else None
+        index: dict[str, set[str]] = {}
+        for allergen in allergens:
+            for s in _expand(stem(allergen)):
+                index.setdefault(_norm(s), set()).add(ALLERGEN_MESSAGE.format(allergen))
+        if self.diet is not None:
+            for s in DIET_BANS[self.diet]:
+                index.setdefault(_norm(s), set()).add(DIET_MESSAGE)
+        self._index = {k: tuple(sorted(v)) for k, v in index.items()}
+        self._lengths = tuple(sorted({len(k) for k in index}))
+
+    def __bool__(self) -> bool:
+        return bool(self._index)
+
+    def check_item(self, name: str) -> list[str]:
+        """Warnings for one item name (allergens first, diet last)."""
+        if not self._index or not name:
+            return []
+        hits: dict[str, None] = {}
+        for word in _WORD_RE.findall(_norm(name)):
+            for n in self._lengths:
+                if n > len(word):
+                    break
+                for w in self._index.get(word[:n], ()):
+                    hits[w] = None
+        return sorted(hits, key=lambda w: w == DIET_MESSAGE)
+
+    def check_items(self, names: Iterable[str]) -> list[str]:
+        """Deduplicated warnings for a whole meal."""
+        seen: dict[str, None] = {}
+        for name in names:
+            for w in self.check_item(name):
+                seen[w] = None
+        return sorted(seen, key=lambda w: w == DIET_MESSAGE)
+
+    def annotate(self, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Attach per-item ``warnings`` in place (only where something matched)."""
+        if not self._index:
+            return items
+        for it in items:
+            warnings = self.check_item(str(it.get("name") or ""))
+            if warnings:
+                it["warnings"] = warnings
+        return items
+
+
+@lru_cache(maxsize=4096)
+def _compile(allergens: tuple[str, ...], diet: str | None) -> DietaryRules:
+    return DietaryRules(allergens, diet)
+
+
+def rules_for(prefs: Mapping[str, Any] | None) -> DietaryRules:
+    """Matcher for a user's settings; compiled once per distinct (allergies, diet_mode)."""
+    prefs = prefs or {}
+    raw = prefs.get("allergies") or []
+    allergens = tuple(dict.fromkeys(a.strip() for a in raw if isinstance(a, str) and a.strip()))
+    diet = prefs.get("diet_mode")
+    return _compile(allergens, diet if isinstance(diet, str) else None)
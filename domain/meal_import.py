@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from datetime import date, datetime, time
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Literal, NamedTuple
+from zoneinfo import ZoneInfo
+
+from domain.errors import InvalidInputError
+
+
+# Files look like GET /api/meals/export.csv (date,time,name,amount,unit,kcal,protein_g,fat_g,carb_g)
+# with date/time local to the import tz; JSONL lines use the same keys or a single ISO "at".
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snack")
+UNITS = ("g", "ml", "piece")
+
+ImportFormat = Literal["csv", "jsonl"]
+
+
+class ImportRow(NamedTuple):
+    """One meal item of an import file; rows sharing ``at`` (and ``meal_type``) form one meal."""
+
+    at: datetime  # tz-aware
+    meal_type: str | None
+    name: str
+    amount: float
+    unit: str
+    kcal: float
+    protein_g: float
+    fat_g: float
+    carb_g: float
+
+
+def guess_format(filename: str | None, content_type: str | None = None) -> ImportFormat:
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "jsonl"
+    return "csv"
+
+
+def _number(raw: Any, field: str, lineno: int) -> float:
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise InvalidInputError(f"line {lineno}: {field} is not a number")
+    if value != value or value < 0:
+        raise InvalidInputError(f"line {lineno}: {field} must be >= 0")
+    return value
+
+
+def _row(rec: dict[str, Any], tz: ZoneInfo, lineno: int) -> ImportRow:
+    try:
+        if rec.get("at"):
+            at = datetime.fromisoformat(str(rec["at"]))
+            at = at.replace(tzinfo=tz) if at.tzinfo is None else at
+        else:
+            at = datetime.combine(date.fromisoformat(str(rec["date"])), time.fromisoformat(str(rec.get("time") or "12:00")), tzinfo=tz)
+    except (KeyError, ValueError):
+        raise InvalidInputError(f"line {lineno}: bad or missing date/time")
+    name = str(rec.get("name") or "").strip()
+    if not name:
+        raise InvalidInputError(f"line {lineno}: empty name")
+    unit = str(rec.get("unit") or "g").strip()
+    if unit not in UNITS:
+        raise InvalidInputError(f"line {lineno}: unit must be one of {', '.join(UNITS)}")
+    meal_type = rec.get("type") or None
+    if meal_type is not None and meal_type not in MEAL_TYPES:
+        raise InvalidInputError(f"line {lineno}: unknown meal type {meal_type!r}")
+    amount = _number(rec.get("amount"), "amount", lineno)
+    if amount <= 0:
+        raise InvalidInputError(f"line {lineno}: amount must be > 0")
+    return ImportRow(
+        at=at,
+        meal_type=meal_type,
+        name=name,
+        amount=amount,
+        unit=unit,
+        kcal=_number(rec.get("kcal"), "kcal", lineno),
+        protein_g=_number(rec.get("protein_g", 0), "protein_g", lineno),
+        fat_g=_number(rec.get("fat_g", 0), "fat_g", lineno),
+        carb_g=_number(rec.get("carb_g", 0), "carb_g", lineno),
+    )
+
+
+class ImportParser:
+    """Line-at-a-time parser, so a streamed body never has to be held in memory."""
+
+    def __init__(self, *, fmt: ImportFormat, tz: str = "Europe/Madrid") -> None:
+        self.fmt = fmt
+        self.tz = ZoneInfo(tz)
+        self.lineno = 0
+        self._header: list[str] | None = None
+
+    def feed(self, line: str) -> ImportRow | None:
+        """Parse one line; None for blank and header lines. Raises InvalidInputError with the line number."""
+        self.lineno += 1
+        lineno = self.lineno
+        line = line.strip().lstrip("\ufeff")
+        if not line:
+            return None
+        if self.fmt == "jsonl":
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                raise InvalidInputError(f"line {lineno}: invalid JSON")
+            if not isinstance(rec, dict):
+                raise InvalidInputError(f"line {lineno}: expected a JSON object")
+            return _row(rec, self.tz, lineno)
+        fields = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [f.strip().lower() for f in fields]
+            missing = [c for c in ("date", "name", "kcal") if c not in self._header]
+            if missing:
+                raise InvalidInputError(f"CSV header is missing: {', '.join(missing)}")
+            return None
+        if len(fields) != len(self._header):
+            raise InvalidInputError(f"line {lineno}: expected {len(self._header)} fields, got {len(fields)}")
+        return _row(dict(zip(self._header, fields)), self.tz, lineno)
+
+
+def parse_lines(lines: Iterable[str], *, fmt: ImportFormat, tz: str = "Europe/Madrid") -> Iterator[ImportRow]:
+    parser = ImportParser(fmt=fmt, tz=tz)
+    for line in lines:
+        row = parser.feed(line)
+        if row is not None:
+            yield row
+
+
+async def aparse_lines(lines: AsyncIterable[str], *, fmt: ImportFormat, tz: str = "Europe/Madrid") -> AsyncIterator[ImportRow]:
+    parser = ImportParser(fmt=fmt, tz=tz)
+    async for line in lines:
+        row = parser.feed(line)
+        if row is not None:
+            yield row
+
+
+async def iter_text_lines(chunks: AsyncIterable[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Split a byte stream (e.g. ``Request.stream()``) into text lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
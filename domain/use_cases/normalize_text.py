@@ -6,7 +6,8 @@ import json
 import hashlib
 import re
 
-from infra.cache.redis import redis_client
+from infra.cache.redis import pipeline as redis_pipeline, redis_client
+from infra.cost_governor import FULL, REDUCED, budget_for, note_tier
 from core.config import settings
 from services.llm.openai_normalize import normalize_with_openai
 
@@ -37,6 +38,8 @@ class NormalizeOutput:
     items: List[NormalizedItem]
     needs_clarification: bool = False
     clarifications: List[str] | None = None
+    # which tier answered: cache | llm | llm_cheap | cache_nearest | heuristic
+    tier: str = "heuristic"
 
 
 def parse_text_to_raw_items(text: str) -> List[RawItem]:
@@ -187,7 +190,103 @@ def _cache_key(text: str, locale: str) -> str:
     return f"normalize:{locale}:{h}"
 
 
-async def normalize_text_async(text: str, locale: str = "ru") -> NormalizeOutput:
+# Per-food values learned from LLM answers (per 1 g/ml/piece + the portion the model chose),
+# so a budget-limited request can be answered from the nearest earlier answer for the same food.
+def _foods_key(locale: str) -> str:
+    return f"normalize:foods:{locale}"
+
+
+_FOODS_TTL_SEC = 60 * 60 * 24 * 30
+_RAW_UNITS = {
+    **dict.fromkeys(("g", "гр", "г", "г.", "gram", "grams", "грамм"), "g"),
+    **dict.fromkeys(("ml", "мл", "миллилитров"), "ml"),
+    **dict.fromkeys(("pc", "pcs", "шт", "штук", "piece"), "piece"),
+}
+
+
+def _food_name(name: str) -> str:
+    # the same key on both sides: the name as the user typed it, parsed out of the text
+    return " ".join(name.lower().replace("ё", "е").split())
+
+
+async def _remember_foods(text: str, items: List[NormalizedItem], locale: str) -> None:
+    """Learn per-food values under the user's own item names, so the same input finds them.
+
+    The model may rename foods ("гречка" -> "Гречка отварная"), so its names are not looked
+    up; answers are paired with the parsed input by position and only when the counts match.
+    """
+    raw = parse_text_to_raw_items(text)
+    if len(raw) != len(items):
+        return
+    mapping: dict[str, str] = {}
+    for src, it in zip(raw, items):
+        if it.amount and it.amount > 0 and _food_name(src.name):
+            per = 1.0 / it.amount
+            mapping[_food_name(src.name)] = json.dumps(
+                {
+                    "category": it.category,
+                    "unit": it.unit,
+                    "amount": it.amount,
+                    "kcal": it.kcal * per,
+                    "protein_g": it.protein_g * per,
+                    "fat_g": it.fat_g * per,
+                    "carb_g": it.carb_g * per,
+                }
+            )
+    if not mapping:
+        return
+    try:
+        async with redis_pipeline() as pipe:
+            pipe.hset(_foods_key(locale), mapping=mapping)
+            pipe.expire(_foods_key(locale), _FOODS_TTL_SEC)
+            await pipe.execute()
+    except Exception:
+        pass
+
+
+async def _nearest_from_cache(text: str, locale: str) -> Optional[NormalizeOutput]:
+    """Answer from learned per-food values when every item of the text is known; None otherwise."""
+    raw = parse_text_to_raw_items(text)
+    if not raw:
+        return None
+    try:
+        found = await redis_client.hmget(_foods_key(locale), [_food_name(it.name) for it in raw])
+    except Exception:
+        return None
+    if not all(found):
+        return None
+    items: List[NormalizedItem] = []
+    for it, rec in zip(raw, found):
+        food = json.loads(rec)
+        unit = food["unit"]
+        amount = float(food["amount"])
+        raw_unit = _RAW_UNITS.get((it.unit or "").lower(), it.unit)
+        if it.amount is not None and (raw_unit in (None, unit) or {raw_unit, unit} <= {"g", "ml"}):
+            amount = float(it.amount)
+        items.append(
+            NormalizedItem(
+                name=it.name,
+                category=food.get("category"),
+                unit=unit,
+                amount=amount,
+                kcal=round(food["kcal"] * amount, 1),
+                protein_g=round(food["protein_g"] * amount, 1),
+                fat_g=round(food["fat_g"] * amount, 1),
+                carb_g=round(food["carb_g"] * amount, 1),
+                confidence=0.6,
+                assumptions=["cached-nearest"],
+            )
+        )
+    return NormalizeOutput(items=items, tier="cache_nearest")
+
+
+async def normalize_text_async(text: str, locale: str = "ru", *, user_id: int | None = None) -> NormalizeOutput:
+    out = await _normalize_text(text, locale, user_id)
+    await note_tier("normalize", out.tier)
+    return out
+
+
+async def _normalize_text(text: str, locale: str, user_id: int | None) -> NormalizeOutput:
     # быстрый детект «не еда» для коротких слов без чисел
     t = text.strip()
     if t and not re.search(r"\d", t):
@@ -218,10 +317,24 @@ async def normalize_text_async(text: str, locale: str = "ru") -> NormalizeOutput
             ],
             needs_clarification=data.get("needs_clarification", False),
             clarifications=data.get("clarifications"),
+            tier="cache",
         )
 
     await redis_client.incr("metrics:normalize:cache_miss")
-    llm = normalize_with_openai(text, locale=locale)
+    # Cost governor: past the soft threshold try earlier answers first, then the cheaper model;
+    # past the hard one never call the provider
+    budget = await budget_for(user_id)
+    if budget.level >= REDUCED:
+        nearest = await _nearest_from_cache(text, locale)
+        if nearest is not None:
+            return nearest
+    llm = None
+    tier = "llm"
+    if budget.allows_llm:
+        model = settings.openai_model_normalize if budget.level == FULL else settings.openai_model_normalize_cheap
+        tier = "llm" if budget.level == FULL else "llm_cheap"
+        if model:
+            llm = normalize_with_openai(text, locale=locale, model=model, user_id=user_id)
     cacheable = False
     if llm:
         def _canon_unit_and_amount(unit_raw: str, amount_val: float) -> tuple[str, float]:
@@ -271,10 +384,13 @@ async def normalize_text_async(text: str, locale: str = "ru") -> NormalizeOutput
             items=items_norm,
             needs_clarification=bool(llm.get("needs_clarification", False)),
             clarifications=llm.get("clarifications"),
+            tier=tier,
         )
         try:
-            await redis_client.incr("metrics:normalize:count")
-            await redis_client.incrbyfloat("metrics:normalize:cost_total", settings.openai_cost_normalize_per_req)
+            async with redis_pipeline() as pipe:
+                pipe.incr("metrics:normalize:count")
+                pipe.incrbyfloat("metrics:normalize:cost_total", settings.openai_cost_normalize_per_req)
+                await pipe.execute()
         except Exception:
             pass
         # Если пользователь не указывал числа, а модель вернула ровно 100 г —
@@ -354,6 +470,7 @@ async def normalize_text_async(text: str, locale: str = "ru") -> NormalizeOutput
             )
         except Exception:
             pass
+        await _remember_foods(text, out.items, locale)
 
     return out
 
@@ -1,29 +1,80 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
-from fastapi.middleware.cors import CORSMiddleware
-import hmac
+import asyncio
+import base64
 import hashlib
+import hmac
+import json as _json
+import math
+import time
+from datetime import date as D, datetime as DT, timedelta, timezone
+from pathlib import Path
+from typing import Literal
 from urllib.parse import parse_qsl
+from zoneinfo import ZoneInfo
+
+import jwt
+import structlog
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from jwt.exceptions import InvalidTokenError
 from sqlalchemy import select, func  # global import for query builders
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
+from domain.calculations import bmr_mifflin, tdee_from_activity, target_kcal_from_goal, distribute_macros
+from domain.dietary_rules import rules_for
+from domain.errors import InvalidInputError
+from domain.meal_import import aparse_lines, guess_format, iter_text_lines
 from domain.use_cases import (
     CalculateBudgetsInput,
     RecalcBudgetsInput,
     calculate_budgets,
     recalc_and_store_daily_budgets,
 )
-from infra.db.session import get_session
+from domain.use_cases.normalize_text import normalize_text_async
+from infra.db.session import engine, get_session, get_read_session
+from infra.db.partitions import ensure_future_meal_partitions
+from infra.jobs.scheduler import enqueue as enqueue_job
+from infra.db.models import Meal, MealItem
 from infra.db.repositories.daily_summary_repo import DailySummaryRepo
-from fastapi import Depends, Request, Body
-import asyncio
-import time
-import structlog
-from zoneinfo import ZoneInfo
-from sqlalchemy.ext.asyncio import AsyncSession
+from infra.db.repositories.diary_repo import DiaryRepo, local_days, pick_tz
+from infra.db.repositories.meal_repo import MealRepo
+from infra.db.repositories.meal_import_repo import MealImportRepo
+from infra.db.repositories.user_repo import UserRepo
+from infra.db.repositories.profile_repo import ProfileRepo
+from infra.db.repositories.goal_repo import GoalRepo
+from infra.db.repositories.weight_repo import WeightRepo
+from infra.db.repositories.user_settings_repo import UserSettingsRepo
+from infra.db.repositories.image_repo import ImageRepo
+from infra.db.repositories.vision_inference_repo import VisionInferenceRepo
+from infra.db.repositories.favorite_repo import FavoriteRepo
+from infra.db.repositories.bodyfat_repo import BodyFatRepo
+from infra import ledger
+from infra.cost_governor import note_tier
+from infra.api.compression import CompressionMiddleware
+from infra.api.rate_limit import rate_limit
+from infra.api.static import WebAppStatic
+from infra.cache.redis import pipeline as redis_pipeline, redis_client
+from services.vision.photo_pipeline import save_photo, PhotoIn
+from services.vision.postprocess import REUSABLE_TIERS, finalize
+from infra.storage.object_storage import get_storage
+from services.vision.processing import preprocess_photo, run_processing
+from services.vision.derivatives import (
+    SIZES as DERIVATIVE_SIZES,
+    WEBP as DERIVATIVE_TYPE,
+    get_derivative,
+    schedule_ingest as schedule_derivatives,
+)
+from services.vision.queue import (
+    VisionTask,
+    compact_result,
+    enqueue as enqueue_vision,
+    get_status as get_vision_status,
+    set_result as set_vision_result,
+)
 from .schemas import (
     APIResponse,
     BudgetsSchema,
@@ -41,24 +92,104 @@ from .schemas import (
     BodyFatEstimateInput,
     BodyFatInput,
 )
-from domain.use_cases.normalize_text import normalize_text_async
-from infra.db.repositories.meal_repo import MealRepo
-from infra.db.repositories.user_repo import UserRepo
-from infra.db.repositories.profile_repo import ProfileRepo
-from infra.db.repositories.goal_repo import GoalRepo
-from infra.db.repositories.weight_repo import WeightRepo
-from infra.db.repositories.user_settings_repo import UserSettingsRepo
-import uuid as _uuid
-from infra.cache.redis import redis_client
-from fastapi import Response
-import json as _json
-from services.vision.photo_pipeline import save_photo, PhotoIn
-from services.vision.processing import preprocess_photo
-from services.vision.queue import enqueue as enqueue_vision, VisionTask, get_status as get_vision_status
-from infra.db.repositories.image_repo import ImageRepo
-from infra.cache.redis import redis_client as _redis
-from aiogram import Bot as TgBot
-from aiogram.types import BufferedInputFile
+
+
+async def _read_user_id(session: AsyncSession, telegram_id: int) -> int:
+    # Read-only (replica) sessions cannot create users; an unknown user simply has no data yet
+    user_id = await UserRepo(session).get_by_telegram_id(telegram_id)
+    return user_id if user_id is not None else 0
+
+
+async def _user_tz(session: AsyncSession, user_id: int, tz: str | None) -> str:
+    # summaries and snapshots are keyed by the user's own calendar day, resolved the same way for
+    # every write: saved timezone first, then the request's, else DEFAULT_TZ
+    try:
+        saved = (await UserSettingsRepo(session).get(user_id) or {}).get("timezone")
+    except Exception:
+        saved = None
+    return pick_tz(saved, tz)
+
+
+async def _refresh_diary(session: AsyncSession, user_id: int, ats: list[DT], tz: str | None) -> None:
+    # same transaction as the meal write; the caller commits
+    dtz = await _user_tz(session, user_id, tz)
+    aware = [at if at.tzinfo else at.replace(tzinfo=timezone.utc) for at in ats]
+    await DiaryRepo(session).refresh(user_id=user_id, days=local_days(aware, dtz), tz=dtz, autocommit=False)
+
+
+def _local_day(at: DT, tz: str) -> D:
+    # naive datetimes are UTC, as everywhere else in the API
+    return (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).astimezone(ZoneInfo(tz)).date()
+
+
+def _tg_bot(token: str):
+    # aiogram pulls in its whole types/methods tree (~hundreds of ms); only the
+    # notification/export endpoints need it, so import on first use.
+    from aiogram import Bot
+
+    return Bot(token=token)
+
+
+def _encode_cursor(at: DT, meal_id: int) -> str:
+    # opaque keyset cursor for meal history: base64url("<at iso>|<id>")
+    raw = f"{at.isoformat()}|{meal_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[DT, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at_s, id_s = raw.rsplit("|", 1)
+        at = DT.fromisoformat(at_s)
+        if at.tzinfo is None:
+            raise ValueError("naive cursor timestamp")
+        return at, int(id_s)
+    except Exception:
+        raise HTTPException(status_code=400, detail="E_BAD_CURSOR")
+
+
+def _byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    # single "bytes=a-b" / "bytes=a-" / "bytes=-n" range, inclusive; None serves the whole body
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    lo, _, hi = header[6:].strip().partition("-")
+    try:
+        if not lo:
+            n = int(hi)
+            start, end = max(0, size - n), size - 1
+        else:
+            start, end = int(lo), min(int(hi), size - 1) if hi else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="E_RANGE", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _linear_forecast(ys: list[float], *, ahead: int) -> tuple[float | None, list[float] | None]:
+    # Linear regression on sample indices; returns (forecast, 95% prediction interval)
+    n = len(ys)
+    if n < 2:
+        return None, None
+    xs = list(range(n))
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx == 0:
+        slope = 0.0
+        intercept = ys[-1]
+    else:
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+        intercept = mean_y - slope * mean_x
+    x_f = xs[-1] + ahead  # forecast N days ahead in index units (approx.)
+    y_hat = intercept + slope * x_f
+    ci95 = None
+    if n >= 3 and sxx > 0:
+        residuals = [y - (intercept + slope * x) for x, y in zip(xs, ys)]
+        se = math.sqrt(max(1e-9, sum(r * r for r in residuals) / (n - 2)))
+        s_pred = se * math.sqrt(1 + 1 / n + ((x_f - mean_x) ** 2) / sxx)
+        ci95 = [round(y_hat - 1.96 * s_pred, 2), round(y_hat + 1.96 * s_pred, 2)]
+    return round(y_hat, 2), ci95
 
 
 def create_app() -> FastAPI:
@@ -72,42 +203,51 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.compression_enabled:
+        # added last, so it wraps CORS and the mounted WebApp (which sends .br/.gz as is)
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_min_bytes,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
 
-    # Serve built WebApp (Vite) if present
+    # Serve built WebApp (Vite) if present: precompressed variants, cache policy and CSP live there,
+    # so API responses pass through no per-request header middleware
     try:
         project_root = Path(__file__).resolve().parents[2]
         webapp_dist = project_root / "webapp" / "dist"
         if webapp_dist.exists():
-            app.mount("/webapp", StaticFiles(directory=str(webapp_dist), html=True), name="webapp")
+            app.mount("/webapp", WebAppStatic(webapp_dist), name="webapp")
     except Exception:
         # optional mount; ignore failures
         pass
 
-    @app.middleware("http")
-    async def add_security_headers(request: Request, call_next):
-        response = await call_next(request)
-        # Apply CSP for WebApp pages only
-        if str(request.url.path).startswith("/webapp"):
-            csp = (
-                "default-src 'self'; "
-                "img-src 'self' data: blob: https://*.telegram.org; "
-                "script-src 'self' 'unsafe-inline' https://telegram.org https://*.telegram.org; "
-                "style-src 'self' 'unsafe-inline'; "
-                "connect-src 'self' https://*.telegram.org; "
-                "font-src 'self' data:; "
-                "object-src 'none'"
-            )
-            response.headers["Content-Security-Policy"] = csp
-            response.headers["X-Content-Type-Options"] = "nosniff"
-            response.headers["Referrer-Policy"] = "no-referrer"
-            response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=()"
-            # Disable caching of HTML to avoid stale index.html in Telegram WebView (mobile)
-            ct = (response.headers.get("content-type") or "").lower()
-            if "text/html" in ct:
-                response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-                response.headers["Pragma"] = "no-cache"
-                response.headers["Expires"] = "0"
-        return response
+    @app.on_event("startup")
+    async def create_meal_partitions() -> None:
+        # meals/meal_items have no default partition: keep the next months ready before writes arrive
+        try:
+            created = await ensure_future_meal_partitions(engine)
+            if created:
+                log.info("meal_partitions_created", count=created)
+        except Exception as e:
+            log.warning("meal_partitions_failed", error=str(e))
+
+    @app.on_event("startup")
+    async def prepare_object_storage() -> None:
+        # build the shared S3 client once, off the loop; a fresh MinIO gets its bucket here
+        try:
+            await asyncio.to_thread(lambda: get_storage().ensure_bucket())
+        except Exception as e:
+            log.warning("object_storage_unavailable", error=str(e))
+
+    @app.on_event("startup")
+    async def start_inference_ledger() -> None:
+        ledger.start()
+
+    @app.on_event("shutdown")
+    async def stop_inference_ledger() -> None:
+        await ledger.stop()
 
     @app.get("/health")
     def health() -> dict[str, str]:
@@ -190,8 +330,8 @@ def create_app() -> FastAPI:
                 goal=payload.goal,
             ),
         )
-        # Ensure settings record exists
-        await settings_repo.upsert(user_id, data={})
+        # Ensure settings record exists (empty merge keeps existing prefs)
+        await settings_repo.merge(user_id, {})
         return APIResponse(ok=True, data={"user_id": user_id})
 
     # User settings
@@ -209,10 +349,8 @@ def create_app() -> FastAPI:
         settings_repo = UserSettingsRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
         incoming = payload.model_dump(exclude_none=True)
-        # Merge with existing prefs to avoid dropping other keys
-        current = await settings_repo.get(user_id) or {}
-        current.update(incoming)
-        await settings_repo.upsert(user_id, data=current)
+        # Only the sent keys are written (data || incoming); other prefs stay untouched
+        await settings_repo.merge(user_id, incoming)
         return APIResponse(ok=True, data={"ok": True})
 
     # Goals CRUD
@@ -272,7 +410,6 @@ def create_app() -> FastAPI:
         users = UserRepo(session)
         wrepo = WeightRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
         s = D.fromisoformat(start) if start else (D.today() - timedelta(days=30))
         e = D.fromisoformat(end) if end else D.today()
         items = await wrepo.list_between(user_id=user_id, start=s, end=e)
@@ -281,7 +418,6 @@ def create_app() -> FastAPI:
     @app.post("/api/bodyfat/estimate", response_model=APIResponse)
     def bodyfat_estimate(telegram_id: int, payload: BodyFatEstimateInput) -> APIResponse:
         # Navy tape method (approximate, consistent with UI)
-        import math
         h_in = payload.height_cm / 2.54
         w_in = payload.waist_cm / 2.54
         n_in = payload.neck_cm / 2.54
@@ -300,17 +436,11 @@ def create_app() -> FastAPI:
 
     @app.post("/api/bodyfat", response_model=APIResponse)
     async def bodyfat_save(telegram_id: int, payload: BodyFatInput, session: AsyncSession = Depends(get_session)) -> APIResponse:
+        if not (0 < payload.percent < 100):
+            raise HTTPException(status_code=400, detail="E_INVALID_INPUT")
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        # Store daily bodyfat in user_settings as per-day map + keep last_bodyfat
-        settings_repo = UserSettingsRepo(session)
-        current = await settings_repo.get(user_id) or {}
-        # per-day map
-        bf_map = dict(current.get("bodyfat_by_date") or {})
-        bf_map[payload.date.isoformat()] = float(payload.percent)
-        current["bodyfat_by_date"] = bf_map
-        current["last_bodyfat"] = {"date": payload.date.isoformat(), "percent": float(payload.percent)}
-        await settings_repo.upsert(user_id, data=current)
+        await BodyFatRepo(session).upsert(user_id=user_id, on_date=payload.date, percent=float(payload.percent))
         return APIResponse(ok=True, data={"ok": True})
 
     @app.get("/api/bodyfat", response_model=APIResponse)
@@ -322,25 +452,9 @@ def create_app() -> FastAPI:
     ) -> APIResponse:
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        settings_repo = UserSettingsRepo(session)
-        current = await settings_repo.get(user_id) or {}
-        bf_map: dict[str, float] = current.get("bodyfat_by_date") or {}
-        from datetime import date as D, timedelta
-        if start:
-            s = D.fromisoformat(start)
-        else:
-            s = D.today() - timedelta(days=6)
-        if end:
-            e = D.fromisoformat(end)
-        else:
-            e = D.today()
-        items: list[dict] = []
-        d = s
-        while d <= e:
-            iso = d.isoformat()
-            if iso in bf_map:
-                items.append({"date": iso, "percent": float(bf_map[iso])})
-            d = d + timedelta(days=1)
+        s = D.fromisoformat(start) if start else (D.today() - timedelta(days=6))
+        e = D.fromisoformat(end) if end else D.today()
+        items = await BodyFatRepo(session).list_between(user_id=user_id, start=s, end=e)
         return APIResponse(ok=True, data={"items": items})
 
     @app.post("/api/weights", response_model=APIResponse)
@@ -376,7 +490,6 @@ def create_app() -> FastAPI:
         users = UserRepo(session)
         repo = MealRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, datetime as DT
         tzname = tz or "UTC"
         z = ZoneInfo(tzname)
         local_date = D.fromisoformat(date)
@@ -387,6 +500,23 @@ def create_app() -> FastAPI:
         meals = await repo.list_between(user_id=user_id, start=start_utc, end=end_utc)
         return APIResponse(ok=True, data={"items": meals})
 
+    # History: newest first, keyset pagination on (at, id); must be registered before /api/meals/{meal_id}
+    @app.get("/api/meals/history", response_model=APIResponse)
+    async def meals_history(
+        telegram_id: int,
+        cursor: str | None = None,
+        limit: int = Query(20, ge=1, le=100),
+        type: Literal["breakfast", "lunch", "dinner", "snack"] | None = None,
+        session: AsyncSession = Depends(get_read_session),
+    ) -> APIResponse:
+        before = _decode_cursor(cursor) if cursor else None
+        user_id = await _read_user_id(session, telegram_id)
+        # one extra row tells whether another page exists without a COUNT
+        rows = await MealRepo(session).list_page(user_id=user_id, limit=limit + 1, before=before, meal_type=type)
+        page = rows[:limit]
+        next_cursor = _encode_cursor(page[-1].at, page[-1].id) if len(rows) > limit else None
+        return APIResponse(ok=True, data={"items": [r.as_dict() for r in page], "next_cursor": next_cursor})
+
     @app.post("/api/meals", response_model=APIResponse)
     async def create_meal(telegram_id: int, payload: MealCreate, request: Request, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
@@ -394,19 +524,9 @@ def create_app() -> FastAPI:
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
         # transactional create + summary recompute
         # transactional section below uses autocommit=False and explicit session.commit()
-        from datetime import date as D
-        # Determine local date for summary using provided tz (default Europe/Madrid).
-        try:
-            tzname = tz or "Europe/Madrid"
-            from zoneinfo import ZoneInfo as _ZI
-            dt = payload.at
-            if dt.tzinfo is None:
-                # assume UTC if naive
-                from datetime import timezone as _tz
-                dt = dt.replace(tzinfo=_tz.utc)
-            d = dt.astimezone(_ZI(tzname)).date()
-        except Exception:
-            d = D.fromisoformat(payload.at.date().isoformat())
+        # local date for the summary: create, update and delete resolve the zone the same way
+        tzname = await _user_tz(session, user_id, tz)
+        d = _local_day(payload.at, tzname)
         try:
             meal_id = await repo.create_meal(
                 user_id=user_id,
@@ -421,49 +541,72 @@ def create_app() -> FastAPI:
                 autocommit=False,
             )
         except Exception as e:
-            from sqlalchemy.exc import IntegrityError
             if isinstance(e, IntegrityError):
                 await session.rollback()
                 raise HTTPException(status_code=409, detail="E_DUPLICATE_MEAL_SOURCE")
             raise
-        sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d, tz=(tz or "Europe/Madrid"))
+        sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d, tz=tzname)
         await DailySummaryRepo(session).upsert_daily_summary(
             user_id=user_id, on_date=d, kcal=sums["kcal"], protein_g=sums["protein_g"], fat_g=sums["fat_g"], carb_g=sums["carb_g"], autocommit=False
         )
+        await _refresh_diary(session, user_id, [payload.at], tzname)
         await session.commit()
         # metrics
         try:
-            await redis_client.incr("metrics:meals:create")
-            await redis_client.incr("metrics:meals:total")
-            if (payload.status or "draft") == "confirmed":
-                await redis_client.incr("metrics:meals:confirmed")
-            await redis_client.incrbyfloat("metrics:meals:items_total", float(sum(len(payload.items) for _ in [0])))
+            async with redis_pipeline() as pipe:
+                pipe.incr("metrics:meals:create")
+                pipe.incr("metrics:meals:total")
+                if (payload.status or "draft") == "confirmed":
+                    pipe.incr("metrics:meals:confirmed")
+                pipe.incrbyfloat("metrics:meals:items_total", float(len(payload.items)))
+                await pipe.execute()
         except Exception:
             pass
-        # warnings based on user settings
+        # warnings based on user settings (matcher is compiled once per distinct prefs)
         warnings: list[str] = []
         try:
-            prefs = await UserSettingsRepo(session).get(user_id) or {}
-            if prefs:
-                lower_items = " ".join([i.model_dump()["name"].lower() for i in payload.items])
-                for allergen in (prefs.get("allergies") or []):
-                    if isinstance(allergen, str) and allergen.lower() in lower_items:
-                        warnings.append(f"Предупреждение: найден аллерген — {allergen}")
-                diet = prefs.get("diet_mode")
-                if diet in {"vegan", "vegetarian", "keto", "low_fat"}:
-                    # очень грубые эвристики
-                    banned = {
-                        "vegan": ["молоко", "сыр", "яйц", "мяс", "рыб"],
-                        "vegetarian": ["мяс", "рыб"],
-                        "keto": ["сахар", "слад", "хлеб", "круп", "рис", "макарон"],
-                        "low_fat": ["масло", "жир", "сливк"],
-                    }[diet]
-                    if any(b in lower_items for b in banned):
-                        warnings.append("Блюдо может противоречить выбранному режиму питания")
+            rules = rules_for(await UserSettingsRepo(session).get(user_id))
+            if rules:
+                warnings = rules.check_items(i.name for i in payload.items)
         except Exception:
             pass
         return APIResponse(ok=True, data={"id": meal_id, "warnings": warnings or None})
 
+    @app.post("/api/meals/import", response_model=APIResponse)
+    async def import_meals(
+        telegram_id: int,
+        request: Request,
+        format: Literal["csv", "jsonl"] | None = None,
+        tz: str | None = None,
+        skip_existing: bool = True,
+        session: AsyncSession = Depends(get_session),
+    ) -> APIResponse:
+        # Raw body in the meals_export.csv shape (or JSONL); streamed into COPY, never held in memory
+        tzname = tz or "Europe/Madrid"
+        try:
+            ZoneInfo(tzname)
+        except Exception:
+            raise HTTPException(status_code=400, detail="E_BAD_TZ")
+        fmt = format or guess_format(None, request.headers.get("content-type"))
+        user_id = await UserRepo(session).get_or_create_by_telegram_id(telegram_id)
+        rows = aparse_lines(iter_text_lines(request.stream()), fmt=fmt, tz=tzname)
+        try:
+            stats = await MealImportRepo(session).import_rows(
+                user_id=user_id, rows=rows, tz=tzname, skip_existing=skip_existing, autocommit=False
+            )
+        except InvalidInputError as e:
+            await session.rollback()
+            return APIResponse(ok=False, error={"code": e.code, "message": str(e)})
+        await session.commit()
+        try:
+            async with redis_pipeline() as pipe:
+                pipe.incrby("metrics:meals:total", stats.meals)
+                pipe.incrby("metrics:meals:imported", stats.meals)
+                await pipe.execute()
+        except Exception:
+            pass
+        return APIResponse(ok=True, data=stats.as_dict())
+
     @app.get("/api/meals/{meal_id}", response_model=APIResponse)
     async def get_meal(meal_id: int, telegram_id: int, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
@@ -475,21 +618,13 @@ def create_app() -> FastAPI:
         return APIResponse(ok=True, data=meal)
 
     @app.patch("/api/meals/{meal_id}", response_model=APIResponse)
-    async def update_meal(meal_id: int, telegram_id: int, payload: MealUpdate, request: Request, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        from datetime import datetime as DT
+    async def update_meal(meal_id: int, telegram_id: int, payload: MealUpdate, request: Request, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         repo = MealRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        # transactional update + summary recompute
-        from datetime import date as D
-        # get previous meal date for recompute
-        prev = await repo.get_by_id(meal_id=meal_id, user_id=user_id)
-        prev_d: D | None = None
-        if prev:
-            prev_d = D.fromisoformat(prev["at"][:10])
-        d = D.fromisoformat((payload.at or DT.utcnow()).date().isoformat())
+        # transactional update; daily summaries get deltas from the returned before/after state
         try:
-            await repo.update_meal(
+            result = await repo.update_meal(
                 meal_id=meal_id,
                 user_id=user_id,
                 at=payload.at,
@@ -500,60 +635,81 @@ def create_app() -> FastAPI:
                 autocommit=False,
             )
         except Exception as e:
-            from sqlalchemy.exc import IntegrityError
             if isinstance(e, IntegrityError):
                 await session.rollback()
                 raise HTTPException(status_code=409, detail="E_DUPLICATE_MEAL_SOURCE")
             raise
-        sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d)
-        await DailySummaryRepo(session).upsert_daily_summary(
-            user_id=user_id, on_date=d, kcal=sums["kcal"], protein_g=sums["protein_g"], fat_g=sums["fat_g"], carb_g=sums["carb_g"], autocommit=False
-        )
-        if prev_d and prev_d != d:
-            sums_prev = await repo.sum_macros_for_date(user_id=user_id, on_date=prev_d)
-            await DailySummaryRepo(session).upsert_daily_summary(
-                user_id=user_id, on_date=prev_d, kcal=sums_prev["kcal"], protein_g=sums_prev["protein_g"], fat_g=sums_prev["fat_g"], carb_g=sums_prev["carb_g"], autocommit=False
+        if result is None:
+            await session.rollback()
+            raise HTTPException(status_code=404, detail="Meal not found")
+        ds_repo = DailySummaryRepo(session)
+        # same local-day mapping as create_meal, or the deltas land on another summary row
+        tzname = await _user_tz(session, user_id, tz)
+
+        async def _shift(day: D, macros: dict[str, float], sign: float) -> None:
+            if not any(macros.values()):
+                return
+            applied = await ds_repo.apply_delta(
+                user_id=user_id, on_date=day, autocommit=False, **{k: sign * v for k, v in macros.items()}
             )
+            if not applied:
+                # no summary row yet for that day: fall back to a full recompute
+                sums = await repo.sum_macros_for_date(user_id=user_id, on_date=day, tz=tzname)
+                await ds_repo.upsert_daily_summary(user_id=user_id, on_date=day, autocommit=False, **sums)
+
+        prev_d = _local_day(result.prev_at, tzname)
+        d = _local_day(result.at, tzname)
+        if prev_d == d:
+            await _shift(d, result.delta(), 1.0)
+        elif result.old_totals is not None and result.new_totals is not None:
+            await _shift(prev_d, result.old_totals, -1.0)
+            await _shift(d, result.new_totals, 1.0)
+        await _refresh_diary(session, user_id, [result.prev_at, result.at], tzname)
         await session.commit()
         # metrics
         try:
-            await redis_client.incr("metrics:meals:update")
-            # confirm ratio if became confirmed
-            after = await repo.get_by_id(meal_id=meal_id, user_id=user_id)
-            if after and after.get("status") == "confirmed":
-                await redis_client.incr("metrics:meals:confirmed")
-            if payload.items is not None:
-                await redis_client.incrbyfloat("metrics:meals:items_total", float(len(payload.items)))
+            async with redis_pipeline() as pipe:
+                pipe.incr("metrics:meals:update")
+                # confirm ratio if became confirmed
+                if result.status == "confirmed" and result.prev_status != "confirmed":
+                    pipe.incr("metrics:meals:confirmed")
+                if payload.items is not None:
+                    pipe.incrbyfloat("metrics:meals:items_total", float(len(payload.items)))
+                await pipe.execute()
         except Exception:
             pass
         # warnings
         warnings: list[str] = []
         try:
-            prefs = await UserSettingsRepo(session).get(user_id) or {}
-            if prefs and payload.items:
-                lower_items = " ".join([i.model_dump()["name"].lower() for i in payload.items])
-                for allergen in (prefs.get("allergies") or []):
-                    if isinstance(allergen, str) and allergen.lower() in lower_items:
-                        warnings.append(f"Предупреждение: найден аллерген — {allergen}")
+            if payload.items:
+                rules = rules_for(await UserSettingsRepo(session).get(user_id))
+                if rules:
+                    warnings = rules.check_items(i.name for i in payload.items)
         except Exception:
             pass
-        return APIResponse(ok=True, data={"updated": True, "warnings": warnings or None})
+        return APIResponse(ok=True, data={
+            "updated": True,
+            "warnings": warnings or None,
+            "items": result.items if payload.items is not None else None,
+        })
 
     @app.delete("/api/meals/{meal_id}", response_model=APIResponse)
-    async def delete_meal(meal_id: int, telegram_id: int, request: Request, session: AsyncSession = Depends(get_session)) -> APIResponse:
+    async def delete_meal(meal_id: int, telegram_id: int, request: Request, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         repo = MealRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D
         # get date before delete to recompute
         m = await repo.get_by_id(meal_id=meal_id, user_id=user_id)
         await repo.delete_meal(meal_id=meal_id, user_id=user_id, autocommit=False)
         if m:
-            d = D.fromisoformat(m["at"][:10])
-            sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d)
+            tzname = await _user_tz(session, user_id, tz)
+            at = DT.fromisoformat(m["at"])
+            d = _local_day(at, tzname)
+            sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d, tz=tzname)
             await DailySummaryRepo(session).upsert_daily_summary(
                 user_id=user_id, on_date=d, kcal=sums["kcal"], protein_g=sums["protein_g"], fat_g=sums["fat_g"], carb_g=sums["carb_g"], autocommit=False
             )
+            await _refresh_diary(session, user_id, [at], tzname)
         await session.commit()
         # log trace
         xtrace = request.headers.get("X-Trace-Id")
@@ -567,15 +723,12 @@ def create_app() -> FastAPI:
 
     @app.post("/api/webapp/verify", response_model=APIResponse)
     async def webapp_verify(initData: str = Body(..., embed=True), session: AsyncSession = Depends(get_session)) -> APIResponse:
-        from core.config import settings as cfg
-        if not cfg.telegram_bot_token:
+        if not settings.telegram_bot_token:
             raise HTTPException(status_code=500, detail="Bot token is not configured")
-        if not verify_init_data(initData, cfg.telegram_bot_token):
+        if not verify_init_data(initData, settings.telegram_bot_token):
             return APIResponse(ok=False, error={"code": "E_INVALID_INITDATA", "message": "Invalid initData"})
         # Parse initData to extract user info
-        from urllib.parse import parse_qsl
         params = dict(parse_qsl(initData, keep_blank_values=True))
-        import json as _json
         user = None
         try:
             if "user" in params:
@@ -589,8 +742,6 @@ def create_app() -> FastAPI:
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
         # Issue short‑lived JWT
-        import time
-        import jwt
         now = int(time.time())
         exp = now + int(settings.webapp_jwt_ttl_minutes) * 60
         claims = {"sub": str(user_id), "tid": telegram_id, "iat": now, "exp": exp, "scope": "webapp"}
@@ -599,8 +750,6 @@ def create_app() -> FastAPI:
 
     @app.post("/api/webapp/refresh", response_model=APIResponse)
     def webapp_refresh(token: str = Body(..., embed=True)) -> APIResponse:
-        import jwt
-        from jwt.exceptions import InvalidTokenError
         now = int(time.time())
         try:
             data = jwt.decode(token, settings.webapp_jwt_secret, algorithms=["HS256"])
@@ -627,21 +776,19 @@ def create_app() -> FastAPI:
         # rate-limit & dedupe per user/mode for 10 minutes
         key = f"goal_notify:{telegram_id}:{mode}"
         try:
-            exist = await redis_client.get(key)
-            if exist:
+            # SET NX EX: check and claim in one atomic command
+            if not await redis_client.set(key, "1", ex=600, nx=True):
                 return APIResponse(ok=True, data={"sent": False})
-            await redis_client.setex(key, 600, "1")
         except Exception:
             pass
         from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
-        bot = TgBot(settings.telegram_bot_token)
+        bot = _tg_bot(settings.telegram_bot_token)
         web_url = settings.webapp_url or ""
         # add cache-busting to force fresh WebApp load in Telegram mobile WebView
         try:
             if web_url and web_url.startswith("https://"):
-                import time as _t
                 sep = '&' if ('?' in web_url) else '?'
-                web_url = f"{web_url}{sep}v={int(_t.time())}"
+                web_url = f"{web_url}{sep}v={int(time.time())}"
         except Exception:
             pass
         base = Path(__file__).resolve().parents[2] / "data/content/templates/video/ready_video"
@@ -705,20 +852,27 @@ def create_app() -> FastAPI:
         return APIResponse(ok=True, data={"sent": True})
 
     # Stage 7: normalization endpoint (text based MVP)
-    @app.post("/api/normalize", response_model=NormalizeResponse)
-    async def normalize(payload: NormalizeInput, request: Request) -> NormalizeResponse:
+    @app.post("/api/normalize", response_model=NormalizeResponse, dependencies=[Depends(rate_limit("normalize"))])
+    async def normalize(
+        payload: NormalizeInput, request: Request, response: Response, session: AsyncSession = Depends(get_session)
+    ) -> NormalizeResponse:
         started = time.perf_counter()
-        out = await normalize_text_async(payload.text, locale=payload.locale)
+        # users.id drives the per-user spend check of the cost governor
+        user_id = await UserRepo(session).get_by_telegram_id(payload.telegram_id) if payload.telegram_id is not None else None
+        out = await normalize_text_async(payload.text, locale=payload.locale, user_id=user_id)
+        response.headers["X-Cost-Tier"] = out.tier
         took_ms = (time.perf_counter() - started) * 1000.0
         try:
-            await redis_client.incr("metrics:normalize:count")
-            await redis_client.incrbyfloat("metrics:normalize:ms_total", took_ms)
+            async with redis_pipeline() as pipe:
+                pipe.incr("metrics:normalize:count")
+                pipe.incrbyfloat("metrics:normalize:ms_total", took_ms)
+                await pipe.execute()
         except Exception:
             pass
         # log trace if header present
         xtrace = request.headers.get("X-Trace-Id")
         if xtrace:
-            log.bind(trace_id=xtrace).info("normalize_done", took_ms=took_ms)
+            log.bind(trace_id=xtrace).info("normalize_done", took_ms=took_ms, tier=out.tier)
         # Convert domain dataclasses to Pydantic models for response validation
         items = [
             NormalizedItem(
@@ -735,29 +889,67 @@ def create_app() -> FastAPI:
             )
             for i in out.items
         ]
+        # per-item allergen/diet warnings for the bot preview
+        if user_id is not None and items:
+            try:
+                rules = rules_for(await UserSettingsRepo(session).get(user_id))
+                if rules:
+                    for it in items:
+                        it.warnings = rules.check_item(it.name) or None
+            except Exception:
+                pass
         return NormalizeResponse(
             items=items,
             needs_clarification=out.needs_clarification,
             clarifications=out.clarifications,
+            tier=out.tier,
         )
 
+    # Day view: materialized snapshot (meals, items, totals, top items), one PK read
+    @app.get("/api/day", response_model=APIResponse)
+    async def get_day(
+        telegram_id: int,
+        date: str,
+        request: Request,
+        response: Response,
+        tz: str | None = None,
+        session: AsyncSession = Depends(get_session),
+    ) -> APIResponse | Response:
+        try:
+            d = D.fromisoformat(date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="E_BAD_DATE")
+        user_id = await UserRepo(session).get_or_create_by_telegram_id(telegram_id)
+        dtz = await _user_tz(session, user_id, tz)
+        diary = DiaryRepo(session)
+        hit = await diary.get(user_id=user_id, day=d)
+        if hit is not None and hit[0].get("tz") == dtz:
+            data, etag = hit
+        else:
+            # never written (old day, bulk import) or built for another tz: build once and keep it
+            data, etag = await diary.rebuild(user_id=user_id, day=d, tz=dtz)
+        tag = f'"{etag}"'
+        headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match") or ""
+        if tag in {t.strip().removeprefix("W/") for t in if_none_match.split(",")}:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return APIResponse(ok=True, data=data)
+
     # Daily summary
     @app.get("/api/daily-summary", response_model=APIResponse)
     async def get_daily_summary(telegram_id: int, date: str, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D
         d = D.fromisoformat(date)
         ds = await DailySummaryRepo(session).get_by_user_date(user_id=user_id, on_date=d)
         return APIResponse(ok=True, data=ds)
 
     # Stage 11: summaries & trends
     @app.get("/api/summary/daily", response_model=APIResponse)
-    async def summary_daily(telegram_id: int, date: str, tz: str | None = None, no_cache: int = 0, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
+    async def summary_daily(telegram_id: int, date: str, tz: str | None = None, no_cache: int = 0, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
         profiles = ProfileRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D
+        user_id = await _read_user_id(session, telegram_id)
         d = D.fromisoformat(date)
         # Cache key
         key = f"summary:daily:{user_id}:{d.isoformat()}"
@@ -765,7 +957,6 @@ def create_app() -> FastAPI:
             try:
                 cached = await redis_client.get(key)
                 if cached:
-                    import json as _json
                     return APIResponse(ok=True, data=_json.loads(cached))
             except Exception:
                 pass
@@ -773,11 +964,7 @@ def create_app() -> FastAPI:
         meals = MealRepo(session)
         sums = await meals.sum_macros_for_date(user_id=user_id, on_date=d, tz=tz)
         # top food items/categories for the day
-        from sqlalchemy import func, select
-        from infra.db.models import Meal, MealItem
-        from datetime import datetime as DT
         if tz:
-            from zoneinfo import ZoneInfo
             z = ZoneInfo(tz)
             start_local = DT.combine(d, DT.min.time()).replace(tzinfo=z)
             end_local = DT.combine(d, DT.max.time()).replace(tzinfo=z)
@@ -789,8 +976,14 @@ def create_app() -> FastAPI:
         q = (
             select(MealItem.name, func.sum(MealItem.kcal).label("k"))
             .select_from(MealItem)
-            .join(Meal, Meal.id == MealItem.meal_id)
-            .where(Meal.user_id == user_id, Meal.at >= start_utc, Meal.at <= end_utc)
+            .join(Meal, (Meal.id == MealItem.meal_id) & (Meal.at == MealItem.at))
+            .where(
+                Meal.user_id == user_id,
+                Meal.at >= start_utc,
+                Meal.at <= end_utc,
+                MealItem.at >= start_utc,  # prunes meal_items partitions too
+                MealItem.at <= end_utc,
+            )
             .group_by(MealItem.name)
             .order_by(func.sum(MealItem.kcal).desc())
             .limit(5)
@@ -800,7 +993,6 @@ def create_app() -> FastAPI:
         ]
         # Target from profile
         prof = await profiles.get_by_user_id(user_id)
-        from domain.calculations import bmr_mifflin, tdee_from_activity, target_kcal_from_goal, distribute_macros
         if prof:
             age = 30
             bmr = bmr_mifflin(prof["sex"], age, float(prof["height_cm"]), float(prof["weight_kg"]))
@@ -830,10 +1022,8 @@ def create_app() -> FastAPI:
         return APIResponse(ok=True, data=data)
 
     @app.get("/api/summary/weekly", response_model=APIResponse)
-    async def summary_weekly(telegram_id: int, start: str | None = None, tz: str | None = None, no_cache: int = 0, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
+    async def summary_weekly(telegram_id: int, start: str | None = None, tz: str | None = None, no_cache: int = 0, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        user_id = await _read_user_id(session, telegram_id)
         if not start:
             s = D.today() - timedelta(days=6)
         else:
@@ -853,7 +1043,6 @@ def create_app() -> FastAPI:
                 return APIResponse(ok=True, data=_json.loads(cached))
         items = await repo.list_between(user_id=user_id, start=s, end=e)
         # Ensure contiguous daily items; fill gaps from meals if summaries missing
-        from datetime import timedelta as _td
         existing = {it["date"]: it for it in items}
         filled: list[dict] = []
         cur = s
@@ -871,7 +1060,7 @@ def create_app() -> FastAPI:
                         "fat_g": float(sums["fat_g"]),
                         "carb_g": float(sums["carb_g"]),
                     })
-            cur = cur + _td(days=1)
+            cur = cur + timedelta(days=1)
         # sort by date
         items = sorted(filled or items, key=lambda x: x["date"])  # prefer filled if any
         # averages
@@ -900,7 +1089,6 @@ def create_app() -> FastAPI:
         comp = None
         weight_pace_kg_per_week = None
         if prof:
-            from domain.calculations import bmr_mifflin, tdee_from_activity, target_kcal_from_goal
             age = 30
             bmr = bmr_mifflin(prof["sex"], age, float(prof["height_cm"]), float(prof["weight_kg"]))
             tdee = tdee_from_activity(bmr, prof["activity_level"]) 
@@ -909,7 +1097,6 @@ def create_app() -> FastAPI:
             within = sum(1 for i in items if lo <= i["kcal"] <= hi)
             comp = {"score": int(100 * within / n), "days_within": within, "total_days": n}
             # weight pace
-            from infra.db.repositories.weight_repo import WeightRepo
             wrepo = WeightRepo(session)
             w = await wrepo.list_between(user_id=user_id, start=s, end=e)
             if len(w) >= 2:
@@ -924,10 +1111,8 @@ def create_app() -> FastAPI:
         return APIResponse(ok=True, data=data)
 
     @app.get("/api/summary/monthly", response_model=APIResponse)
-    async def summary_monthly(telegram_id: int, month: str | None = None, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
+    async def summary_monthly(telegram_id: int, month: str | None = None, tz: str | None = None, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        user_id = await _read_user_id(session, telegram_id)
         if month:
             year, mon = month.split("-")
             s = D(int(year), int(mon), 1)
@@ -956,7 +1141,6 @@ def create_app() -> FastAPI:
         monthly_compliance = None
         streaks = None
         if prof:
-            from domain.calculations import bmr_mifflin, tdee_from_activity, target_kcal_from_goal
             age = 30
             bmr = bmr_mifflin(prof["sex"], age, float(prof["height_cm"]), float(prof["weight_kg"]))
             tdee = tdee_from_activity(bmr, prof["activity_level"]) 
@@ -1014,10 +1198,8 @@ def create_app() -> FastAPI:
         return APIResponse(ok=True, data=data)
 
     @app.get("/api/trends", response_model=APIResponse)
-    async def trends(telegram_id: int, window: int = 7, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
+    async def trends(telegram_id: int, window: int = 7, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        user_id = await _read_user_id(session, telegram_id)
         e = D.today()
         s = e - timedelta(days=max(1, window - 1))
         repo = DailySummaryRepo(session)
@@ -1058,34 +1240,9 @@ def create_app() -> FastAPI:
             else:
                 weight_ma7.append(0.0)
                 weight_median7.append(0.0)
-        weight_forecast_7d = None
-        weight_forecast_ci95 = None
-        if len(weights) >= 2:
-            # Linear regression on day indices
-            import math
-            xs = [i for i in range(len(weights))]
-            ys = [w["weight_kg"] for w in weights]
-            n = len(xs)
-            mean_x = sum(xs) / n
-            mean_y = sum(ys) / n
-            sxx = sum((x - mean_x) ** 2 for x in xs)
-            if sxx == 0:
-                slope = 0.0
-                intercept = ys[-1]
-            else:
-                slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
-                intercept = mean_y - slope * mean_x
-            x_f = xs[-1] + 7  # forecast 7 days ahead in index units (approx.)
-            y_hat = intercept + slope * x_f
-            weight_forecast_7d = round(y_hat, 2)
-            # 95% CI of prediction
-            if n >= 3 and sxx > 0:
-                residuals = [y - (intercept + slope * x) for x, y in zip(xs, ys)]
-                se = math.sqrt(max(1e-9, sum(r*r for r in residuals) / (n - 2)))
-                s_pred = se * math.sqrt(1 + 1 / n + ((x_f - mean_x) ** 2) / sxx)
-                lo = round(y_hat - 1.96 * s_pred, 2)
-                hi = round(y_hat + 1.96 * s_pred, 2)
-                weight_forecast_ci95 = [lo, hi]
+        weight_forecast_7d, weight_forecast_ci95 = _linear_forecast([w["weight_kg"] for w in weights], ahead=7)
+        bodyfat = await BodyFatRepo(session).list_between(user_id=user_id, start=s, end=e)
+        bodyfat_forecast_7d, bodyfat_forecast_ci95 = _linear_forecast([b["percent"] for b in bodyfat], ahead=7)
         return APIResponse(ok=True, data={
             "items": items,
             "kcal_ma7": ma7,
@@ -1095,14 +1252,14 @@ def create_app() -> FastAPI:
             "weight_median7": weight_median7,
             "weight_forecast_7d": weight_forecast_7d,
             "weight_forecast_ci95": weight_forecast_ci95,
+            "bodyfat": bodyfat,
+            "bodyfat_forecast_7d": bodyfat_forecast_7d,
+            "bodyfat_forecast_ci95": bodyfat_forecast_ci95,
         })
 
     @app.get("/api/alerts", response_model=APIResponse)
-    async def alerts(telegram_id: int, range: str = "week", tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
-        from zoneinfo import ZoneInfo
+    async def alerts(telegram_id: int, range: str = "week", tz: str | None = None, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        user_id = await _read_user_id(session, telegram_id)
         end_d = D.today()
         start_d = end_d - timedelta(days=6 if range == "week" else 29)
         # Fetch daily summaries and weights
@@ -1167,71 +1324,20 @@ def create_app() -> FastAPI:
         }
         return APIResponse(ok=True, data=data)
 
-    # Weekly digest broadcast (MVP): builds per-user summary and sends Telegram messages with CTA to WebApp
+    # Weekly digest broadcast: runs as the weekly_digest job (python -m infra.jobs); this only queues an extra run
     @app.post("/api/digest/weekly/send", response_model=APIResponse)
-    async def send_weekly_digest(secret: str, session: AsyncSession = Depends(get_session)) -> APIResponse:
+    async def send_weekly_digest(secret: str) -> APIResponse:
         # Simple shared-secret guard (can move to env/config)
         if secret != (settings.webapp_jwt_secret or ""):
             raise HTTPException(status_code=401, detail="Unauthorized")
-        # Select all users
-        users = UserRepo(session)
-        from sqlalchemy import select
-        from infra.db.models import User as UserModel
-        res = await session.execute(select(UserModel.id, UserModel.telegram_id))
-        rows = res.all()
-        # Compose bot
         if not settings.telegram_bot_token:
             raise HTTPException(status_code=500, detail="Bot token is not configured")
-        bot = TgBot(settings.telegram_bot_token)
-        sent = 0
-        for uid, tg_id in rows:
-            try:
-                # Weekly summary for each user
-                from datetime import date as D, timedelta
-                start = D.today() - timedelta(days=6)
-                repo = DailySummaryRepo(session)
-                items = await repo.list_between(user_id=uid, start=start, end=D.today())
-                n = max(1, len(items))
-                kcal_avg = round(sum(i["kcal"] for i in items) / n, 0) if items else 0
-                # compliance score via existing endpoint logic (reuse minimal calc)
-                comp = None
-                try:
-                    profiles = ProfileRepo(session)
-                    prof = await profiles.get_by_user_id(uid)
-                    if prof:
-                        from domain.calculations import bmr_mifflin, tdee_from_activity, target_kcal_from_goal
-                        age = 30
-                        bmr = bmr_mifflin(prof["sex"], age, float(prof["height_cm"]), float(prof["weight_kg"]))
-                        tdee = tdee_from_activity(bmr, prof["activity_level"]) 
-                        target_kcal = target_kcal_from_goal(tdee, prof["goal"]) 
-                        lo, hi = 0.9 * target_kcal, 1.1 * target_kcal
-                        within = sum(1 for i in items if lo <= i["kcal"] <= hi)
-                        comp = int(100 * within / n)
-                except Exception:
-                    comp = None
-                # Build message
-                text = (
-                    "Ваш недельный дайджест:\n"
-                    f"Средние калории: {int(kcal_avg)} ккал/день\n"
-                    + (f"Комплаенс: {comp}% дней в цели\n" if comp is not None else "")
-                    + "Откройте WebApp для подробностей."
-                )
-                # WebApp CTA
-                web_url = settings.webapp_url or ""
-                kb = {
-                    "inline_keyboard": [[{"text": "Открыть WebApp", "web_app": {"url": web_url}}]]
-                }
-                await bot.send_message(chat_id=int(tg_id), text=text, reply_markup=kb)
-                sent += 1
-            except Exception:
-                pass
-        return APIResponse(ok=True, data={"sent": sent})
+        await enqueue_job("weekly_digest")
+        return APIResponse(ok=True, data={"queued": True})
 
     @app.get("/api/compliance", response_model=APIResponse)
-    async def compliance(telegram_id: int, range: str = "week", session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
+    async def compliance(telegram_id: int, range: str = "week", session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        user_id = await _read_user_id(session, telegram_id)
         e = D.today()
         s = e - timedelta(days=6 if range == "week" else 29)
         repo = DailySummaryRepo(session)
@@ -1241,7 +1347,6 @@ def create_app() -> FastAPI:
         score = 0
         details = []
         if prof:
-            from domain.calculations import bmr_mifflin, tdee_from_activity, target_kcal_from_goal
             age = 30
             bmr = bmr_mifflin(prof["sex"], age, float(prof["height_cm"]), float(prof["weight_kg"]))
             tdee = tdee_from_activity(bmr, prof["activity_level"]) 
@@ -1259,10 +1364,8 @@ def create_app() -> FastAPI:
         return APIResponse(ok=True, data={"score": score, "days": details})
 
     @app.get("/api/summary/weekly.csv")
-    async def summary_weekly_csv(telegram_id: int, start: str | None = None, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> Response:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        from datetime import date as D, timedelta
+    async def summary_weekly_csv(telegram_id: int, start: str | None = None, tz: str | None = None, session: AsyncSession = Depends(get_read_session)) -> Response:
+        user_id = await _read_user_id(session, telegram_id)
         s = D.fromisoformat(start) if start else (D.today() - timedelta(days=6))
         e = s + timedelta(days=6)
         repo = DailySummaryRepo(session)
@@ -1273,27 +1376,25 @@ def create_app() -> FastAPI:
 
     # Export: full meals CSV for user
     @app.get("/api/meals/export.csv")
-    async def meals_export_csv(telegram_id: int, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> Response:
-        users = UserRepo(session)
-        repo = MealRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
+    async def meals_export_csv(telegram_id: int, tz: str | None = None, session: AsyncSession = Depends(get_read_session)) -> Response:
+        user_id = await _read_user_id(session, telegram_id)
         # Load all meals for this user
-        from sqlalchemy import select
-        from infra.db.models import Meal, MealItem
         rows = (await session.execute(select(Meal).where(Meal.user_id == user_id).order_by(Meal.at.asc()))).scalars().all()
         if not rows:
             return Response(content="date,time,name,amount,unit,kcal,protein_g,fat_g,carb_g\n", media_type="text/csv")
-        meal_ids = [m.id for m in rows]
-        items_res = await session.execute(select(MealItem).where(MealItem.meal_id.in_(meal_ids)))
+        items_res = await session.execute(
+            select(MealItem)
+            .join(Meal, (Meal.id == MealItem.meal_id) & (Meal.at == MealItem.at))
+            .where(Meal.user_id == user_id)
+        )
         items = items_res.scalars().all()
         # Map items per meal
-        from zoneinfo import ZoneInfo as _ZI
         tzname = tz or "Europe/Madrid"
         z = None
         try:
-            z = _ZI(tzname)
+            z = ZoneInfo(tzname)
         except Exception:
-            z = _ZI("UTC")
+            z = ZoneInfo("UTC")
         lines = ["date,time,name,amount,unit,kcal,protein_g,fat_g,carb_g"]
         items_by_meal: dict[int, list] = {}
         for it in items:
@@ -1314,7 +1415,6 @@ def create_app() -> FastAPI:
     # Export token for Google Sheets IMPORTDATA
     @app.post("/api/meals/export-token", response_model=APIResponse)
     async def meals_export_token(telegram_id: int) -> APIResponse:
-        import time, jwt
         now = int(time.time())
         exp = now + 24 * 60 * 60  # 24h token
         claims = {"tid": int(telegram_id), "iat": now, "exp": exp, "scope": "export"}
@@ -1323,8 +1423,7 @@ def create_app() -> FastAPI:
 
     # Public export by token (no auth header, for Google Sheets IMPORTDATA)
     @app.get("/api/meals/export.csv/public")
-    async def meals_export_csv_public(token: str, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> Response:
-        import jwt
+    async def meals_export_csv_public(token: str, tz: str | None = None, session: AsyncSession = Depends(get_read_session)) -> Response:
         try:
             claims = jwt.decode(token, settings.webapp_jwt_secret, algorithms=["HS256"])
             if claims.get("scope") != "export":
@@ -1339,23 +1438,22 @@ def create_app() -> FastAPI:
 
     # Send CSV export to Telegram chat
     @app.post("/api/meals/export-send", response_model=APIResponse)
-    async def meals_export_send(telegram_id: int, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        users = UserRepo(session)
-        user_id = await users.get_or_create_by_telegram_id(telegram_id)
+    async def meals_export_send(telegram_id: int, tz: str | None = None, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        user_id = await _read_user_id(session, telegram_id)
         # Build CSV same as export.csv
-        from sqlalchemy import select
-        from infra.db.models import Meal, MealItem
         rows = (await session.execute(select(Meal).where(Meal.user_id == user_id).order_by(Meal.at.asc()))).scalars().all()
         tzname = tz or "Europe/Madrid"
-        from zoneinfo import ZoneInfo as _ZI
         try:
-            z = _ZI(tzname)
+            z = ZoneInfo(tzname)
         except Exception:
-            z = _ZI("UTC")
+            z = ZoneInfo("UTC")
         lines = ["date,time,name,amount,unit,kcal,protein_g,fat_g,carb_g"]
         if rows:
-            meal_ids = [m.id for m in rows]
-            items_res = await session.execute(select(MealItem).where(MealItem.meal_id.in_(meal_ids)))
+            items_res = await session.execute(
+                select(MealItem)
+                .join(Meal, (Meal.id == MealItem.meal_id) & (Meal.at == MealItem.at))
+                .where(Meal.user_id == user_id)
+            )
             items = items_res.scalars().all()
             items_by_meal: dict[int, list] = {}
             for it in items:
@@ -1374,8 +1472,10 @@ def create_app() -> FastAPI:
             token = (settings.telegram_bot_token or "").strip().strip("'").strip('"')
             if not token:
                 return
-            bot = TgBot(token=token)
+            bot = _tg_bot(token)
             try:
+                from aiogram.types import BufferedInputFile
+
                 buf = BufferedInputFile(bytes(content, encoding="utf-8"), filename="meals_export.csv")
                 await bot.send_document(chat_id=int(chat_id), document=buf, caption="Экспорт дневника (CSV)")
             finally:
@@ -1386,69 +1486,60 @@ def create_app() -> FastAPI:
         asyncio.create_task(_send_csv(int(telegram_id), csv))
         return APIResponse(ok=True, data={"scheduled": True})
 
-    # Favorites (stored in user_settings.data.favorites)
+    # Favorites (table favorites; ranked by usage for quick-add)
     @app.get("/api/favorites", response_model=APIResponse)
-    async def favorites_list(telegram_id: int, session: AsyncSession = Depends(get_session)) -> APIResponse:
+    async def favorites_list(telegram_id: int, limit: int | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        us = UserSettingsRepo(session)
-        data = await us.get(user_id) or {}
-        favs = data.get("favorites") or []
+        favs = await FavoriteRepo(session).list_by_user(user_id=user_id, limit=limit)
         return APIResponse(ok=True, data={"items": favs})
 
     @app.post("/api/favorites", response_model=APIResponse)
     async def favorites_add(telegram_id: int, request: Request, session: AsyncSession = Depends(get_session)) -> APIResponse:
         payload = await request.json()
-        item = {
-            "id": payload.get("id") or _uuid.uuid4().hex,
-            "name": payload.get("name"),
-            "unit": payload.get("unit") or "g",
-            "amount": float(payload.get("amount") or 0.0),
-            "kcal": float(payload.get("kcal") or 0.0),
-            "protein_g": float(payload.get("protein_g") or 0.0),
-            "fat_g": float(payload.get("fat_g") or 0.0),
-            "carb_g": float(payload.get("carb_g") or 0.0),
-        }
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        us = UserSettingsRepo(session)
-        data = await us.get(user_id) or {}
-        favs = list(data.get("favorites") or [])
-        # prevent exact duplicates by name+unit+amount+kcal
-        if not any((f.get("name"), f.get("unit"), f.get("amount"), f.get("kcal")) == (item["name"], item["unit"], item["amount"], item["kcal"]) for f in favs):
-            favs.append(item)
-            data["favorites"] = favs
-            await us.upsert(user_id, data)
-        return APIResponse(ok=True, data={"id": item["id"]})
+        # exact duplicates (name+unit+amount+kcal) are rejected by uq_favorites_user_item
+        fav_id, created = await FavoriteRepo(session).add(
+            user_id=user_id,
+            fav_id=payload.get("id"),
+            name=str(payload.get("name") or ""),
+            unit=payload.get("unit") or "g",
+            amount=float(payload.get("amount") or 0.0),
+            kcal=float(payload.get("kcal") or 0.0),
+            protein_g=float(payload.get("protein_g") or 0.0),
+            fat_g=float(payload.get("fat_g") or 0.0),
+            carb_g=float(payload.get("carb_g") or 0.0),
+        )
+        if not fav_id:
+            return APIResponse(ok=False, error={"code": "E_CONFLICT", "message": "Favorite id already taken"})
+        return APIResponse(ok=True, data={"id": fav_id, "created": created})
+
+    @app.post("/api/favorites/{fav_id}/use", response_model=APIResponse)
+    async def favorites_use(fav_id: str, telegram_id: int, session: AsyncSession = Depends(get_session)) -> APIResponse:
+        users = UserRepo(session)
+        user_id = await users.get_or_create_by_telegram_id(telegram_id)
+        count = await FavoriteRepo(session).mark_used(user_id=user_id, fav_id=fav_id)
+        if count is None:
+            return APIResponse(ok=False, error={"code": "E_NOT_FOUND", "message": "Favorite not found"})
+        return APIResponse(ok=True, data={"id": fav_id, "use_count": count})
 
     @app.delete("/api/favorites/{fav_id}", response_model=APIResponse)
     async def favorites_delete(fav_id: str, telegram_id: int, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        us = UserSettingsRepo(session)
-        data = await us.get(user_id) or {}
-        favs = list(data.get("favorites") or [])
-        nfavs = [f for f in favs if str(f.get("id")) != str(fav_id)]
-        if len(nfavs) != len(favs):
-            data["favorites"] = nfavs
-            await us.upsert(user_id, data)
+        await FavoriteRepo(session).delete(user_id=user_id, fav_id=fav_id)
         return APIResponse(ok=True, data={"deleted": True})
 
     # Stage 9: receive photo (raw MVP), store to object storage and index
-    @app.post("/api/photos", response_model=APIResponse)
+    # VISION_DAILY_LIMIT per rolling 24h, consumed atomically before preprocessing/storage/DB work
+    @app.post("/api/photos", response_model=APIResponse, dependencies=[Depends(rate_limit("vision"))])
     async def upload_photo(telegram_id: int, content_type: str, data: bytes, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
-        # rate limit per user per day
-        from datetime import date as D
-        today = D.today().isoformat()
-        key = f"lim:vision:{user_id}:{today}"
-        used = int(await redis_client.get(key) or 0)
-        if used >= settings.vision_daily_limit:
-            raise HTTPException(status_code=429, detail="E_VISION_LIMIT")
         # preprocess
-        processed = preprocess_photo(data, content_type)
-        res = save_photo(user_id, PhotoIn(bytes=processed.bytes, content_type=processed.content_type, width=processed.width, height=processed.height))
+        processed = await run_processing(preprocess_photo, data, content_type)
+        res = await save_photo(user_id, PhotoIn(bytes=processed.bytes, content_type=processed.content_type, width=processed.width, height=processed.height))
         # index in DB
         img_repo = ImageRepo(session)
         image_id = await img_repo.create_or_get(
@@ -1459,32 +1550,95 @@ def create_app() -> FastAPI:
             height=processed.height,
             content_type=processed.content_type,
         )
+        # thumbnails are rendered in the preprocessing pool after the response
+        schedule_derivatives(res.object_key, res.sha256, processed.bytes)
+        # identical bytes already recognized (this user's re-upload or anyone's copy): reuse the raw
+        # provider answer, no vision call; portions and warnings are rebuilt from this user's settings
+        vrepo = VisionInferenceRepo(session)
+        prior = await vrepo.find_by_sha256(sha256=res.sha256, tiers=REUSABLE_TIERS)
+        if prior is not None:
+            prefs = await UserSettingsRepo(session).get(user_id) or {}
+            result = finalize(prior["raw"], prefs, "reuse")
+            await vrepo.create(
+                image_id=image_id,
+                provider=prior["provider"],
+                model=prior["model"],
+                response=result,
+                confidence=prior["confidence"],
+            )
+            try:
+                await set_vision_result(image_id, compact_result(result["items"], result["quality"]), tier="reuse")
+                await note_tier("vision", "reuse")
+            except Exception:
+                pass
+            return APIResponse(ok=True, data={"image_id": image_id, "object_key": res.object_key, "sha256": res.sha256, "status": "ready"})
         # enqueue vision task
         await enqueue_vision(VisionTask(image_id=image_id, user_id=user_id))
-        await redis_client.incr(key)
-        await redis_client.expire(key, 60 * 60 * 24)
         return APIResponse(ok=True, data={"image_id": image_id, "object_key": res.object_key, "sha256": res.sha256, "status": "queued"})
 
     @app.get("/api/photos/{image_id}/status", response_model=APIResponse)
-    async def photo_status(image_id: int, session: AsyncSession = Depends(get_session)) -> APIResponse:
-        status = await get_vision_status(image_id)
-        data = status or {"status": "unknown"}
-        try:
-            if data.get("status") == "ready":
-                from infra.db.repositories.vision_inference_repo import VisionInferenceRepo
-                vrepo = VisionInferenceRepo(session)
-                inf = await vrepo.get_latest_by_image(image_id=image_id)
-                if inf and inf.get("response"):
-                    resp = inf["response"]
-                    items = resp.get("items", [])
-                    quality = resp.get("quality") or {}
-                    clar = list(set([*(quality.get("clarifications") or []), *((quality.get("issues") or []))]))
-                    data["items"] = items
-                    if clar:
-                        data["clarifications"] = clar
-        except Exception:
-            pass
-        return APIResponse(ok=True, data=data)
+    async def photo_status(image_id: int, session: AsyncSession = Depends(get_read_session)) -> APIResponse:
+        # one HGETALL: the worker stores the compact result with the status
+        data = await get_vision_status(image_id)
+        if data is None or (data.get("status") == "ready" and "items" not in data):
+            # record expired (or written before results moved to Redis): rebuild once from Postgres
+            try:
+                inf = await VisionInferenceRepo(session).get_latest_by_image(image_id=image_id)
+                if inf:
+                    result = compact_result(inf["items"], inf["quality"])
+                    data = {**(data or {}), "status": "ready", **result}
+                    await set_vision_result(image_id, result)
+            except Exception:
+                pass
+        return APIResponse(ok=True, data=data or {"status": "unknown"})
+
+    # Stored image (original or a WebP derivative): content-addressed, so cached forever and revalidated by ETag
+    @app.get("/api/images/{image_id}")
+    async def get_image(
+        image_id: int,
+        telegram_id: int,
+        request: Request,
+        size: int | None = None,
+        session: AsyncSession = Depends(get_read_session),
+    ) -> Response:
+        if size is not None and size not in DERIVATIVE_SIZES:
+            raise HTTPException(status_code=400, detail="E_SIZE")
+        user_id = await _read_user_id(session, telegram_id)
+        imgs = await ImageRepo(session).get_by_ids([image_id])
+        if not imgs or imgs[0]["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="E_NOT_FOUND")
+        img = imgs[0]
+        tag = f'"{img["sha256"]}-{size or "orig"}"'
+        headers = {
+            "ETag": tag,
+            "Cache-Control": "private, max-age=31536000, immutable",
+            "Accept-Ranges": "bytes",
+        }
+        if_none_match = request.headers.get("if-none-match") or ""
+        if tag in {t.strip().removeprefix("W/") for t in if_none_match.split(",")}:
+            return Response(status_code=304, headers=headers)
+        if size is not None:
+            blob = await get_derivative(img["object_key"], img["sha256"], size)
+            rng = _byte_range(request.headers.get("range"), len(blob))
+            if rng is None:
+                return Response(content=blob, media_type=DERIVATIVE_TYPE, headers=headers)
+            start, end = rng
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(blob)}"
+            return Response(content=blob[start : end + 1], status_code=206, media_type=DERIVATIVE_TYPE, headers=headers)
+        # originals are streamed from storage in chunks, never loaded whole
+        storage = get_storage()
+        total = await storage.stat(img["object_key"])
+        rng = _byte_range(request.headers.get("range"), total)
+        start, end = rng if rng is not None else (0, total - 1)
+        headers["Content-Length"] = str(end - start + 1)
+        if rng is not None:
+            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+        return StreamingResponse(
+            storage.stream(img["object_key"], start=start, end=end) if rng is not None else storage.stream(img["object_key"]),
+            status_code=206 if rng is not None else 200,
+            media_type=img["content_type"],
+            headers=headers,
+        )
 
     # Aggregate mediagroup images and run multi‑image vision; return preview items
     @app.post("/api/photo-groups/commit", response_model=APIResponse)
@@ -1492,28 +1646,26 @@ def create_app() -> FastAPI:
         key = f"mediagroup:{telegram_id}:{group_id}"
         image_ids = []
         try:
-            # consume all ids in the list
-            while True:
-                v = await _redis.lpop(key)
-                if not v:
-                    break
-                image_ids.append(int(v))
+            # consume all ids in the list: read and delete in one MULTI/EXEC
+            async with redis_pipeline(transaction=True) as pipe:
+                pipe.lrange(key, 0, -1)
+                pipe.delete(key)
+                values, _ = await pipe.execute()
+            image_ids = [int(v) for v in values]
         except Exception:
             pass
         if not image_ids:
             return APIResponse(ok=False, error={"code": "E_EMPTY_GROUP", "message": "No images in group"})
         # For MVP: pick handle image = last one; get latest inference for each and merge items
-        from infra.db.repositories.vision_inference_repo import VisionInferenceRepo
         vrepo = VisionInferenceRepo(session)
         items: list[dict] = []
         clarifications: list[str] = []
         for iid in image_ids:
             inf = await vrepo.get_latest_by_image(image_id=iid)
-            if inf and inf.get("response"):
-                resp = inf["response"]
-                items.extend(resp.get("items", []))
+            if inf:
+                items.extend(inf["items"])
                 try:
-                    cl = (resp.get("quality") or {}).get("clarifications") or []
+                    cl = inf["quality"].get("clarifications") or []
                     if isinstance(cl, list):
                         clarifications.extend([str(x) for x in cl if x])
                 except Exception:
@@ -1547,14 +1699,12 @@ def create_app() -> FastAPI:
     async def photo_save(image_id: int, telegram_id: int, tz: str | None = None, session: AsyncSession = Depends(get_session)) -> APIResponse:
         users = UserRepo(session)
         repo = MealRepo(session)
-        from infra.db.repositories.vision_inference_repo import VisionInferenceRepo
         vrepo = VisionInferenceRepo(session)
         user_id = await users.get_or_create_by_telegram_id(telegram_id)
         inf = await vrepo.get_latest_by_image(image_id=image_id)
         if not inf:
             raise HTTPException(status_code=404, detail="Inference not found")
-        items = inf["response"].get("items", [])
-        from datetime import datetime as DT, date as D
+        items = inf["items"]
         at = DT.now(ZoneInfo("UTC"))
         meal_id = await repo.create_meal(
             user_id=user_id,
@@ -1565,15 +1715,13 @@ def create_app() -> FastAPI:
             status="confirmed",
             autocommit=False,
         )
-        try:
-            tzname = tz or "Europe/Madrid"
-            d = at.astimezone(ZoneInfo(tzname)).date()
-        except Exception:
-            d = D.fromisoformat(at.date().isoformat())
-        sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d)
+        tzname = await _user_tz(session, user_id, tz)
+        d = _local_day(at, tzname)
+        sums = await repo.sum_macros_for_date(user_id=user_id, on_date=d, tz=tzname)
         await DailySummaryRepo(session).upsert_daily_summary(
             user_id=user_id, on_date=d, kcal=sums["kcal"], protein_g=sums["protein_g"], fat_g=sums["fat_g"], carb_g=sums["carb_g"], autocommit=False
         )
+        await _refresh_diary(session, user_id, [at], tzname)
         await session.commit()
         return APIResponse(ok=True, data={"meal_id": meal_id})
 
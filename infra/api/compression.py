@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import zlib
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _load_brotli():
+    try:
+        import brotli  # type: ignore
+    except Exception:
+        return None  # optional: gzip only
+    return brotli
+
+
+# Media that is compressed already (or must not be buffered): passed through untouched
+EXCLUDED_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/octet-stream",
+    "application/pdf",
+    "text/event-stream",
+)
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codings of an ``Accept-Encoding`` header with a non-zero q-value."""
+    out: set[str] = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            out.add(name.lower())
+    return out
+
+
+class _Gzip:
+    def __init__(self, level: int) -> None:
+        # wbits=31: gzip container, not raw zlib
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        # sync flush: everything so far is decodable, the stream stays open
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, brotli: Any, quality: int) -> None:
+        self._c = brotli.Compressor(quality=quality)
+
+    def process(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class CompressionMiddleware:
+    """gzip/brotli response compression for bodies of at least ``minimum_size`` bytes.
+
+    Brotli is used when the ``brotli`` package is installed and the client prefers it.
+    Streaming responses are compressed chunk by chunk with a flush after each one, so
+    the client sees data as it is produced. Responses that carry a Content-Encoding, a
+    Content-Range, or a type from ``excluded_types`` pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        excluded_types: tuple[str, ...] = EXCLUDED_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_types = excluded_types
+        self._brotli = _load_brotli()
+
+    def _coding(self, scope: Scope) -> str | None:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if self._brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = self._coding(scope)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: _Gzip | _Brotli | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").lower()
+                if (
+                    "content-encoding" in headers
+                    or "content-range" in headers
+                    or message["status"] in (204, 206, 304)
+                    or media_type.startswith(self.excluded_types)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # held until the first body chunk decides
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body: bytes = message.get("body", b"")
+            more_body: bool = message.get("more_body", False)
+            if compressor is None:
+                assert start is not None
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Brotli(self._brotli, self.brotli_quality) if coding == "br" else _Gzip(self.gzip_level)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # the bytes differ from the identity representation
+                    headers["ETag"] = f"W/{etag}"
+                if not more_body:
+                    out = compressor.process(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(out))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": out})
+                    return
+                del headers["Content-Length"]
+                await send(start)
+
+            if more_body:
+                out = compressor.process(body) + compressor.flush()
+            else:
+                out = compressor.process(body) + compressor.finish()
+            await send({"type": "http.response.body", "body": out, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, Request, Response
+
+from infra.cache.rate_limit import RULES, RateLimit, limiter
+
+
+async def telegram_key(request: Request) -> str:
+    """``telegram_id`` from the query or a JSON body, else the client address."""
+    tid = request.query_params.get("telegram_id")
+    if not tid and "application/json" in (request.headers.get("content-type") or ""):
+        try:
+            body = await request.json()  # cached by Starlette, the endpoint reuses it
+            tid = body.get("telegram_id") if isinstance(body, dict) else None
+        except Exception:
+            tid = None
+    if tid:
+        return f"tg:{tid}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(
+    rule: RateLimit | str, key: Callable[[Request], Awaitable[str]] = telegram_key, cost: int = 1
+) -> Callable[[Request, Response], Awaitable[None]]:
+    """FastAPI dependency: consume ``cost`` from ``rule`` before the endpoint body runs, 429 when exhausted."""
+    r = RULES[rule] if isinstance(rule, str) else rule
+
+    async def dependency(request: Request, response: Response) -> None:
+        decision = await limiter.hit(r, await key(request), cost)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=r.error_code,
+                headers={"Retry-After": str(max(1, decision.retry_after_sec))},
+            )
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+
+    return dependency
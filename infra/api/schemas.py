@@ -61,6 +61,7 @@ class NormalizedItem(BaseModel):
     carb_g: float = Field(..., ge=0)
     confidence: float | None = None
     assumptions: list[str] | None = None
+    warnings: list[str] | None = None  # allergen/diet warnings for the requesting user
 
 
 class NormalizeInput(BaseModel):
@@ -74,9 +75,11 @@ class NormalizeResponse(BaseModel):
     items: list[NormalizedItem]
     needs_clarification: bool = False
     clarifications: list[str] | None = None
+    tier: str | None = None  # cache | llm | llm_cheap | cache_nearest | heuristic
 
 
 class MealItemIn(BaseModel):
+    id: int | None = None  # existing item id on update; omitted for new items
     name: str
     unit: Literal["g", "ml", "piece"]
     amount: float = Field(..., gt=0)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from infra.api.compression import accepted_encodings
+
+
+# Telegram WebApp: scripts from telegram.org, images from its CDN, everything else same-origin
+SECURITY_HEADERS = {
+    "Content-Security-Policy": (
+        "default-src 'self'; "
+        "img-src 'self' data: blob: https://*.telegram.org; "
+        "script-src 'self' 'unsafe-inline' https://telegram.org https://*.telegram.org; "
+        "style-src 'self' 'unsafe-inline'; "
+        "connect-src 'self' https://*.telegram.org; "
+        "font-src 'self' data:; "
+        "object-src 'none'"
+    ),
+    "X-Content-Type-Options": "nosniff",
+    "Referrer-Policy": "no-referrer",
+    "Permissions-Policy": "camera=(), microphone=(), geolocation=()",
+}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# index.html must never be stale in Telegram WebView: it names the current hashed bundles
+NO_STORE = "no-store, no-cache, must-revalidate, max-age=0"
+REVALIDATE = "public, no-cache"
+
+# Vite output: assets/<name>-<hash>.<ext>; the hash changes whenever the content does
+_HASHED_RE = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+# preference order when the client accepts several
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class _Variant:
+    path: str
+    stat: os.stat_result
+    etag: str
+
+
+@dataclass
+class _Asset:
+    media_type: str
+    cache_control: str
+    identity: _Variant
+    encoded: dict[str, _Variant] = field(default_factory=dict)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {t.strip().removeprefix("W/") for t in header.split(",")}
+
+
+class WebAppStatic:
+    """ASGI app serving the built WebApp (``webapp/dist``) with precompressed variants.
+
+    The directory is indexed once at construction: content hash ETags, the ``.br``/``.gz``
+    files written by ``npm run build`` (webapp/scripts/precompress.mjs) and the cache policy
+    per file, so a request is a dict lookup plus sendfile. Hashed assets are ``immutable``
+    for a year, ``index.html`` is ``no-store``, anything else revalidates via ETag/304.
+    The Telegram WebApp CSP and friends go on every response of this app, and only here.
+    Rebuilding ``dist`` requires a restart to be picked up.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory).resolve()
+        self._assets: dict[str, _Asset] = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith((".br", ".gz")):
+                    continue
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                self._assets[rel] = self._index(rel, full)
+
+    @staticmethod
+    def _index(rel: str, full: str) -> _Asset:
+        with open(full, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:20]
+        media_type = mimetypes.guess_type(full)[0] or "application/octet-stream"
+        if media_type == "text/html":
+            cache_control = NO_STORE
+        elif _HASHED_RE.match(rel):
+            cache_control = IMMUTABLE
+        else:
+            cache_control = REVALIDATE
+        asset = _Asset(media_type, cache_control, _Variant(full, os.stat(full), f'"{digest}"'))
+        for coding, suffix in _ENCODINGS:
+            if os.path.isfile(full + suffix):
+                asset.encoded[coding] = _Variant(full + suffix, os.stat(full + suffix), f'"{digest}-{coding}"')
+        return asset
+
+    def _lookup(self, path: str) -> _Asset | None:
+        rel = path.lstrip("/")
+        if rel == "" or rel.endswith("/"):
+            rel += "index.html"
+        return self._assets.get(rel) or self._assets.get(rel + "/index.html")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        response = self._respond(scope)
+        response.headers.update(SECURITY_HEADERS)
+        await response(scope, receive, send)
+
+    def _respond(self, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        asset = self._lookup(path)
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        req = Headers(scope=scope)
+        accepted = accepted_encodings(req.get("accept-encoding", ""))
+        coding, variant = None, asset.identity
+        for name, _ in _ENCODINGS:
+            if name in accepted and name in asset.encoded:
+                coding, variant = name, asset.encoded[name]
+                break
+
+        headers = {"ETag": variant.etag, "Cache-Control": asset.cache_control}
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+        if asset.cache_control == NO_STORE:
+            headers.update({"Pragma": "no-cache", "Expires": "0"})
+        if _etag_matches(req.get("if-none-match"), variant.etag):
+            return Response(status_code=304, headers=headers)
+        if coding:
+            headers["Content-Encoding"] = coding
+        return FileResponse(variant.path, headers=headers, media_type=asset.media_type, stat_result=variant.stat)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class DiskLRU:
+    """Size-bounded file cache for immutable blobs (image derivatives), evicting least recently used.
+
+    Entries are files named by the SHA-1 of their key; the recency order lives in memory and is
+    seeded from file mtimes, so a restart keeps the cache warm. Safe to share between threads.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] | None = None  # file name -> size, oldest first
+        self._total = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name[:2], name)
+
+    def _load(self) -> OrderedDict[str, int]:
+        # first use: index what a previous process left behind
+        if self._entries is None:
+            found: list[tuple[float, str, int]] = []
+            os.makedirs(self.directory, exist_ok=True)
+            for root, _, files in os.walk(self.directory):
+                for f in files:
+                    if f.endswith(".tmp"):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(root, f))
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, f, st.st_size))
+            self._entries = OrderedDict((f, size) for _, f, size in sorted(found))
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get_sync(self, key: str) -> bytes | None:
+        name = self._name(key)
+        with self._lock:
+            entries = self._load()
+            if name not in entries:
+                return None
+            entries.move_to_end(name)
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._total -= entries.pop(name, 0)
+            return None
+
+    def put_sync(self, key: str, data: bytes) -> None:
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+        name = self._name(key)
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        evict: list[str] = []
+        with self._lock:
+            entries = self._load()
+            self._total += len(data) - entries.pop(name, 0)
+            entries[name] = len(data)
+            while self._total > self.max_bytes and len(entries) > 1:
+                old, size = entries.popitem(last=False)
+                self._total -= size
+                evict.append(old)
+        for old in evict:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self.put_sync, key, data)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Literal
+from uuid import uuid4
+
+import structlog
+
+from core.config import settings
+from infra.cache.redis import redis_client
+
+
+log = structlog.get_logger("rate_limit")
+
+# One round trip, atomic: check and consume happen in the same script, so concurrent callers
+# can never overshoot. Time comes from the Redis server, not from each app process.
+# KEYS[1] = limiter key; ARGV = algorithm, limit, window_ms, cost, unique member
+# Returns {allowed (0/1), remaining, retry_after_ms}.
+_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+if ARGV[1] == 'sliding' then
+  redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+  local used = redis.call('ZCARD', KEYS[1])
+  if used + cost > limit then
+    local retry = window
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if oldest[2] then retry = tonumber(oldest[2]) + window - now end
+    return {0, math.max(0, limit - used), retry}
+  end
+  for i = 1, cost do
+    redis.call('ZADD', KEYS[1], now, ARGV[5] .. ':' .. i)
+  end
+  redis.call('PEXPIRE', KEYS[1], window)
+  return {1, limit - used - cost, 0}
+end
+local rate = limit / window
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or limit
+local ts = tonumber(b[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = math.ceil((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), retry}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """``limit`` units per ``window_sec``: a sliding-window log (exact, one ZSET entry per unit)
+    or a token bucket (capacity ``limit``, refilled continuously; allows bursts)."""
+
+    name: str
+    limit: int
+    window_sec: float
+    algorithm: Literal["sliding", "bucket"] = "sliding"
+    error_code: str = "E_RATE_LIMIT"
+
+
+@dataclass(frozen=True, slots=True)
+class RateDecision:
+    allowed: bool
+    remaining: int
+    retry_after_sec: int = 0
+
+
+class RateLimiter:
+    def __init__(self, client=None) -> None:  # type: ignore[no-untyped-def]
+        self._client = client or redis_client
+        self._script = self._client.register_script(_LUA)
+
+    async def hit(self, rule: RateLimit, key: str | int, cost: int = 1) -> RateDecision:
+        """Consume ``cost`` units for ``key``; fails open (allowed) when Redis is unavailable."""
+        if rule.limit <= 0:
+            return RateDecision(allowed=True, remaining=0)
+        try:
+            allowed, remaining, retry_ms = await self._script(
+                keys=[f"rl:{rule.name}:{key}"],
+                args=[rule.algorithm, rule.limit, int(rule.window_sec * 1000), cost, uuid4().hex],
+            )
+        except Exception as e:
+            log.warning("rate_limit_unavailable", rule=rule.name, error=str(e))
+            return RateDecision(allowed=True, remaining=rule.limit)
+        return RateDecision(
+            allowed=bool(int(allowed)),
+            remaining=max(0, int(remaining)),
+            retry_after_sec=math.ceil(int(retry_ms) / 1000) if int(retry_ms) > 0 else 0,
+        )
+
+
+# Expensive features, checked before any preprocessing or provider call
+RULES: dict[str, RateLimit] = {
+    "vision": RateLimit("vision", settings.vision_daily_limit, 24 * 3600, "sliding", "E_VISION_LIMIT"),
+    "normalize": RateLimit("normalize", settings.rate_limit_normalize_per_min, 60, "bucket"),
+    "coach": RateLimit("coach", settings.rate_limit_coach_per_min, 60, "bucket"),
+    "stt": RateLimit("stt", settings.rate_limit_stt_per_min, 60, "bucket"),
+}
+
+limiter = RateLimiter()
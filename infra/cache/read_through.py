@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable
+
+from core.config import settings
+from infra.cache.redis import pipeline, redis_client
+
+
+_MISSING = object()
+
+
+class ReadThroughCache:
+    """Two-level cache (process LRU → Redis → loader) for small JSON-serializable rows.
+
+    ``None`` is cached as well, so "no row yet" does not hit the database every time.
+    Writers call :meth:`put` with the fresh value (write-through) or :meth:`invalidate`.
+    The LRU keeps the serialized form, so callers may freely mutate what they get back.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl_sec: int | None = None,
+        local_ttl_sec: float | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl_sec = ttl_sec if ttl_sec is not None else settings.entity_cache_ttl_sec
+        self.local_ttl_sec = local_ttl_sec if local_ttl_sec is not None else settings.entity_cache_local_ttl_sec
+        self.max_entries = max_entries if max_entries is not None else settings.entity_cache_lru_size
+        self._lru: OrderedDict[Any, tuple[float, str]] = OrderedDict()
+
+    def _key(self, key: Any) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def _local_get(self, key: Any) -> str | None:
+        hit = self._lru.get(key)
+        if hit is None:
+            return None
+        expires, raw = hit
+        if expires < time.monotonic():
+            self._lru.pop(key, None)
+            return None
+        self._lru.move_to_end(key)
+        return raw
+
+    def _local_put(self, key: Any, raw: str) -> None:
+        if self.local_ttl_sec <= 0 or self.max_entries <= 0:
+            return
+        self._lru[key] = (time.monotonic() + self.local_ttl_sec, raw)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        raw = self._local_get(key)
+        if raw is not None:
+            return json.loads(raw)
+        try:
+            raw = await redis_client.get(self._key(key))
+        except Exception:
+            raw = None
+        if raw is not None:
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = _MISSING
+            if value is not _MISSING:
+                self._local_put(key, raw)
+                return value
+        value = await loader()
+        await self.put(key, value)
+        return value
+
+    async def get_many(
+        self, keys: Iterable[Any], loader: Callable[[list[Any]], Awaitable[dict[Any, Any]]]
+    ) -> dict[Any, Any]:
+        """Batch :meth:`get`: one MGET for the LRU misses, one ``loader(missing)`` call for the rest.
+
+        ``loader`` returns a dict; keys it leaves out are cached as ``None``.
+        """
+        out: dict[Any, Any] = {}
+        pending: list[Any] = []
+        for key in dict.fromkeys(keys):
+            raw = self._local_get(key)
+            if raw is not None:
+                out[key] = json.loads(raw)
+            else:
+                pending.append(key)
+        if not pending:
+            return out
+        try:
+            raws = await redis_client.mget([self._key(k) for k in pending])
+        except Exception:
+            raws = [None] * len(pending)
+        missing: list[Any] = []
+        for key, raw in zip(pending, raws):
+            try:
+                out[key] = json.loads(raw) if raw is not None else _MISSING
+            except ValueError:
+                out[key] = _MISSING
+            if out[key] is _MISSING:
+                missing.append(key)
+            else:
+                self._local_put(key, raw)
+        if missing:
+            loaded = await loader(missing)
+            try:
+                async with pipeline() as pipe:
+                    for key in missing:
+                        raw = json.dumps(loaded.get(key), ensure_ascii=False, default=str)
+                        self._local_put(key, raw)
+                        pipe.setex(self._key(key), self.ttl_sec, raw)
+                        out[key] = loaded.get(key)
+                    await pipe.execute()
+            except Exception:
+                for key in missing:
+                    out[key] = loaded.get(key)
+        return out
+
+    async def put(self, key: Any, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False, default=str)
+        self._local_put(key, raw)
+        try:
+            await redis_client.setex(self._key(key), self.ttl_sec, raw)
+        except Exception:
+            pass
+
+    async def invalidate(self, key: Any) -> None:
+        self._lru.pop(key, None)
+        try:
+            await redis_client.delete(self._key(key))
+        except Exception:
+            pass
+
+    def clear_local(self) -> None:
+        self._lru.clear()
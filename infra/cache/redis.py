@@ -1,10 +1,44 @@
 from __future__ import annotations
 
+from typing import Any
+
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 
 from core.config import settings
 
 
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+def _pool(**overrides: Any) -> redis.BlockingConnectionPool:
+    # Explicit limits instead of redis-py defaults (unbounded pool, no socket timeouts):
+    # a stalled Redis must fail fast, since every caller treats it as best-effort.
+    # Blocking pool: at the cap a caller waits up to REDIS_POOL_TIMEOUT_SEC for a free
+    # connection; the plain pool raises "Too many connections" outside the command retry.
+    options: dict[str, Any] = dict(
+        decode_responses=True,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout_sec,
+        socket_timeout=settings.redis_socket_timeout_sec,
+        socket_connect_timeout=settings.redis_connect_timeout_sec,
+        socket_keepalive=True,
+        health_check_interval=settings.redis_health_check_interval_sec,
+        retry=Retry(ExponentialBackoff(cap=0.5, base=0.02), settings.redis_retries),
+        retry_on_error=[RedisConnectionError, RedisTimeoutError],
+    )
+    options.update(overrides)
+    return redis.BlockingConnectionPool.from_url(settings.redis_url, **options)
+
+
+# str in/out: counters, JSON documents, hashes
+redis_client = redis.Redis(connection_pool=_pool())
+
 
+def pipeline(*, transaction: bool = False) -> Pipeline:
+    """Queue commands and send them in one round trip with ``await pipe.execute()``.
 
+    ``transaction=True`` wraps the batch in MULTI/EXEC so other clients never see it half applied.
+    Use as ``async with pipeline() as pipe:`` to return the connection even if execute() is skipped.
+    """
+    return redis_client.pipeline(transaction=transaction)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import structlog
+
+from core.config import settings
+from infra.cache.redis import pipeline, redis_client
+
+
+log = structlog.get_logger("cost_governor")
+
+# Degradation levels; each feature maps them to its own tiers
+FULL = 0  # best model, full-size inputs
+REDUCED = 1  # cheaper model / smaller images, cached nearest matches first
+LOCAL = 2  # no provider calls: caches and local heuristics only
+
+# Features whose spend is rolled up by infra.ledger (ledger:{day}:feature:{feature})
+FEATURES = ("normalize", "vision", "coach", "stt", "tts")
+
+# Which tier answered, per feature (see note_tier)
+TIER_KEY = "metrics:tier:{feature}:{tier}"
+
+# The fleet-wide total changes slowly and is read on every request: keep it per process briefly
+_GLOBAL_TTL_SEC = 5.0
+_global_cache: tuple[float, str, float] | None = None  # (read at, day, spend)
+
+
+@dataclass(frozen=True, slots=True)
+class Budget:
+    level: int
+    user_spend_usd: float
+    global_spend_usd: float
+
+    @property
+    def allows_llm(self) -> bool:
+        return self.level < LOCAL
+
+
+def _level(spend: float, soft: float, hard: float) -> int:
+    if hard > 0 and spend >= hard:
+        return LOCAL
+    if soft > 0 and spend >= soft:
+        return REDUCED
+    return FULL
+
+
+async def _global_spend(day: str) -> float:
+    global _global_cache
+    now = time.monotonic()
+    if _global_cache is not None and _global_cache[1] == day and now - _global_cache[0] < _GLOBAL_TTL_SEC:
+        return _global_cache[2]
+    pipe = pipeline()
+    for feature in FEATURES:
+        pipe.hget(f"ledger:{day}:feature:{feature}", "cost_usd")
+    spend = sum(float(v or 0.0) for v in await pipe.execute())
+    _global_cache = (now, day, spend)
+    return spend
+
+
+async def _user_spend(day: str, user_id: int) -> float:
+    data = await redis_client.hgetall(f"ledger:{day}:user:{user_id}")
+    return sum(float(v or 0.0) for k, v in data.items() if k.endswith("cost_usd"))
+
+
+async def budget_for(user_id: int | None) -> Budget:
+    """Today's (UTC, like the ledger rollups) spend for the user and the fleet, mapped to a level.
+
+    Counters lag by up to one ledger flush; Redis errors mean FULL (spend is never a reason to fail a request).
+    """
+    day = datetime.now(timezone.utc).date().isoformat()
+    try:
+        global_spend = await _global_spend(day)
+        user_spend = await _user_spend(day, user_id) if user_id is not None else 0.0
+    except Exception as e:
+        log.warning("cost_governor_unavailable", error=str(e))
+        return Budget(level=FULL, user_spend_usd=0.0, global_spend_usd=0.0)
+    level = max(
+        _level(user_spend, settings.cost_user_daily_soft_usd, settings.cost_user_daily_hard_usd),
+        _level(global_spend, settings.cost_global_daily_soft_usd, settings.cost_global_daily_hard_usd),
+    )
+    return Budget(level=level, user_spend_usd=user_spend, global_spend_usd=global_spend)
+
+
+async def note_tier(feature: str, tier: str) -> None:
+    """Count which tier answered (metrics:tier:{feature}:{tier})."""
+    try:
+        await redis_client.incr(TIER_KEY.format(feature=feature, tier=tier))
+    except Exception:
+        pass
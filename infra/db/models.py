@@ -90,6 +90,20 @@ class Weight(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
 
+class BodyFat(Base):
+    __tablename__ = "bodyfat"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date"),
+        CheckConstraint("percent > 0 AND percent < 100", name="ck_bodyfat_percent_range"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    date: Mapped[date] = mapped_column(Date, index=True)
+    percent: Mapped[float] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+
+
 class MealTypeEnum(PyEnum):
     breakfast = "breakfast"
     lunch = "lunch"
@@ -103,32 +117,55 @@ class MealStatusEnum(PyEnum):
 
 
 class Meal(Base):
+    """Partitioned by month on ``at`` (migration 0005); the primary key is therefore (id, at)."""
+
     __tablename__ = "meals"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigInteger, sa.Sequence("meals_id_seq"), primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
-    at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
     type: Mapped[str] = mapped_column(SAEnum(MealTypeEnum, name="meal_type"))
     status: Mapped[str] = mapped_column(SAEnum(MealStatusEnum, name="meal_status"), server_default=text("'draft'"))
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
-    # Idempotency / source binding
+
+    __table_args__ = (
+        Index("ix_meals_user_at", "user_id", "at"),
+        Index("ix_meals_at_brin", "at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (at)"},
+    )
+
+
+class MealSource(Base):
+    """Idempotency / source binding of a meal (kept out of the partitioned table so it stays unique per user)."""
+
+    __tablename__ = "meal_sources"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    meal_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    meal_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     source_chat_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     source_message_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     source_update_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
 
     __table_args__ = (
-        Index("ix_meals_user_at", "user_id", "at"),
-        UniqueConstraint("user_id", "source_update_id", name="uq_meals_user_update", deferrable=True, initially="IMMEDIATE"),
-        UniqueConstraint("user_id", "source_chat_id", "source_message_id", name="uq_meals_user_chat_msg", deferrable=True, initially="IMMEDIATE"),
+        sa.ForeignKeyConstraint(
+            ["meal_id", "meal_at"], ["meals.id", "meals.at"], ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        UniqueConstraint("user_id", "source_update_id", name="uq_meal_sources_user_update", deferrable=True, initially="IMMEDIATE"),
+        UniqueConstraint("user_id", "source_chat_id", "source_message_id", name="uq_meal_sources_user_chat_msg", deferrable=True, initially="IMMEDIATE"),
     )
 
 
 class MealItem(Base):
+    """Partitioned like ``meals``; ``at`` is the owning meal's time (kept in sync by ON UPDATE CASCADE)."""
+
     __tablename__ = "meal_items"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    meal_id: Mapped[int] = mapped_column(ForeignKey("meals.id", ondelete="CASCADE"), index=True)
+    id: Mapped[int] = mapped_column(BigInteger, sa.Sequence("meal_items_id_seq"), primary_key=True)
+    meal_id: Mapped[int] = mapped_column(BigInteger)
+    at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
     name: Mapped[str] = mapped_column(Text)
     amount: Mapped[float] = mapped_column(Float)
     unit: Mapped[str] = mapped_column(String(16))  # g|ml|piece
@@ -141,19 +178,22 @@ class MealItem(Base):
     deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     __table_args__ = (
+        sa.ForeignKeyConstraint(["meal_id", "at"], ["meals.id", "meals.at"], ondelete="CASCADE", onupdate="CASCADE"),
         CheckConstraint("amount > 0", name="ck_meal_items_amount_positive"),
         CheckConstraint("kcal >= 0 AND protein_g >= 0 AND fat_g >= 0 AND carb_g >= 0", name="ck_meal_items_macros_nonneg"),
         Index("ix_meal_items_meal_id", "meal_id"),
+        Index("ix_meal_items_at_brin", "at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (at)"},
     )
 
 
 class Image(Base):
     __tablename__ = "images"
-    __table_args__ = (UniqueConstraint("sha256"),)
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    meal_id: Mapped[Optional[int]] = mapped_column(ForeignKey("meals.id", ondelete="SET NULL"), nullable=True)
+    # no FK: meals is partitioned; trg_meals_clear_refs nulls this when the meal is deleted
+    meal_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     object_key: Mapped[str] = mapped_column(String(512))
     width: Mapped[int] = mapped_column(Integer)
     height: Mapped[int] = mapped_column(Integer)
@@ -161,7 +201,12 @@ class Image(Base):
     sha256: Mapped[str] = mapped_column(String(64))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
-    __table_args__ = (Index("ix_images_user_created", "user_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_images_user_created", "user_id", "created_at"),
+        # dedupe is per user (0009); the plain sha256 index finds identical images across users
+        Index("ix_images_user_sha256", "user_id", "sha256", unique=True),
+        Index("ix_images_sha256", "sha256"),
+    )
 
 
 class VisionInference(Base):
@@ -171,11 +216,21 @@ class VisionInference(Base):
     image_id: Mapped[int] = mapped_column(ForeignKey("images.id", ondelete="CASCADE"))
     provider: Mapped[str] = mapped_column(String(64))
     model: Mapped[str] = mapped_column(String(64))
-    response: Mapped[dict] = mapped_column(JSONB)
+    # full provider payload while recent; NULL once compacted (raw copy lives at archive_key)
+    response: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # hot columns: what the app reads, kept after compaction
+    items: Mapped[Optional[list]] = mapped_column(JSONB, nullable=True)
+    quality: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    needs_clarification: Mapped[Optional[bool]] = mapped_column(sa.Boolean, nullable=True)
+    compacted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    archive_key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
-    __table_args__ = (Index("ix_vision_inferences_image_created", "image_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_vision_inferences_image_created", "image_id", "created_at"),
+        Index("ix_vision_inferences_pending_compaction", "created_at", postgresql_where=text("compacted_at IS NULL")),
+    )
 
 
 class LLMInference(Base):
@@ -183,17 +238,27 @@ class LLMInference(Base):
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    meal_id: Mapped[Optional[int]] = mapped_column(ForeignKey("meals.id", ondelete="SET NULL"), nullable=True)
+    meal_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)  # see Image.meal_id
     provider: Mapped[str] = mapped_column(String(64))
     model: Mapped[str] = mapped_column(String(64))
-    purpose: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    purpose: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # ledger feature: normalize, vision, coach, stt, tts
+    # prompt/response are dropped on compaction; the raw pair is kept at archive_key
     prompt: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    response: Mapped[dict] = mapped_column(JSONB)
+    response: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     input_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     output_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    latency_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    cost_usd: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    ok: Mapped[bool] = mapped_column(sa.Boolean, server_default=text("true"))
+    compacted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    archive_key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
-    __table_args__ = (Index("ix_llm_inferences_user_created", "user_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_llm_inferences_user_created", "user_id", "created_at"),
+        Index("ix_llm_inferences_purpose_created", "purpose", "created_at"),
+        Index("ix_llm_inferences_pending_compaction", "created_at", postgresql_where=text("compacted_at IS NULL")),
+    )
 
 
 class DailySummary(Base):
@@ -236,7 +301,9 @@ class DiaryDay(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     date: Mapped[date] = mapped_column(Date)
     data: Mapped[dict] = mapped_column(JSONB)  # snapshot of meals/items for the day
+    etag: Mapped[Optional[str]] = mapped_column(String(40), nullable=True)  # hash of data, for If-None-Match
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
 
 class UserSettings(Base):
@@ -249,6 +316,28 @@ class UserSettings(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
 
+class Favorite(Base):
+    __tablename__ = "favorites"
+    __table_args__ = (
+        Index("uq_favorites_user_item", "user_id", "name", "unit", "amount", "kcal", unique=True),
+        # quick-add ranking: most used first, then most recently used
+        Index("ix_favorites_user_rank", "user_id", sa.text("use_count DESC"), sa.text("last_used_at DESC NULLS LAST")),
+    )
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)  # opaque id exposed to the WebApp
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    name: Mapped[str] = mapped_column(Text)
+    unit: Mapped[str] = mapped_column(String(16), server_default=text("'g'"))
+    amount: Mapped[float] = mapped_column(Float)
+    kcal: Mapped[float] = mapped_column(Float)
+    protein_g: Mapped[float] = mapped_column(Float, server_default=text("0"))
+    fat_g: Mapped[float] = mapped_column(Float, server_default=text("0"))
+    carb_g: Mapped[float] = mapped_column(Float, server_default=text("0"))
+    use_count: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    last_used_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+
+
 class CoachSession(Base):
     __tablename__ = "coach_sessions"
 
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+
+
+# Months (UTC) this process has already seen covered; partitions are never dropped at runtime
+_known_months: set[date] = set()
+
+_ENSURE = text("SELECT ensure_meal_partitions(:lo, :hi)")
+
+
+def _month(dt: datetime) -> date:
+    # naive values are read as local time, the same way asyncpg encodes them for timestamptz
+    utc = dt.astimezone(timezone.utc)
+    return date(utc.year, utc.month, 1)
+
+
+def _months(start: date, end: date) -> list[date]:
+    out: list[date] = []
+    cur = start
+    while cur <= end:
+        out.append(cur)
+        cur = date(cur.year + cur.month // 12, cur.month % 12 + 1, 1)
+    return out
+
+
+async def ensure_meal_partitions(engine: AsyncEngine, start: datetime, end: datetime | None = None) -> int:
+    """Make sure monthly meals/meal_items partitions cover [start, end]; returns how many were created.
+
+    Runs in its own short transaction (partition DDL locks the parent tables), so call it
+    before the caller's transaction touches ``meals``. Free when the months are already known.
+    """
+    months = _months(_month(start), _month(end or start))
+    if all(m in _known_months for m in months):
+        return 0
+    lo = datetime(months[0].year, months[0].month, 1, tzinfo=timezone.utc)
+    hi = datetime(months[-1].year, months[-1].month, 1, tzinfo=timezone.utc)
+    async with engine.begin() as conn:
+        await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        created = (await conn.execute(_ENSURE, {"lo": lo, "hi": hi})).scalar_one()
+    _known_months.update(months)
+    return int(created or 0)
+
+
+async def ensure_future_meal_partitions(engine: AsyncEngine) -> int:
+    """Startup hook: current month plus MEAL_PARTITIONS_AHEAD_MONTHS."""
+    now = datetime.now(timezone.utc)
+    years, month0 = divmod(now.month - 1 + max(0, settings.meal_partitions_ahead_months), 12)
+    return await ensure_meal_partitions(engine, now, datetime(now.year + years, month0 + 1, 1, tzinfo=timezone.utc))
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infra.db.models import BodyFat
+
+
+class BodyFatRepo:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def upsert(self, *, user_id: int, on_date: date, percent: float, autocommit: bool = True) -> None:
+        stmt = pg_insert(BodyFat).values(user_id=user_id, date=on_date, percent=percent)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BodyFat.user_id, BodyFat.date],
+            set_={"percent": percent},
+        )
+        await self.session.execute(stmt)
+        if autocommit:
+            await self.session.commit()
+
+    async def get_last(self, *, user_id: int) -> dict | None:
+        stmt = (
+            select(BodyFat.date, BodyFat.percent)
+            .where(BodyFat.user_id == user_id)
+            .order_by(BodyFat.date.desc())
+            .limit(1)
+        )
+        res = await self.session.execute(stmt)
+        row = res.first()
+        return {"date": row[0].isoformat(), "percent": float(row[1])} if row else None
+
+    async def list_between(self, *, user_id: int, start: date, end: date) -> list[dict]:
+        stmt = (
+            select(BodyFat.date, BodyFat.percent)
+            .where(BodyFat.user_id == user_id, BodyFat.date >= start, BodyFat.date <= end)
+            .order_by(BodyFat.date.asc())
+        )
+        res = await self.session.execute(stmt)
+        return [{"date": d.isoformat(), "percent": float(p)} for d, p in res.all()]
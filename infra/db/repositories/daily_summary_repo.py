@@ -1,14 +1,41 @@
 from __future__ import annotations
 
-from datetime import date as Date
+from datetime import date as Date, datetime
 
-from sqlalchemy import insert, select
+from sqlalchemy import func, insert, select, text, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from infra.db.models import DailySummary
 
 
+# Totals of every local day in [start, end] recomputed from meal_items in one statement;
+# rows already equal are left alone so a clean day costs no write.
+_RECONCILE_UPSERT = text(
+    "INSERT INTO daily_summaries (user_id, date, kcal, protein_g, fat_g, carb_g) "
+    "SELECT CAST(:user_id AS bigint), d, kcal, protein_g, fat_g, carb_g FROM ("
+    " SELECT CAST(timezone(CAST(:tz AS text), m.at) AS date) AS d,"
+    "  coalesce(sum(i.kcal), 0) AS kcal, coalesce(sum(i.protein_g), 0) AS protein_g,"
+    "  coalesce(sum(i.fat_g), 0) AS fat_g, coalesce(sum(i.carb_g), 0) AS carb_g"
+    " FROM meals m JOIN meal_items i ON i.meal_id = m.id AND i.at = m.at"
+    " WHERE m.user_id = :user_id AND m.at >= :start AND m.at <= :end AND i.at >= :start AND i.at <= :end"
+    " GROUP BY 1"
+    ") s "
+    "ON CONFLICT (user_id, date) DO UPDATE SET kcal = EXCLUDED.kcal, protein_g = EXCLUDED.protein_g,"
+    " fat_g = EXCLUDED.fat_g, carb_g = EXCLUDED.carb_g "
+    "WHERE (daily_summaries.kcal, daily_summaries.protein_g, daily_summaries.fat_g, daily_summaries.carb_g)"
+    " IS DISTINCT FROM (EXCLUDED.kcal, EXCLUDED.protein_g, EXCLUDED.fat_g, EXCLUDED.carb_g)"
+)
+# Days whose meals are all gone but whose row still carries totals
+_RECONCILE_EMPTY = text(
+    "UPDATE daily_summaries ds SET kcal = 0, protein_g = 0, fat_g = 0, carb_g = 0 "
+    "WHERE ds.user_id = :user_id AND ds.date >= :first AND ds.date <= :last"
+    " AND (ds.kcal <> 0 OR ds.protein_g <> 0 OR ds.fat_g <> 0 OR ds.carb_g <> 0)"
+    " AND NOT EXISTS (SELECT 1 FROM meals m WHERE m.user_id = :user_id AND m.at >= :start AND m.at <= :end"
+    "  AND CAST(timezone(CAST(:tz AS text), m.at) AS date) = ds.date)"
+)
+
+
 class DailySummaryRepo:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
@@ -40,6 +67,49 @@ class DailySummaryRepo:
         if autocommit:
             await self.session.commit()
 
+    async def apply_delta(
+        self,
+        *,
+        user_id: int,
+        on_date: Date,
+        kcal: float,
+        protein_g: float,
+        fat_g: float,
+        carb_g: float,
+        autocommit: bool = True,
+    ) -> bool:
+        """Add macro deltas to an existing row; False if there is no row yet (caller recomputes)."""
+        stmt = (
+            update(DailySummary)
+            .where(DailySummary.user_id == user_id, DailySummary.date == on_date)
+            .values(
+                kcal=func.greatest(DailySummary.kcal + kcal, 0.0),
+                protein_g=func.greatest(DailySummary.protein_g + protein_g, 0.0),
+                fat_g=func.greatest(DailySummary.fat_g + fat_g, 0.0),
+                carb_g=func.greatest(DailySummary.carb_g + carb_g, 0.0),
+            )
+            .returning(DailySummary.id)
+        )
+        res = await self.session.execute(stmt)
+        found = res.first() is not None
+        if autocommit:
+            await self.session.commit()
+        return found
+
+    async def reconcile(
+        self, *, user_id: int, first: Date, last: Date, start: datetime, end: datetime, tz: str, autocommit: bool = True
+    ) -> int:
+        """Rewrite local days [first, last] (UTC bounds [start, end]) from meal_items; returns rows fixed.
+
+        Incremental writers (``apply_delta``) can drift or miss a day; this is the periodic repair.
+        """
+        params = {"user_id": user_id, "first": first, "last": last, "start": start, "end": end, "tz": tz}
+        fixed = (await self.session.execute(_RECONCILE_UPSERT, params)).rowcount or 0
+        fixed += (await self.session.execute(_RECONCILE_EMPTY, params)).rowcount or 0
+        if autocommit:
+            await self.session.commit()
+        return fixed
+
     async def get_by_user_date(self, *, user_id: int, on_date: Date) -> dict | None:
         from infra.db.models import DailySummary
         stmt = select(
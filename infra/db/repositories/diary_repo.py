@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date as Date, datetime
+from typing import Any, Iterable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infra.db.models import DiaryDay
+from infra.db.repositories.meal_repo import _MACROS, MealRepo
+
+
+TOP_ITEMS = 5
+DEFAULT_TZ = "Europe/Madrid"
+
+# Per-user writer lock for snapshots, held until the transaction ends (bigint key, no int4 overflow)
+_LOCK_USER = text("SELECT pg_advisory_xact_lock(hashtextextended('diary_days:' || CAST(:user_id AS text), 0))")
+
+
+def pick_tz(*names: str | None) -> str:
+    """First valid IANA name among ``names`` (saved setting, request param, ...), else DEFAULT_TZ."""
+    for name in names:
+        if isinstance(name, str) and name:
+            try:
+                ZoneInfo(name)
+                return name
+            except Exception:
+                continue
+    return DEFAULT_TZ
+
+
+def local_day_bounds(day: Date, tz: str) -> tuple[datetime, datetime]:
+    """UTC [start, end] of a local calendar day (end inclusive, like the other day queries)."""
+    z = ZoneInfo(tz)
+    start = datetime.combine(day, datetime.min.time()).replace(tzinfo=z)
+    end = datetime.combine(day, datetime.max.time()).replace(tzinfo=z)
+    return start.astimezone(ZoneInfo("UTC")), end.astimezone(ZoneInfo("UTC"))
+
+
+def local_days(ats: Iterable[datetime], tz: str) -> set[Date]:
+    z = ZoneInfo(tz)
+    return {at.astimezone(z).date() for at in ats}
+
+
+def etag_for(data: dict[str, Any]) -> str:
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class DiaryRepo:
+    """Per-user, per-local-day snapshot documents (meals, items, totals, top items).
+
+    Writers refresh the affected days inside their own transaction, so a snapshot is never
+    newer or older than the meals it was built from; readers get the whole day in one PK read.
+    Every path that builds and stores a snapshot takes the user's advisory lock first. Under
+    READ COMMITTED the build then reads after any concurrent writer has committed, so a snapshot
+    built from a stale read can never be stored over a fresher one.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def lock(self, *, user_id: int) -> None:
+        """Serialize snapshot writers of ``user_id`` until this transaction commits or rolls back."""
+        await self.session.execute(_LOCK_USER, {"user_id": user_id})
+
+    async def build(self, *, user_id: int, day: Date, tz: str) -> dict[str, Any]:
+        start, end = local_day_bounds(day, tz)
+        rows = await MealRepo(self.session).list_rows_between(user_id=user_id, start=start, end=end)
+        totals = {k: 0.0 for k in _MACROS}
+        by_name: dict[str, float] = {}
+        for row in rows:
+            for it in row.items:
+                for k in _MACROS:
+                    totals[k] += float(it[k] or 0.0)
+                by_name[it["name"]] = by_name.get(it["name"], 0.0) + float(it["kcal"] or 0.0)
+        top = sorted(by_name.items(), key=lambda kv: kv[1], reverse=True)[:TOP_ITEMS]
+        return {
+            "date": day.isoformat(),
+            "tz": tz,
+            "meals": [r.as_dict() for r in rows],
+            "totals": totals,
+            "top_items": [{"name": n, "kcal": k} for n, k in top],
+        }
+
+    async def get(self, *, user_id: int, day: Date) -> tuple[dict[str, Any], str] | None:
+        res = await self.session.execute(
+            select(DiaryDay.data, DiaryDay.etag).where(DiaryDay.user_id == user_id, DiaryDay.date == day)
+        )
+        row = res.first()
+        if row is None or row[0] is None:
+            return None
+        return row[0], row[1] or etag_for(row[0])
+
+    async def existing(self, keys: Iterable[tuple[int, Date]]) -> set[tuple[int, Date]]:
+        """Which of the (user_id, day) snapshots are stored, in one query."""
+        keys = list(keys)
+        if not keys:
+            return set()
+        res = await self.session.execute(
+            select(DiaryDay.user_id, DiaryDay.date).where(
+                tuple_(DiaryDay.user_id, DiaryDay.date).in_(keys), DiaryDay.data.is_not(None)
+            )
+        )
+        return {(uid, d) for uid, d in res.all()}
+
+    async def store(self, *, user_id: int, day: Date, data: dict[str, Any], autocommit: bool = True) -> str:
+        etag = etag_for(data)
+        stmt = pg_insert(DiaryDay).values(user_id=user_id, date=day, data=data, etag=etag)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DiaryDay.user_id, DiaryDay.date],
+            set_={"data": stmt.excluded.data, "etag": stmt.excluded.etag, "updated_at": func.now()},
+        )
+        await self.session.execute(stmt)
+        if autocommit:
+            await self.session.commit()
+        return etag
+
+    async def refresh(self, *, user_id: int, days: Iterable[Date], tz: str, autocommit: bool = True) -> None:
+        """Rebuild the snapshots of the given local days (call after the meal write, before commit)."""
+        await self.lock(user_id=user_id)
+        for day in sorted(set(days)):
+            data = await self.build(user_id=user_id, day=day, tz=tz)
+            await self.store(user_id=user_id, day=day, data=data, autocommit=False)
+        if autocommit:
+            await self.session.commit()
+
+    async def rebuild(self, *, user_id: int, day: Date, tz: str) -> tuple[dict[str, Any], str]:
+        """Build and store one day under the user's lock, committing (read paths: GET, cache warm-up)."""
+        await self.lock(user_id=user_id)
+        data = await self.build(user_id=user_id, day=day, tz=tz)
+        return data, await self.store(user_id=user_id, day=day, data=data)
+
+    async def invalidate_range(self, *, user_id: int, start: Date, end: Date, autocommit: bool = True) -> int:
+        """Drop snapshots in [start, end]; used by bulk writers, readers rebuild on demand."""
+        # a reader rebuilding concurrently must not store a pre-import day after this delete
+        await self.lock(user_id=user_id)
+        res = await self.session.execute(
+            delete(DiaryDay).where(DiaryDay.user_id == user_id, DiaryDay.date >= start, DiaryDay.date <= end)
+        )
+        if autocommit:
+            await self.session.commit()
+        return res.rowcount or 0
+
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infra.db.models import Favorite
+
+
+_COLUMNS = (
+    Favorite.id,
+    Favorite.name,
+    Favorite.unit,
+    Favorite.amount,
+    Favorite.kcal,
+    Favorite.protein_g,
+    Favorite.fat_g,
+    Favorite.carb_g,
+    Favorite.use_count,
+    Favorite.last_used_at,
+)
+
+
+def _to_dict(row) -> dict:  # type: ignore[no-untyped-def]
+    return {
+        "id": row.id,
+        "name": row.name,
+        "unit": row.unit,
+        "amount": float(row.amount),
+        "kcal": float(row.kcal),
+        "protein_g": float(row.protein_g),
+        "fat_g": float(row.fat_g),
+        "carb_g": float(row.carb_g),
+        "use_count": int(row.use_count),
+        "last_used_at": row.last_used_at.isoformat() if row.last_used_at else None,
+    }
+
+
+class FavoriteRepo:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def list_by_user(self, *, user_id: int, limit: int | None = None) -> list[dict]:
+        # порядок для quick-add: частые → недавние → новые; покрывается ix_favorites_user_rank
+        stmt = (
+            select(*_COLUMNS)
+            .where(Favorite.user_id == user_id)
+            .order_by(
+                Favorite.use_count.desc(),
+                Favorite.last_used_at.desc().nulls_last(),
+                Favorite.created_at.desc(),
+            )
+        )
+        if limit:
+            stmt = stmt.limit(limit)
+        res = await self.session.execute(stmt)
+        return [_to_dict(r) for r in res.all()]
+
+    async def add(
+        self,
+        *,
+        user_id: int,
+        name: str,
+        unit: str,
+        amount: float,
+        kcal: float,
+        protein_g: float = 0.0,
+        fat_g: float = 0.0,
+        carb_g: float = 0.0,
+        fav_id: str | None = None,
+        autocommit: bool = True,
+    ) -> tuple[str, bool]:
+        """Insert a favorite; returns (id, created). Exact duplicates resolve to the existing row."""
+        stmt = (
+            pg_insert(Favorite)
+            .values(
+                id=fav_id or uuid.uuid4().hex,
+                user_id=user_id,
+                name=name,
+                unit=unit,
+                amount=amount,
+                kcal=kcal,
+                protein_g=protein_g,
+                fat_g=fat_g,
+                carb_g=carb_g,
+            )
+            .on_conflict_do_nothing()
+            .returning(Favorite.id)
+        )
+        res = await self.session.execute(stmt)
+        row = res.first()
+        if row is not None:
+            if autocommit:
+                await self.session.commit()
+            return str(row[0]), True
+        existing = await self.session.execute(
+            select(Favorite.id).where(
+                Favorite.user_id == user_id,
+                Favorite.name == name,
+                Favorite.unit == unit,
+                Favorite.amount == amount,
+                Favorite.kcal == kcal,
+            )
+        )
+        found = existing.scalar_one_or_none()
+        # конфликт по первичному ключу (чужой id) — не раскрываем его
+        return (str(found) if found is not None else ""), False
+
+    async def delete(self, *, user_id: int, fav_id: str, autocommit: bool = True) -> bool:
+        res = await self.session.execute(
+            delete(Favorite).where(Favorite.user_id == user_id, Favorite.id == fav_id).returning(Favorite.id)
+        )
+        deleted = res.first() is not None
+        if autocommit:
+            await self.session.commit()
+        return deleted
+
+    async def mark_used(self, *, user_id: int, fav_id: str, autocommit: bool = True) -> int | None:
+        """Bump the usage counter; returns the new count or None if the favorite is unknown."""
+        res = await self.session.execute(
+            update(Favorite)
+            .where(Favorite.user_id == user_id, Favorite.id == fav_id)
+            .values(use_count=Favorite.use_count + 1, last_used_at=func.now())
+            .returning(Favorite.use_count)
+        )
+        row = res.first()
+        if autocommit:
+            await self.session.commit()
+        return int(row[0]) if row else None
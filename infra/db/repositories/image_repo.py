@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from typing import Any
 
-from sqlalchemy import insert, select, update
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from infra.db.models import Image
@@ -23,12 +24,13 @@ class ImageRepo:
         content_type: str,
         meal_id: int | None = None,
     ) -> int:
-        res = await self.session.execute(select(Image.id).where(Image.sha256 == sha256))
-        row = res.first()
-        if row:
-            return int(row[0])
+        """Id of the user's image with this sha256, inserting it first if new.
+
+        Race-free: the insert is the check (ON CONFLICT on ix_images_user_sha256); only a
+        concurrent duplicate falls through to the select. Images of other users are never returned.
+        """
         stmt = (
-            insert(Image)
+            pg_insert(Image)
             .values(
                 user_id=user_id,
                 meal_id=meal_id,
@@ -38,11 +40,15 @@ class ImageRepo:
                 content_type=content_type,
                 sha256=sha256,
             )
+            .on_conflict_do_nothing(index_elements=[Image.user_id, Image.sha256])
             .returning(Image.id)
         )
-        res = await self.session.execute(stmt)
+        image_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if image_id is None:
+            res = await self.session.execute(select(Image.id).where(Image.user_id == user_id, Image.sha256 == sha256))
+            image_id = res.scalar_one()
         await self.session.commit()
-        return int(res.scalar_one())
+        return int(image_id)
 
     async def attach_to_meal(self, *, image_id: int, meal_id: int) -> None:
         await self.session.execute(update(Image).where(Image.id == image_id).values(meal_id=meal_id))
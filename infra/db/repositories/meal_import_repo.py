@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterable, AsyncIterator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.meal_import import ImportRow
+from infra.db.partitions import ensure_meal_partitions
+from infra.db.repositories.diary_repo import DiaryRepo
+from infra.db.repositories.meal_repo import MealRepo
+
+
+# Staging tables live only for the importing transaction (ON COMMIT DROP, gone on rollback too)
+_CREATE_STAGING = (
+    text(
+        "CREATE TEMP TABLE meal_import_items ("
+        " grp integer NOT NULL, at timestamptz NOT NULL, meal_type text NOT NULL,"
+        " name text NOT NULL, amount double precision NOT NULL, unit text NOT NULL,"
+        " kcal double precision NOT NULL, protein_g double precision NOT NULL,"
+        " fat_g double precision NOT NULL, carb_g double precision NOT NULL"
+        ") ON COMMIT DROP"
+    ),
+    text(
+        "CREATE TEMP TABLE meal_import_meals ("
+        " grp integer PRIMARY KEY, meal_id bigint NOT NULL, at timestamptz NOT NULL, meal_type text NOT NULL"
+        ") ON COMMIT DROP"
+    ),
+)
+_STAGING_COLUMNS = ("grp", "at", "meal_type", "name", "amount", "unit", "kcal", "protein_g", "fat_g", "carb_g")
+
+# One row per meal with a pre-allocated id, so items can be joined to their meal without RETURNING round trips.
+# Exports are second-precision, so "already there" means a meal within the same second.
+_PLAN_MEALS = text(
+    "INSERT INTO meal_import_meals (grp, meal_id, at, meal_type) "
+    "SELECT s.grp, nextval(pg_get_serial_sequence('meals', 'id')), s.at, s.meal_type "
+    "FROM (SELECT DISTINCT ON (grp) grp, at, meal_type FROM meal_import_items ORDER BY grp) s "
+    "WHERE NOT CAST(:skip_existing AS boolean) OR NOT EXISTS ("
+    " SELECT 1 FROM meals m WHERE m.user_id = :user_id AND m.deleted_at IS NULL"
+    "  AND m.at >= s.at AND m.at < s.at + interval '1 second')"
+)
+_INSERT_MEALS = text(
+    "INSERT INTO meals (id, user_id, at, type, status, notes) "
+    "SELECT meal_id, CAST(:user_id AS bigint), at, CAST(meal_type AS meal_type), 'confirmed', CAST(:notes AS text) "
+    "FROM meal_import_meals ORDER BY at"
+)
+_INSERT_ITEMS = text(
+    "INSERT INTO meal_items (meal_id, at, name, amount, unit, kcal, protein_g, fat_g, carb_g, source) "
+    "SELECT g.meal_id, g.at, i.name, i.amount, i.unit, i.kcal, i.protein_g, i.fat_g, i.carb_g, 'import' "
+    "FROM meal_import_items i JOIN meal_import_meals g USING (grp)"
+)
+# Same totals as MealRepo.sum_macros_for_date, for every touched local day at once.
+# Like _RECONCILE_UPSERT: joined on (meal_id, at) with the import span (a day of tz slack each side)
+# bound on both m.at and i.at, so both partitioned tables are pruned to the imported months and
+# ix_meals_user_at does the work. GROUP BY 1 avoids repeating the tz expression.
+_RECOMPUTE_SUMMARIES = text(
+    "INSERT INTO daily_summaries (user_id, date, kcal, protein_g, fat_g, carb_g) "
+    "SELECT CAST(:user_id AS bigint), d, kcal, protein_g, fat_g, carb_g FROM ("
+    " SELECT CAST(timezone(CAST(:tz AS text), m.at) AS date) AS d,"
+    "  coalesce(sum(i.kcal), 0) AS kcal, coalesce(sum(i.protein_g), 0) AS protein_g,"
+    "  coalesce(sum(i.fat_g), 0) AS fat_g, coalesce(sum(i.carb_g), 0) AS carb_g"
+    " FROM meals m JOIN meal_items i ON i.meal_id = m.id AND i.at = m.at"
+    " WHERE m.user_id = :user_id AND m.at >= :start AND m.at <= :end AND i.at >= :start AND i.at <= :end"
+    "  AND CAST(timezone(CAST(:tz AS text), m.at) AS date) IN (SELECT DISTINCT CAST(timezone(CAST(:tz AS text), at) AS date) FROM meal_import_meals)"
+    " GROUP BY 1"
+    ") s "
+    "ON CONFLICT (user_id, date) DO UPDATE SET kcal = EXCLUDED.kcal, protein_g = EXCLUDED.protein_g,"
+    " fat_g = EXCLUDED.fat_g, carb_g = EXCLUDED.carb_g"
+)
+
+
+@dataclass(slots=True)
+class ImportStats:
+    rows: int = 0  # item rows read from the file
+    meals: int = 0  # meals created
+    items: int = 0  # meal items created
+    skipped_meals: int = 0  # meals already present in the same second (skip_existing)
+    days: int = 0  # daily_summaries rows recomputed
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "rows": self.rows,
+            "meals": self.meals,
+            "items": self.items,
+            "skipped_meals": self.skipped_meals,
+            "days": self.days,
+        }
+
+
+class MealImportRepo:
+    """Bulk meal import: COPY into temp staging tables, then a handful of set-wise statements.
+
+    Runs in the caller's transaction and does not commit unless ``autocommit``; a bad row
+    (raised by the parser while streaming) aborts the whole import.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def _driver_connection(self):  # type: ignore[no-untyped-def]
+        conn = await self.session.connection()
+        raw = await conn.get_raw_connection()
+        return raw.driver_connection  # asyncpg.Connection
+
+    async def import_rows(
+        self,
+        *,
+        user_id: int,
+        rows: AsyncIterable[ImportRow],
+        tz: str = "Europe/Madrid",
+        skip_existing: bool = True,
+        notes: str | None = "import",
+        autocommit: bool = True,
+    ) -> ImportStats:
+        stats = ImportStats()
+        groups: dict[tuple[datetime, str], int] = {}
+        span: list[datetime] = []  # [min at, max at]
+
+        async def records() -> AsyncIterator[tuple]:
+            async for r in rows:
+                meal_type = r.meal_type or MealRepo.suggest_meal_type(r.at)
+                grp = groups.setdefault((r.at, meal_type), len(groups))
+                if not span:
+                    span.extend((r.at, r.at))
+                elif r.at < span[0]:
+                    span[0] = r.at
+                elif r.at > span[1]:
+                    span[1] = r.at
+                stats.rows += 1
+                yield (grp, r.at, meal_type, r.name, r.amount, r.unit, r.kcal, r.protein_g, r.fat_g, r.carb_g)
+
+        for stmt in _CREATE_STAGING:
+            await self.session.execute(stmt)
+        driver = await self._driver_connection()
+        await driver.copy_records_to_table("meal_import_items", records=records(), columns=list(_STAGING_COLUMNS))
+        if not stats.rows:
+            if autocommit:
+                await self.session.commit()
+            return stats
+
+        # history imports may reach months without partitions; this transaction has not touched meals yet
+        await ensure_meal_partitions(self.session.bind, span[0], span[1])
+        params = {"user_id": user_id, "tz": tz, "skip_existing": skip_existing, "notes": notes}
+        planned = await self.session.execute(_PLAN_MEALS, params)
+        stats.meals = planned.rowcount or 0
+        stats.skipped_meals = len(groups) - stats.meals
+        if stats.meals:
+            await self.session.execute(_INSERT_MEALS, params)
+            stats.items = (await self.session.execute(_INSERT_ITEMS, params)).rowcount or 0
+            bounds = {"start": span[0] - timedelta(days=1), "end": span[1] + timedelta(days=1)}
+            stats.days = (await self.session.execute(_RECOMPUTE_SUMMARIES, {**params, **bounds})).rowcount or 0
+            # the diary may use another tz than the file, so drop a day of slack on both sides; GET /api/day rebuilds
+            await DiaryRepo(self.session).invalidate_range(
+                user_id=user_id,
+                start=(span[0] - timedelta(days=1)).date(),
+                end=(span[1] + timedelta(days=1)).date(),
+                autocommit=False,
+            )
+            # raw statements bypass the ORM write hook; keep read-your-writes routing correct
+            self.session.info["pending_write"] = True
+        if autocommit:
+            await self.session.commit()
+        return stats
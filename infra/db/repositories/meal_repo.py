@@ -1,12 +1,96 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from datetime import date as Date, datetime
 from typing import Any, Iterable
 
-from sqlalchemy import insert, select, delete
+from sqlalchemy import JSON, String, cast, delete, func, insert, literal_column, select, text, tuple_, type_coerce, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from infra.db.models import Meal, MealItem, MealTypeEnum
+from infra.db.models import Meal, MealItem, MealSource, MealTypeEnum
+from infra.db.partitions import ensure_meal_partitions
+
+
+_ITEM_COLUMNS = ("id", "name", "amount", "unit", "kcal", "protein_g", "fat_g", "carb_g", "source")
+_MACROS = ("kcal", "protein_g", "fat_g", "carb_g")
+
+
+def _build_meals_select():
+    # One round trip: meal columns + items aggregated in Postgres. Correlating on `at` as well
+    # prunes meal_items to the meal's partition before ix_meal_items_meal_id is used.
+    i = MealItem.__table__.alias("i")
+    items_json = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            *(arg for col in _ITEM_COLUMNS for arg in (literal_column(f"'{col}'"), i.c[col]))
+                        ),
+                        i.c.id,
+                    )
+                ),
+                text("'[]'::json"),
+            )
+        )
+        .where(i.c.meal_id == Meal.id, i.c.at == Meal.at)
+        .scalar_subquery()
+    )
+    return select(
+        Meal.id,
+        Meal.at,
+        cast(Meal.type, String).label("type"),
+        cast(Meal.status, String).label("status"),
+        Meal.notes,
+        type_coerce(items_json, JSON).label("items"),
+    )
+
+
+# built once; per-call filters are added with .where()
+_MEALS_SELECT = _build_meals_select()
+
+
+class MealRow:
+    """Compact meal row (no ORM identity map); ``items`` is already decoded from json_agg."""
+
+    __slots__ = ("id", "at", "type", "status", "notes", "items")
+
+    def __init__(self, id: int, at: datetime, type: str, status: str, notes: str | None, items: list[dict[str, Any]]) -> None:
+        self.id = id
+        self.at = at
+        self.type = type
+        self.status = status
+        self.notes = notes
+        self.items = items
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "at": self.at.isoformat(),
+            "type": self.type,
+            "status": self.status,
+            "notes": self.notes,
+            "items": self.items,
+        }
+
+
+@dataclass(slots=True)
+class MealUpdateResult:
+    """Before/after state of an updated meal, enough to adjust daily summaries without re-reading."""
+
+    prev_at: datetime
+    prev_status: str
+    at: datetime
+    status: str
+    items: list[dict[str, Any]] = field(default_factory=list)  # new item state (only when items were sent)
+    old_totals: dict[str, float] | None = None  # meal macros before the update
+    new_totals: dict[str, float] | None = None  # meal macros after the update
+
+    def delta(self) -> dict[str, float]:
+        if self.old_totals is None or self.new_totals is None:
+            return {k: 0.0 for k in _MACROS}
+        return {k: self.new_totals[k] - self.old_totals[k] for k in _MACROS}
 
 
 class MealRepo:
@@ -27,6 +111,7 @@ class MealRepo:
         source_update_id: int | None = None,
         autocommit: bool = True,
     ) -> int:
+        await ensure_meal_partitions(self.session.bind, at)
         res = await self.session.execute(
             insert(Meal)
             .values(
@@ -35,17 +120,27 @@ class MealRepo:
                 type=meal_type,
                 status=status or 'draft',
                 notes=notes,
-                source_chat_id=source_chat_id,
-                source_message_id=source_message_id,
-                source_update_id=source_update_id,
             )
-            .returning(Meal.id)
+            .returning(Meal.id, Meal.at)
         )
-        meal_id = int(res.scalar_one())
-        # bulk items
+        meal_id, meal_at = res.one()
+        if source_update_id is not None or (source_chat_id is not None and source_message_id is not None):
+            # unique per user; a replayed update/message raises IntegrityError like before
+            await self.session.execute(
+                insert(MealSource).values(
+                    user_id=user_id,
+                    meal_id=meal_id,
+                    meal_at=meal_at,
+                    source_chat_id=source_chat_id,
+                    source_message_id=source_message_id,
+                    source_update_id=source_update_id,
+                )
+            )
+        # bulk items (carry the meal's `at`: same partition, composite FK)
         values = [
             dict(
                 meal_id=meal_id,
+                at=meal_at,
                 name=i["name"],
                 amount=float(i["amount"]),
                 unit=i["unit"],
@@ -64,111 +159,52 @@ class MealRepo:
         return meal_id
 
     async def delete_meal(self, *, meal_id: int, user_id: int, autocommit: bool = True) -> None:
-        await self.session.execute(delete(MealItem).where(MealItem.meal_id == meal_id))
+        # items and source keys go through ON DELETE CASCADE on (meal_id, at), one partition each
         await self.session.execute(delete(Meal).where(Meal.id == meal_id, Meal.user_id == user_id))
         if autocommit:
             await self.session.commit()
 
+    async def _fetch(self, stmt) -> list[MealRow]:  # type: ignore[no-untyped-def]
+        res = await self.session.execute(stmt)
+        return [MealRow(*r) for r in res.all()]
+
+    async def list_rows_between(self, *, user_id: int, start: datetime, end: datetime) -> list[MealRow]:
+        stmt = _MEALS_SELECT.where(Meal.user_id == user_id, Meal.at >= start, Meal.at <= end).order_by(Meal.at.asc())
+        return await self._fetch(stmt)
+
+    async def list_page(
+        self,
+        *,
+        user_id: int,
+        limit: int,
+        before: tuple[datetime, int] | None = None,
+        meal_type: str | None = None,
+    ) -> list[MealRow]:
+        """Newest-first page of meals strictly older than ``before`` = (at, id).
+
+        Keyset condition on (at, id) walks ix_meals_user_at backwards, so every page
+        costs the same regardless of how deep into history it is.
+        """
+        stmt = _MEALS_SELECT.where(Meal.user_id == user_id)
+        if before is not None:
+            stmt = stmt.where(tuple_(Meal.at, Meal.id) < tuple_(before[0], before[1]))
+        if meal_type is not None:
+            stmt = stmt.where(Meal.type == meal_type)
+        stmt = stmt.order_by(Meal.at.desc(), Meal.id.desc()).limit(limit)
+        return await self._fetch(stmt)
+
     async def list_by_date(self, *, user_id: int, on_date: Date) -> list[dict[str, Any]]:
         # Deprecated: prefer list_between with explicit tz boundaries
         start = datetime.combine(on_date, datetime.min.time()).astimezone()
         end = datetime.combine(on_date, datetime.max.time()).astimezone()
-        res = await self.session.execute(
-            select(Meal).where(Meal.user_id == user_id, Meal.at >= start, Meal.at <= end).order_by(Meal.at.asc())
-        )
-        meals: list[dict[str, Any]] = []
-        rows = res.scalars().all()
-        if not rows:
-            return []
-        meal_ids = [m.id for m in rows]
-        items_map: dict[int, list[dict[str, Any]]] = {mid: [] for mid in meal_ids}
-        res_it = await self.session.execute(select(MealItem).where(MealItem.meal_id.in_(meal_ids)))
-        for it in res_it.scalars().all():
-            items_map[it.meal_id].append(
-                dict(
-                    id=it.id,
-                    name=it.name,
-                    amount=it.amount,
-                    unit=it.unit,
-                    kcal=it.kcal,
-                    protein_g=it.protein_g,
-                    fat_g=it.fat_g,
-                    carb_g=it.carb_g,
-                    source=it.source,
-                )
-            )
-        for m in rows:
-            meals.append(
-                dict(
-                    id=m.id,
-                    at=m.at.isoformat(),
-                    type=m.type,
-                    status=m.status,
-                    notes=m.notes,
-                    items=items_map.get(m.id, []),
-                )
-            )
-        return meals
+        return await self.list_between(user_id=user_id, start=start, end=end)
 
     async def list_between(self, *, user_id: int, start: datetime, end: datetime) -> list[dict[str, Any]]:
-        res = await self.session.execute(
-            select(Meal).where(Meal.user_id == user_id, Meal.at >= start, Meal.at <= end).order_by(Meal.at.asc())
-        )
-        meals: list[dict[str, Any]] = []
-        rows = res.scalars().all()
-        if not rows:
-            return []
-        meal_ids = [m.id for m in rows]
-        items_map: dict[int, list[dict[str, Any]]] = {mid: [] for mid in meal_ids}
-        res_it = await self.session.execute(select(MealItem).where(MealItem.meal_id.in_(meal_ids)))
-        for it in res_it.scalars().all():
-            items_map[it.meal_id].append(
-                dict(
-                    id=it.id,
-                    name=it.name,
-                    amount=it.amount,
-                    unit=it.unit,
-                    kcal=it.kcal,
-                    protein_g=it.protein_g,
-                    fat_g=it.fat_g,
-                    carb_g=it.carb_g,
-                    source=it.source,
-                )
-            )
-        for m in rows:
-            meals.append(
-                dict(
-                    id=m.id,
-                    at=m.at.isoformat(),
-                    type=m.type,
-                    status=m.status,
-                    notes=m.notes,
-                    items=items_map.get(m.id, []),
-                )
-            )
-        return meals
+        return [r.as_dict() for r in await self.list_rows_between(user_id=user_id, start=start, end=end)]
 
     async def get_by_id(self, *, meal_id: int, user_id: int) -> dict[str, Any] | None:
-        res = await self.session.execute(select(Meal).where(Meal.id == meal_id, Meal.user_id == user_id))
-        m = res.scalar_one_or_none()
-        if not m:
-            return None
-        res_it = await self.session.execute(select(MealItem).where(MealItem.meal_id == meal_id))
-        items = [
-            dict(
-                id=it.id,
-                name=it.name,
-                amount=it.amount,
-                unit=it.unit,
-                kcal=it.kcal,
-                protein_g=it.protein_g,
-                fat_g=it.fat_g,
-                carb_g=it.carb_g,
-                source=it.source,
-            )
-            for it in res_it.scalars().all()
-        ]
-        return dict(id=m.id, at=m.at.isoformat(), type=m.type, status=m.status, notes=m.notes, items=items)
+        rows = await self._fetch(_MEALS_SELECT.where(Meal.id == meal_id, Meal.user_id == user_id))
+        return rows[0].as_dict() if rows else None
 
     async def update_meal(
         self,
@@ -181,10 +217,15 @@ class MealRepo:
         items: Iterable[dict[str, Any]] | None = None,
         notes: str | None = None,
         autocommit: bool = True,
-    ) -> None:
-        # update meal row
+    ) -> MealUpdateResult | None:
+        """Apply a partial update; returns before/after state and macro totals, or None if not found.
+
+        Items are diffed by ``id``: changed rows are UPDATEd, rows without a known id are
+        INSERTed and rows missing from the list are DELETEd. Unchanged rows are not touched.
+        """
         values: dict[str, Any] = {}
         if at is not None:
+            await ensure_meal_partitions(self.session.bind, at)
             values["at"] = at
         if meal_type is not None:
             values["type"] = meal_type
@@ -193,26 +234,94 @@ class MealRepo:
         if notes is not None:
             values["notes"] = notes
         if values:
-            from sqlalchemy import update
-            await self.session.execute(update(Meal).where(Meal.id == meal_id, Meal.user_id == user_id).values(**values))
+            # self-join exposes the pre-update row, so one statement yields old and new state
+            old = Meal.__table__.alias("old")
+            stmt = (
+                update(Meal)
+                .where(Meal.id == meal_id, Meal.user_id == user_id, old.c.id == Meal.id)
+                .values(**values)
+                .returning(old.c.at, cast(old.c.status, String), Meal.at, cast(Meal.status, String))
+            )
+        else:
+            stmt = (
+                select(Meal.at, cast(Meal.status, String), Meal.at, cast(Meal.status, String))
+                .where(Meal.id == meal_id, Meal.user_id == user_id)
+                .with_for_update()
+            )
+        row = (await self.session.execute(stmt)).first()
+        if row is None:
+            return None
+        result = MealUpdateResult(prev_at=row[0], prev_status=row[1], at=row[2], status=row[3])
+
         if items is not None:
-            await self.session.execute(delete(MealItem).where(MealItem.meal_id == meal_id))
-            if items:
-                await self.session.execute(insert(MealItem).values([
-                    dict(
-                        meal_id=meal_id,
-                        name=i["name"],
-                        amount=float(i["amount"]),
-                        unit=i["unit"],
-                        kcal=float(i["kcal"]),
-                        protein_g=float(i["protein_g"]),
-                        fat_g=float(i["fat_g"]),
-                        carb_g=float(i["carb_g"]),
-                        source=i.get("source", "manual"),
-                    ) for i in items
-                ]))
+            await self._diff_items(meal_id, result.at, list(items), result)
+        elif result.prev_at != result.at:
+            # meal moved without item changes: the caller needs its totals for both days
+            totals = await self.session.execute(
+                select(
+                    func.coalesce(func.sum(MealItem.kcal), 0.0),
+                    func.coalesce(func.sum(MealItem.protein_g), 0.0),
+                    func.coalesce(func.sum(MealItem.fat_g), 0.0),
+                    func.coalesce(func.sum(MealItem.carb_g), 0.0),
+                ).where(MealItem.meal_id == meal_id, MealItem.at == result.at)
+            )
+            t = totals.one()
+            result.old_totals = dict(zip(_MACROS, (float(v) for v in t)))
+            result.new_totals = dict(result.old_totals)
         if autocommit:
             await self.session.commit()
+        return result
+
+    async def _diff_items(self, meal_id: int, at: datetime, incoming: list[dict[str, Any]], result: MealUpdateResult) -> None:
+        # `at` is the meal's current time: ON UPDATE CASCADE has already moved its items there
+        cur_res = await self.session.execute(
+            select(*(MealItem.__table__.c[c] for c in _ITEM_COLUMNS))
+            .where(MealItem.meal_id == meal_id, MealItem.at == at)
+            .with_for_update()
+        )
+        current = {r.id: r._asdict() for r in cur_res.all()}
+        old_totals = {k: sum(float(it[k]) for it in current.values()) for k in _MACROS}
+
+        keep: set[int] = set()
+        to_insert: list[dict[str, Any]] = []
+        for i in incoming:
+            new = dict(
+                name=i["name"],
+                amount=float(i["amount"]),
+                unit=i["unit"],
+                kcal=float(i["kcal"]),
+                protein_g=float(i["protein_g"]),
+                fat_g=float(i["fat_g"]),
+                carb_g=float(i["carb_g"]),
+            )
+            item_id = i.get("id")
+            cur = current.get(int(item_id)) if item_id is not None else None
+            if cur is None or int(item_id) in keep:
+                to_insert.append(dict(new, meal_id=meal_id, at=at, source=i.get("source") or "manual"))
+                continue
+            keep.add(cur["id"])
+            changed = {k: v for k, v in new.items() if cur[k] != v}
+            if changed:
+                res = await self.session.execute(
+                    update(MealItem)
+                    .where(MealItem.id == cur["id"], MealItem.meal_id == meal_id, MealItem.at == at)
+                    .values(**changed)
+                    .returning(*(MealItem.__table__.c[c] for c in _ITEM_COLUMNS))
+                )
+                cur.update(res.one()._asdict())
+            result.items.append(cur)
+
+        removed = [iid for iid in current if iid not in keep]
+        if removed:
+            await self.session.execute(delete(MealItem).where(MealItem.meal_id == meal_id, MealItem.at == at, MealItem.id.in_(removed)))
+        if to_insert:
+            res = await self.session.execute(
+                insert(MealItem).values(to_insert).returning(*(MealItem.__table__.c[c] for c in _ITEM_COLUMNS))
+            )
+            result.items.extend(r._asdict() for r in res.all())
+
+        result.old_totals = old_totals
+        result.new_totals = {k: sum(float(it[k]) for it in result.items) for k in _MACROS}
 
     async def sum_macros_for_date(self, *, user_id: int, on_date: Date, tz: str | None = None) -> dict[str, float]:
         if tz:
@@ -235,8 +344,9 @@ class MealRepo:
                 func.coalesce(func.sum(MealItem.carb_g), 0.0),
             )
             .select_from(MealItem)
-            .join(Meal, Meal.id == MealItem.meal_id)
-            .where(and_(Meal.user_id == user_id, Meal.at >= start, Meal.at <= end))
+            .join(Meal, and_(Meal.id == MealItem.meal_id, Meal.at == MealItem.at))
+            # bounds on both sides: the planner does not derive MealItem.at ranges from the join
+            .where(and_(Meal.user_id == user_id, Meal.at >= start, Meal.at <= end, MealItem.at >= start, MealItem.at <= end))
         )
         row = res.first()
         kcal, protein, fat, carb = (float(row[0]), float(row[1]), float(row[2]), float(row[3])) if row else (0.0, 0.0, 0.0, 0.0)
@@ -250,16 +360,16 @@ class MealRepo:
         source_message_id: int | None = None,
         source_update_id: int | None = None,
     ) -> dict[str, Any] | None:
-        q = select(Meal).where(Meal.user_id == user_id)
+        q = select(MealSource.meal_id).where(MealSource.user_id == user_id)
         if source_update_id is not None:
-            q = q.where(Meal.source_update_id == source_update_id)
+            q = q.where(MealSource.source_update_id == source_update_id)
         if source_chat_id is not None and source_message_id is not None:
-            q = q.where(Meal.source_chat_id == source_chat_id, Meal.source_message_id == source_message_id)
+            q = q.where(MealSource.source_chat_id == source_chat_id, MealSource.source_message_id == source_message_id)
         res = await self.session.execute(q)
-        m = res.scalar_one_or_none()
-        if not m:
+        meal_id = res.scalar_one_or_none()
+        if meal_id is None:
             return None
-        return {"id": m.id}
+        return {"id": meal_id}
 
     @staticmethod
     def suggest_meal_type(dt: datetime) -> str:
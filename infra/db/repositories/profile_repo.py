@@ -1,32 +1,59 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any
+from typing import Any, Iterable
 
-from sqlalchemy import insert, select, update
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infra.cache.read_through import ReadThroughCache
 from infra.db.models import Profile
 
 
+# user_id -> profile dict (None when the user has not filled the profile yet)
+profile_cache = ReadThroughCache("profile")
+
+_COLUMNS = (
+    Profile.user_id,
+    Profile.sex,
+    Profile.birth_date,
+    Profile.height_cm,
+    Profile.weight_kg,
+    Profile.activity_level,
+    Profile.goal,
+)
+
+
+def _from_cache(value: dict[str, Any] | None) -> dict[str, Any] | None:
+    # JSON has no date type; restore birth_date so cached and fresh rows look the same
+    if value and isinstance(value.get("birth_date"), str):
+        value["birth_date"] = date.fromisoformat(value["birth_date"])
+    return value
+
+
 class ProfileRepo:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def get_by_user_id(self, user_id: int) -> dict[str, Any] | None:
-        stmt = select(
-            Profile.user_id,
-            Profile.sex,
-            Profile.birth_date,
-            Profile.height_cm,
-            Profile.weight_kg,
-            Profile.activity_level,
-            Profile.goal,
-        ).where(Profile.user_id == user_id)
-        res = await self.session.execute(stmt)
+    async def _load(self, user_id: int) -> dict[str, Any] | None:
+        res = await self.session.execute(select(*_COLUMNS).where(Profile.user_id == user_id))
         row = res.mappings().first()
         return dict(row) if row else None
 
+    async def get_by_user_id(self, user_id: int) -> dict[str, Any] | None:
+        return _from_cache(await profile_cache.get(user_id, lambda: self._load(user_id)))
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, dict[str, Any] | None]:
+        """Profiles of several users: cached ones from the cache, the rest in one query."""
+
+        async def load(missing: list[int]) -> dict[int, dict[str, Any] | None]:
+            res = await self.session.execute(select(*_COLUMNS).where(Profile.user_id.in_(missing)))
+            return {row["user_id"]: dict(row) for row in res.mappings().all()}
+
+        found = await profile_cache.get_many(user_ids, load)
+        return {uid: _from_cache(value) for uid, value in found.items()}
+
     async def upsert_profile(
         self,
         *,
@@ -38,32 +65,18 @@ class ProfileRepo:
         activity_level: str,
         goal: str,
     ) -> None:
-        exists = await self.get_by_user_id(user_id)
-        if exists is None:
-            stmt = insert(Profile).values(
-                user_id=user_id,
-                sex=sex,
-                birth_date=birth_date,
-                height_cm=height_cm,
-                weight_kg=weight_kg,
-                activity_level=activity_level,
-                goal=goal,
-            )
-            await self.session.execute(stmt)
-        else:
-            stmt = (
-                update(Profile)
-                .where(Profile.user_id == user_id)
-                .values(
-                    sex=sex,
-                    birth_date=birth_date,
-                    height_cm=height_cm,
-                    weight_kg=weight_kg,
-                    activity_level=activity_level,
-                    goal=goal,
-                )
-            )
-            await self.session.execute(stmt)
+        values = dict(
+            sex=sex,
+            birth_date=birth_date,
+            height_cm=height_cm,
+            weight_kg=weight_kg,
+            activity_level=activity_level,
+            goal=goal,
+        )
+        # profiles.user_id is unique: one round trip instead of SELECT + INSERT/UPDATE
+        stmt = pg_insert(Profile).values(user_id=user_id, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[Profile.user_id], set_=values).returning(*_COLUMNS)
+        res = await self.session.execute(stmt)
+        row = res.mappings().first()
         await self.session.commit()
-
-
+        await profile_cache.put(user_id, dict(row) if row else None)
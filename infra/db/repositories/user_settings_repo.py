@@ -1,27 +1,74 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Iterable
 
-from sqlalchemy import insert, select, update
+from sqlalchemy import Text, cast, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infra.cache.read_through import ReadThroughCache
 from infra.db.models import UserSettings
 
 
+# user_id -> settings document (None when the user has no row yet)
+settings_cache = ReadThroughCache("user_settings")
+
+
 class UserSettingsRepo:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
+    async def _load(self, user_id: int) -> dict | None:
+        res = await self.session.execute(select(UserSettings.data).where(UserSettings.user_id == user_id))
+        row = res.first()
+        return dict(row[0] or {}) if row else None
+
     async def get(self, user_id: int) -> dict | None:
-        res = await self.session.execute(select(UserSettings).where(UserSettings.user_id == user_id))
-        row = res.scalars().first()
-        return dict(row.data) if row else None
+        return await settings_cache.get(user_id, lambda: self._load(user_id))
+
+    async def get_many(self, user_ids: Iterable[int]) -> dict[int, dict | None]:
+        """Settings of several users: cached ones from the cache, the rest in one query."""
 
-    async def upsert(self, user_id: int, data: dict[str, Any]) -> None:
-        res = await self.session.execute(select(UserSettings.id).where(UserSettings.user_id == user_id))
+        async def load(missing: list[int]) -> dict[int, dict | None]:
+            res = await self.session.execute(
+                select(UserSettings.user_id, UserSettings.data).where(UserSettings.user_id.in_(missing))
+            )
+            return {uid: dict(data or {}) for uid, data in res.all()}
+
+        return await settings_cache.get_many(user_ids, load)
+
+    async def _store(self, user_id: int, stmt, autocommit: bool) -> dict | None:  # type: ignore[no-untyped-def]
+        res = await self.session.execute(stmt.returning(UserSettings.data))
         row = res.first()
-        if row is None:
-            await self.session.execute(insert(UserSettings).values(user_id=user_id, data=data))
+        data = dict(row[0] or {}) if row else None
+        if autocommit:
+            await self.session.commit()
+            await settings_cache.put(user_id, data)
         else:
-            await self.session.execute(update(UserSettings).where(UserSettings.user_id == user_id).values(data=data))
-        await self.session.commit()
+            # caller may still roll back; never publish an uncommitted document
+            await settings_cache.invalidate(user_id)
+        return data
+
+    async def upsert(self, user_id: int, data: dict[str, Any], *, autocommit: bool = True) -> dict | None:
+        """Replace the whole document (single INSERT ... ON CONFLICT)."""
+        stmt = pg_insert(UserSettings).values(user_id=user_id, data=data)
+        stmt = stmt.on_conflict_do_update(index_elements=[UserSettings.user_id], set_={"data": stmt.excluded.data})
+        return await self._store(user_id, stmt, autocommit)
+
+    async def merge(self, user_id: int, patch: dict[str, Any], *, autocommit: bool = True) -> dict | None:
+        """Set only the given top-level keys (``data || patch``); creates the row if missing."""
+        stmt = pg_insert(UserSettings).values(user_id=user_id, data=patch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserSettings.user_id],
+            set_={"data": func.coalesce(UserSettings.data, cast({}, JSONB)).op("||")(stmt.excluded.data)},
+        )
+        return await self._store(user_id, stmt, autocommit)
+
+    async def remove_keys(self, user_id: int, keys: Iterable[str], *, autocommit: bool = True) -> dict | None:
+        """Drop top-level keys (``data - keys``) without touching the rest of the document."""
+        stmt = (
+            update(UserSettings)
+            .where(UserSettings.user_id == user_id)
+            .values(data=UserSettings.data.op("-")(cast(list(keys), ARRAY(Text))))
+        )
+        return await self._store(user_id, stmt, autocommit)
@@ -5,28 +5,89 @@ from typing import Any
 from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from infra.db.models import VisionInference
+from infra.db.models import Image, VisionInference
+
+
+def hot_fields(response: dict[str, Any]) -> dict[str, Any]:
+    """Columns extracted from a vision response so readers never have to load the payload."""
+    quality = response.get("quality") or {}
+    return {
+        "items": response.get("items") or [],
+        "quality": quality,
+        "needs_clarification": bool(quality.get("needs_clarification", False)),
+    }
 
 
 class VisionInferenceRepo:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def create(self, *, image_id: int, provider: str, model: str, response: dict, confidence: float | None = None) -> int:
+    async def create(
+        self,
+        *,
+        image_id: int,
+        provider: str,
+        model: str,
+        response: dict,
+        confidence: float | None = None,
+        autocommit: bool = True,
+    ) -> int:
         res = await self.session.execute(
             insert(VisionInference)
-            .values(image_id=image_id, provider=provider, model=model, response=response, confidence=confidence)
+            .values(
+                image_id=image_id,
+                provider=provider,
+                model=model,
+                response=response,
+                confidence=confidence,
+                **hot_fields(response),
+            )
             .returning(VisionInference.id)
         )
         vid = int(res.scalar_one())
-        await self.session.commit()
+        if autocommit:
+            await self.session.commit()
         return vid
 
+    async def create_many(self, rows: list[dict[str, Any]], *, autocommit: bool = True) -> list[int]:
+        """One multi-row INSERT; each row holds the keyword arguments of :meth:`create`."""
+        if not rows:
+            return []
+        values = [
+            {
+                "image_id": r["image_id"],
+                "provider": r["provider"],
+                "model": r["model"],
+                "response": r["response"],
+                "confidence": r.get("confidence"),
+                **hot_fields(r["response"]),
+            }
+            for r in rows
+        ]
+        res = await self.session.execute(insert(VisionInference).values(values).returning(VisionInference.id))
+        ids = [int(i) for i in res.scalars().all()]
+        if autocommit:
+            await self.session.commit()
+        return ids
+
     async def get_latest_by_image(self, *, image_id: int) -> dict | None:
+        # hot columns only: the payload may be large (TOAST) or already compacted away
         res = await self.session.execute(
-            select(VisionInference).where(VisionInference.image_id == image_id).order_by(VisionInference.id.desc()).limit(1)
+            select(
+                VisionInference.id,
+                VisionInference.image_id,
+                VisionInference.provider,
+                VisionInference.model,
+                VisionInference.items,
+                VisionInference.quality,
+                VisionInference.needs_clarification,
+                VisionInference.confidence,
+            )
+            .where(VisionInference.image_id == image_id)
+            .order_by(VisionInference.id.desc())
+            .limit(1)
         )
-        row = res.scalars().first()
+        row = res.first()
         if not row:
             return None
         return {
@@ -34,8 +95,35 @@ class VisionInferenceRepo:
             "image_id": row.image_id,
             "provider": row.provider,
             "model": row.model,
-            "response": row.response,
+            "items": row.items or [],
+            "quality": row.quality or {},
+            "needs_clarification": bool(row.needs_clarification),
             "confidence": row.confidence,
         }
 
+    async def find_by_sha256(self, *, sha256: str, tiers: tuple[str, ...]) -> dict | None:
+        """Latest raw provider answer for these bytes (any user, via ix_images_sha256).
 
+        Only rows of ``tiers`` that still hold ``response->'raw'`` qualify: the budget placeholder
+        is no answer, and the per-user layer (portions, warnings) must be rebuilt by the caller.
+        """
+        res = await self.session.execute(
+            select(
+                VisionInference.provider,
+                VisionInference.model,
+                VisionInference.confidence,
+                VisionInference.response["raw"].label("raw"),
+            )
+            .join(Image, Image.id == VisionInference.image_id)
+            .where(
+                Image.sha256 == sha256,
+                VisionInference.response["tier"].astext.in_(tiers),
+                VisionInference.response.has_key("raw"),
+            )
+            .order_by(VisionInference.id.desc())
+            .limit(1)
+        )
+        row = res.first()
+        if not row:
+            return None
+        return {"provider": row.provider, "model": row.model, "confidence": row.confidence, "raw": row.raw}
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import BigInteger, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from infra.storage.object_storage import ObjectStorage, get_storage
+
+
+@dataclass(frozen=True, slots=True)
+class _Table:
+    name: str
+    select: Any
+    compact: Any
+
+
+# Oldest first, and SKIP LOCKED so two runs (or a run racing a writer) never wait on each other.
+# In the UPDATEs every right-hand side sees the old row, so the hot columns are filled from the
+# payload in the same statement that drops it (rows written before 0007 had them backfilled anyway).
+_VISION = _Table(
+    name="vision_inferences",
+    select=text(
+        "SELECT id, image_id, provider, model, confidence, created_at, response FROM vision_inferences "
+        "WHERE compacted_at IS NULL AND created_at < :cutoff "
+        "ORDER BY created_at, id LIMIT :limit FOR UPDATE SKIP LOCKED"
+    ),
+    compact=text(
+        "UPDATE vision_inferences SET"
+        " items = coalesce(items, response->'items', '[]'::jsonb),"
+        " quality = coalesce(quality, response->'quality', '{}'::jsonb),"
+        " needs_clarification = coalesce(needs_clarification, (response->'quality'->>'needs_clarification')::boolean, false),"
+        " response = NULL, compacted_at = now(), archive_key = :key "
+        "WHERE id = ANY(:ids)"
+    ).bindparams(bindparam("ids", type_=ARRAY(BigInteger))),
+)
+_LLM = _Table(
+    name="llm_inferences",
+    select=text(
+        "SELECT id, user_id, meal_id, provider, model, purpose, input_tokens, output_tokens, created_at, prompt, response "
+        "FROM llm_inferences WHERE compacted_at IS NULL AND created_at < :cutoff "
+        "ORDER BY created_at, id LIMIT :limit FOR UPDATE SKIP LOCKED"
+    ),
+    compact=text(
+        "UPDATE llm_inferences SET prompt = NULL, response = NULL, compacted_at = now(), archive_key = :key "
+        "WHERE id = ANY(:ids)"
+    ).bindparams(bindparam("ids", type_=ARRAY(BigInteger))),
+)
+TABLES = {t.name: t for t in (_VISION, _LLM)}
+
+
+def _archive_key(table: str, first: dict[str, Any], last: dict[str, Any]) -> str:
+    at: datetime = first["created_at"]
+    return f"archive/{table}/{at:%Y/%m}/{first['id']}-{last['id']}.jsonl.gz"
+
+
+def _pack(rows: list[dict[str, Any]]) -> bytes:
+    lines = (json.dumps(r, ensure_ascii=False, separators=(",", ":"), default=str) for r in rows)
+    return gzip.compress("\n".join(lines).encode(), compresslevel=6)
+
+
+async def compact_batch(
+    engine: AsyncEngine, storage: ObjectStorage, table: str, *, cutoff: datetime, limit: int
+) -> int:
+    """Archive and compact up to ``limit`` rows of ``table`` older than ``cutoff``; returns rows done.
+
+    One short transaction per batch: the archive object is written before the rows are
+    compacted, so a failed upload leaves the batch untouched for the next run.
+    """
+    t = TABLES[table]
+    async with engine.begin() as conn:
+        await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        await conn.execute(text("SET LOCAL statement_timeout = '60s'"))
+        rows = [dict(r) for r in (await conn.execute(t.select, {"cutoff": cutoff, "limit": limit})).mappings()]
+        if not rows:
+            return 0
+        key = _archive_key(table, rows[0], rows[-1])
+        await storage.put(key, _pack(rows), content_type="application/gzip")
+        await conn.execute(t.compact, {"key": key, "ids": [r["id"] for r in rows]})
+    return len(rows)
+
+
+async def compact_inferences(
+    engine: AsyncEngine,
+    storage: ObjectStorage | None = None,
+    *,
+    older_than_days: int | None = None,
+    batch_size: int | None = None,
+    pause_ms: int | None = None,
+    max_batches: int | None = None,
+    tables: tuple[str, ...] = ("vision_inferences", "llm_inferences"),
+) -> dict[str, int]:
+    """Compact inferences past INFERENCE_RETENTION_DAYS, table by table, in bounded batches.
+
+    I/O per run is capped by batch size x max batches, with a pause between batches so the
+    job never saturates disk or WAL; whatever is left is picked up by the next run.
+    """
+    storage = storage or get_storage()
+    days = settings.inference_retention_days if older_than_days is None else older_than_days
+    limit = max(1, batch_size or settings.inference_compact_batch)
+    pause = (settings.inference_compact_pause_ms if pause_ms is None else pause_ms) / 1000.0
+    budget = settings.inference_compact_max_batches if max_batches is None else max_batches
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max(0, days))
+    done: dict[str, int] = {}
+    for table in tables:
+        done[table] = 0
+        while budget > 0:
+            n = await compact_batch(engine, storage, table, cutoff=cutoff, limit=limit)
+            budget -= 1
+            done[table] += n
+            if n < limit:
+                break
+            if pause:
+                await asyncio.sleep(pause)
+    return done
+
+
+async def load_archived(storage: ObjectStorage, archive_key: str, inference_id: int) -> dict[str, Any] | None:
+    """Raw row (with ``response``/``prompt``) of a compacted inference, read back from its batch object."""
+    raw = gzip.decompress(await storage.get(archive_key))
+    for line in raw.decode().splitlines():
+        rec = json.loads(line)
+        if rec.get("id") == inference_id:
+            return rec
+    return None
@@ -1,18 +1,129 @@
 from __future__ import annotations
 
-from typing import AsyncGenerator
+import time
+from typing import Any, AsyncGenerator
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 
 from core.config import settings
+from infra.cache.redis import redis_client
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+def _engine_kwargs(url: str) -> dict[str, Any]:
+    kwargs: dict[str, Any] = dict(
+        echo=False,
+        future=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        if settings.db_pgbouncer:
+            # PgBouncer in transaction mode hands out a different server connection per
+            # transaction, so named prepared statements must be unique and never cached.
+            kwargs["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        else:
+            kwargs["connect_args"] = {
+                "statement_cache_size": settings.db_statement_cache_size,
+                "prepared_statement_cache_size": settings.db_statement_cache_size,
+            }
+    return kwargs
+
+
+def _make_engine(url: str, **extra: Any) -> AsyncEngine:
+    return create_async_engine(url, **_engine_kwargs(url), **extra)
+
+
+engine = _make_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+if settings.database_read_url:
+    read_engine = _make_engine(
+        settings.database_read_url,
+        execution_options={"postgresql_readonly": True},
+    )
+    ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+else:
+    read_engine = engine
+    ReadSessionLocal = SessionLocal
+
+
+# --- read-your-writes tracking ---------------------------------------------
+
+_RW_KEY = "db:rw:{}"
+_recent_writes: dict[int, float] = {}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_writes(state) -> None:  # type: ignore[no-untyped-def]
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["pending_write"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_write(session: Session) -> None:
+    session.info.pop("pending_write", None)
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
+
+class RoutedSession(AsyncSession):
+    """Primary session that remembers which Telegram user committed a write."""
+
+    async def commit(self) -> None:
+        wrote = self.info.pop("pending_write", False)
+        await super().commit()
+        telegram_id = self.info.get("telegram_id")
+        if wrote and telegram_id is not None and ReadSessionLocal is not SessionLocal:
+            await mark_recent_write(int(telegram_id))
+
+
+WriteSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=RoutedSession)
+
+
+async def mark_recent_write(telegram_id: int) -> None:
+    ttl = max(1, settings.db_read_your_writes_sec)
+    now = time.monotonic()
+    _recent_writes[telegram_id] = now + ttl
+    if len(_recent_writes) > 10_000:
+        for k in [k for k, exp in _recent_writes.items() if exp <= now]:
+            _recent_writes.pop(k, None)
+    try:
+        await redis_client.setex(_RW_KEY.format(telegram_id), ttl, "1")
+    except Exception:
+        pass
+
+
+async def has_recent_write(telegram_id: int) -> bool:
+    exp = _recent_writes.get(telegram_id)
+    if exp is not None:
+        if exp > time.monotonic():
+            return True
+        _recent_writes.pop(telegram_id, None)
+    try:
+        return bool(await redis_client.exists(_RW_KEY.format(telegram_id)))
+    except Exception:
+        # unsure about replica freshness -> stay on primary
+        return True
+
+
+async def get_session(telegram_id: int | None = None) -> AsyncGenerator[AsyncSession, None]:
+    async with WriteSessionLocal() as session:
+        session.info["telegram_id"] = telegram_id
         yield session
 
 
+async def get_read_session(telegram_id: int | None = None) -> AsyncGenerator[AsyncSession, None]:
+    """Session for heavy read-only endpoints: replica unless the user has just written."""
+    maker = ReadSessionLocal
+    if maker is not SessionLocal and telegram_id is not None and await has_recent_write(telegram_id):
+        maker = SessionLocal
+    async with maker() as session:
+        yield session
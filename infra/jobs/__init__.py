@@ -0,0 +1 @@
+"""Scheduled jobs: cron schedules, Redis queue and locks (``python -m infra.jobs``)."""
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from core.config import settings
+from infra.jobs import tasks  # noqa: F401  registers the jobs
+from infra.jobs.scheduler import JOBS, Runner, enqueue
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.list:
+        for name, j in sorted(JOBS.items()):
+            print(f"{name:22} {j.cron.expr if j.cron else '(on demand)':16} timeout={j.timeout_sec:.0f}s")
+        return
+    if args.enqueue:
+        await enqueue(args.enqueue)
+        return
+    runner = Runner(concurrency=args.concurrency)
+    if args.run:
+        await runner.run_now(args.run)
+        return
+    await runner.run_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduled jobs runner (cron schedules, Redis queue and locks)")
+    parser.add_argument("--list", action="store_true", help="Print registered jobs and their schedules")
+    parser.add_argument("--run", choices=sorted(JOBS), help="Run one job now in this process, then exit")
+    parser.add_argument("--enqueue", choices=sorted(JOBS), help="Queue one run for the runners, then exit")
+    parser.add_argument("--concurrency", type=int, default=None, help="Default: JOBS_CONCURRENCY")
+    logging.basicConfig(level=settings.log_level)
+    asyncio.run(main(parser.parse_args()))
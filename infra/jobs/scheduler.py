@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+import structlog
+
+from core.config import settings
+from infra.cache.redis import pipeline, redis_client
+
+
+log = structlog.get_logger("jobs")
+
+# Broker keys: a list of ready runs, a ZSET of retries scored by due time (epoch seconds),
+# one NX key per fired cron slot, one lock and one state hash per job.
+QUEUE_KEY = "jobs:queue"
+DELAYED_KEY = "jobs:delayed"
+SLOT_TTL_SEC = 24 * 3600
+
+# Moves due retries to the queue atomically, so two runners never both promote one entry
+_PROMOTE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, m in ipairs(due) do
+  redis.call('ZREM', KEYS[1], m)
+  redis.call('RPUSH', KEYS[2], m)
+end
+return #due
+"""
+# Delete the lock only if this runner still owns it
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _field(expr: str, lo: int, hi: int) -> frozenset[int]:
+    out: set[int] = set()
+    for part in expr.split(","):
+        body, _, step_raw = part.partition("/")
+        step = int(step_raw) if step_raw else 1
+        if body == "*":
+            a, b = lo, hi
+        elif "-" in body:
+            a, b = (int(x) for x in body.split("-", 1))
+        else:
+            a = int(body)
+            b = hi if step_raw else a
+        if step < 1 or a < lo or b > hi or a > b:
+            raise ValueError(f"cron field out of range: {part!r}")
+        out.update(range(a, b + 1, step))
+    return frozenset(out)
+
+
+@dataclass(frozen=True, slots=True)
+class Cron:
+    """Five-field cron expression (minute hour day-of-month month day-of-week), in local wall time.
+
+    Fields take ``*``, ``n``, ``a-b``, ``*/s``, ``a-b/s`` and comma lists; day-of-week 0 and 7 are
+    Sunday. As in cron, when both day fields are restricted a day matching either one fires.
+    """
+
+    expr: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]  # 0 = Sunday
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, expr: str) -> "Cron":
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        m, h, dom, mon, dow = (_field(p, lo, hi) for p, (lo, hi) in zip(parts, _BOUNDS))
+        return cls(
+            expr=expr,
+            minutes=m,
+            hours=h,
+            days=dom,
+            months=mon,
+            weekdays=frozenset(d % 7 for d in dow),
+            any_day=parts[2] == "*",
+            any_weekday=parts[4] == "*",
+        )
+
+    def _day_ok(self, t: datetime) -> bool:
+        dom = t.day in self.days
+        dow = (t.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, after: datetime, tz: ZoneInfo) -> datetime:
+        """First matching minute strictly after ``after`` (aware), returned aware in ``tz``."""
+        t = after.astimezone(tz).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)  # Feb 29 on a given weekday can take years
+        while t < limit:
+            if t.month not in self.months:
+                t = datetime(t.year + t.month // 12, t.month % 12 + 1, 1)
+            elif not self._day_ok(t):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t.replace(tzinfo=tz)
+        raise ValueError(f"cron expression never fires: {self.expr!r}")
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    name: str
+    fn: Callable[[], Awaitable[Any]]
+    cron: Cron | None = None  # None: runs only when enqueued explicitly
+    timeout_sec: float = 600.0
+    retries: int | None = None  # None: JOBS_MAX_RETRIES
+
+
+JOBS: dict[str, Job] = {}
+
+
+def job(
+    name: str, *, cron: str | None = None, timeout_sec: float = 600.0, retries: int | None = None
+) -> Callable[[Callable[[], Awaitable[Any]]], Callable[[], Awaitable[Any]]]:
+    """Register an async no-argument function as a job, optionally on a cron schedule."""
+
+    def register(fn: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        JOBS[name] = Job(name, fn, Cron.parse(cron) if cron else None, timeout_sec, retries)
+        return fn
+
+    return register
+
+
+def _message(name: str, *, attempt: int = 0, slot: int | None = None) -> str:
+    return json.dumps({"id": uuid4().hex, "name": name, "attempt": attempt, "slot": slot, "at": time.time()})
+
+
+async def enqueue(name: str, *, slot: int | None = None) -> bool:
+    """Queue a run of ``name``. With ``slot`` (a cron fire time) each slot is queued once across runners."""
+    if slot is not None and not await redis_client.set(f"jobs:slot:{name}:{slot}", 1, nx=True, ex=SLOT_TTL_SEC):
+        return False
+    await redis_client.rpush(QUEUE_KEY, _message(name, slot=slot))
+    return True
+
+
+class Runner:
+    """Fires cron slots, promotes due retries and executes queued runs.
+
+    Any number of runners may share one Redis: slot keys keep each firing single, and the
+    per-job lock keeps one run of a job at a time fleet-wide (an overlapping run is skipped).
+    At most ``concurrency`` jobs run in this process at once.
+    """
+
+    def __init__(self, jobs: dict[str, Job] | None = None, *, concurrency: int | None = None) -> None:
+        disabled = {n.strip() for n in settings.jobs_disabled.split(",") if n.strip()}
+        self.jobs = {n: j for n, j in (JOBS if jobs is None else jobs).items() if n not in disabled}
+        self.concurrency = max(1, concurrency or settings.jobs_concurrency)
+        self.tz = ZoneInfo(settings.jobs_timezone)
+        self._running: set[asyncio.Task] = set()
+        self._promote = redis_client.register_script(_PROMOTE_LUA)
+        self._release = redis_client.register_script(_RELEASE_LUA)
+
+    async def _schedule(self) -> None:
+        # missed slots (runner down) are not replayed: the next run of a periodic job catches up
+        now = datetime.now(timezone.utc)
+        due = {n: j.cron.next_after(now, self.tz) for n, j in self.jobs.items() if j.cron is not None}
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                for name, at in due.items():
+                    if at <= now:
+                        if await enqueue(name, slot=int(at.timestamp())):
+                            log.info("job_scheduled", job=name, slot=at.isoformat())
+                        due[name] = self.jobs[name].cron.next_after(now, self.tz)  # type: ignore[union-attr]
+                await self._promote(keys=[DELAYED_KEY, QUEUE_KEY], args=[time.time()])
+            except Exception as e:
+                log.warning("jobs_schedule_failed", error=str(e))
+            await asyncio.sleep(1.0)
+
+    async def _consume(self) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            await slots.acquire()
+            try:
+                popped = await redis_client.blpop([QUEUE_KEY], timeout=1)
+            except Exception as e:
+                log.warning("jobs_queue_unavailable", error=str(e))
+                popped = None
+                await asyncio.sleep(1.0)
+            if not popped:
+                slots.release()
+                continue
+            task = asyncio.create_task(self._execute(json.loads(popped[1])))
+            self._running.add(task)
+
+            def done(t: asyncio.Task) -> None:
+                self._running.discard(t)
+                slots.release()
+
+            task.add_done_callback(done)
+
+    async def _retry(self, msg: dict[str, Any], job_: Job) -> bool:
+        retries = settings.jobs_max_retries if job_.retries is None else job_.retries
+        attempt = int(msg.get("attempt") or 0)
+        if attempt >= retries:
+            return False
+        delay = settings.jobs_retry_backoff_sec * 2**attempt
+        nxt = _message(job_.name, attempt=attempt + 1, slot=msg.get("slot"))
+        await redis_client.zadd(DELAYED_KEY, {nxt: time.time() + delay})
+        return True
+
+    async def _execute(self, msg: dict[str, Any], *, retry: bool = True) -> None:
+        job_ = self.jobs.get(str(msg.get("name")))
+        if job_ is None:
+            log.warning("job_unknown", job=msg.get("name"))
+            return
+        lock_key, token = f"jobs:lock:{job_.name}", uuid4().hex
+        # the lock outlives the run's timeout, so it can only expire under a dead runner
+        if not await redis_client.set(lock_key, token, nx=True, px=int((job_.timeout_sec + 60) * 1000)):
+            log.info("job_skipped_running", job=job_.name)
+            return
+        started = time.time()
+        status, error, result = "ok", "", None
+        try:
+            result = await asyncio.wait_for(job_.fn(), timeout=job_.timeout_sec)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"exceeded {job_.timeout_sec:.0f}s"
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"[:500]
+        finally:
+            try:
+                await self._release(keys=[lock_key], args=[token])
+            except Exception:
+                pass
+        duration_ms = int((time.time() - started) * 1000)
+        try:
+            retried = status != "ok" and retry and await self._retry(msg, job_)
+            async with pipeline() as pipe:
+                pipe.hset(
+                    f"jobs:state:{job_.name}",
+                    mapping={
+                        "last_started_at": started,
+                        "last_status": status,
+                        "last_error": error,
+                        "last_duration_ms": duration_ms,
+                        "last_result": json.dumps(result, default=str)[:500],
+                    },
+                )
+                pipe.hincrby(f"jobs:state:{job_.name}", "runs" if status == "ok" else "failures", 1)
+                await pipe.execute()
+        except Exception as e:
+            retried = False
+            log.warning("job_state_failed", job=job_.name, error=str(e))
+        if status == "ok":
+            log.info("job_done", job=job_.name, duration_ms=duration_ms, result=result)
+        else:
+            log.warning("job_failed", job=job_.name, status=status, error=error, attempt=msg.get("attempt"), retry=retried)
+
+    async def run_forever(self) -> None:
+        log.info("jobs_runner_started", jobs=sorted(self.jobs), concurrency=self.concurrency, tz=str(self.tz))
+        try:
+            await asyncio.gather(self._schedule(), self._consume())
+        finally:
+            for task in list(self._running):
+                task.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def run_now(self, name: str) -> None:
+        """Run one job in this process (under its lock, no retries); for manual/ops use."""
+        await self._execute({"name": name}, retry=False)
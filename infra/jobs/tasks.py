@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date as D, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import structlog
+from sqlalchemy import text
+
+from core.config import settings
+from infra.cache.redis import redis_client
+from infra.jobs.scheduler import job
+
+
+log = structlog.get_logger("jobs")
+
+_ACTIVE_USERS = text(
+    "SELECT DISTINCT user_id FROM meals WHERE at >= :since "
+    "UNION SELECT DISTINCT user_id FROM daily_summaries WHERE date >= :since_day"
+)
+_RECENT_USERS = text("SELECT DISTINCT user_id FROM meals WHERE at >= :since LIMIT :limit")
+_DUE_DELIVERIES = text(
+    "SELECT d.id, u.telegram_id, c.payload FROM content_deliveries d "
+    "JOIN content_items c ON c.id = d.item_id JOIN users u ON u.id = d.user_id "
+    "WHERE d.sent_at IS NULL AND d.channel = 'telegram' AND (d.scheduled_at IS NULL OR d.scheduled_at <= now())"
+    " AND coalesce((d.meta->>'attempts')::int, 0) < :max_attempts "
+    "ORDER BY d.scheduled_at NULLS FIRST, d.id LIMIT :limit FOR UPDATE OF d SKIP LOCKED"
+)
+_MARK_SENT = text("UPDATE content_deliveries SET sent_at = now() WHERE id = :id")
+_MARK_FAILED = text(
+    "UPDATE content_deliveries SET meta = coalesce(meta, '{}'::jsonb) || jsonb_build_object("
+    "'attempts', coalesce((meta->>'attempts')::int, 0) + 1, 'error', CAST(:error AS text)) WHERE id = :id"
+)
+DELIVERY_BATCH = 100
+DELIVERY_MAX_ATTEMPTS = 3
+WARM_WINDOW = timedelta(hours=2)
+WARM_MAX_USERS = 1000
+DIGEST_MARK_TTL_SEC = 8 * 24 * 3600
+
+
+def _bot():  # type: ignore[no-untyped-def]
+    from aiogram import Bot
+
+    token = (settings.telegram_bot_token or "").strip().strip("'").strip('"')
+    if not token:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN is not configured")
+    return Bot(token=token)
+
+
+@job("meal_partitions", cron="0 4 * * *", timeout_sec=120)
+async def meal_partitions() -> int:
+    from infra.db.partitions import ensure_future_meal_partitions
+    from infra.db.session import engine
+
+    return await ensure_future_meal_partitions(engine)
+
+
+@job("compact_inferences", cron="30 3 * * *", timeout_sec=3600)
+async def compact_inferences() -> dict[str, int]:
+    from infra.db.retention import compact_inferences as run
+    from infra.db.session import engine
+
+    return await run(engine)
+
+
+@job("reconcile_summaries", cron="15 3 * * *", timeout_sec=1800)
+async def reconcile_summaries() -> dict[str, int]:
+    """Recompute the last JOBS_RECONCILE_DAYS local days of daily_summaries for recently active users."""
+    from infra.db.repositories.daily_summary_repo import DailySummaryRepo
+    from infra.db.repositories.diary_repo import local_day_bounds, pick_tz
+    from infra.db.repositories.user_settings_repo import UserSettingsRepo
+    from infra.db.session import SessionLocal
+
+    days = max(1, settings.jobs_reconcile_days)
+    since = datetime.now(timezone.utc) - timedelta(days=days + 1)
+    async with SessionLocal() as session:
+        user_ids = [r[0] for r in await session.execute(_ACTIVE_USERS, {"since": since, "since_day": since.date()})]
+    users = fixed = 0
+    for user_id in user_ids:
+        # one short transaction per user: summary writers from the API never wait long on us
+        async with SessionLocal() as session:
+            tz = pick_tz((await UserSettingsRepo(session).get(user_id) or {}).get("timezone"))
+            last = datetime.now(ZoneInfo(tz)).date()
+            first = last - timedelta(days=days - 1)
+            start, _ = local_day_bounds(first, tz)
+            _, end = local_day_bounds(last, tz)
+            fixed += await DailySummaryRepo(session).reconcile(
+                user_id=user_id, first=first, last=last, start=start, end=end, tz=tz
+            )
+        users += 1
+    return {"users": users, "fixed": fixed}
+
+
+@job("warm_caches", cron="*/5 * * * *", timeout_sec=240, retries=0)
+async def warm_caches() -> dict[str, int]:
+    """Fill settings/profile caches and today's diary snapshot for users who logged meals lately."""
+    from infra.db.repositories.diary_repo import DiaryRepo, pick_tz
+    from infra.db.repositories.profile_repo import ProfileRepo
+    from infra.db.repositories.user_settings_repo import UserSettingsRepo
+    from infra.db.session import SessionLocal
+
+    since = datetime.now(timezone.utc) - WARM_WINDOW
+    snapshots = 0
+    async with SessionLocal() as session:
+        user_ids = [r[0] for r in await session.execute(_RECENT_USERS, {"since": since, "limit": WARM_MAX_USERS})]
+        # three batched reads instead of three round trips per user
+        prefs = await UserSettingsRepo(session).get_many(user_ids)
+        await ProfileRepo(session).get_many(user_ids)
+        tzs = {uid: pick_tz((prefs.get(uid) or {}).get("timezone")) for uid in user_ids}
+        today = {uid: datetime.now(ZoneInfo(tz)).date() for uid, tz in tzs.items()}
+        diary = DiaryRepo(session)
+        stored = await diary.existing(today.items())
+        for user_id, day in today.items():
+            if (user_id, day) not in stored:
+                # under the user's lock: a meal write racing this build cannot be overwritten
+                await diary.rebuild(user_id=user_id, day=day, tz=tzs[user_id])
+                snapshots += 1
+    return {"users": len(user_ids), "snapshots": snapshots}
+
+
+@job("content_deliveries", cron="* * * * *", timeout_sec=50, retries=0)
+async def content_deliveries() -> dict[str, int]:
+    """Send due Telegram content deliveries; each failure is counted in meta, retried next minute."""
+    from infra.db.session import SessionLocal
+
+    sent = failed = 0
+    async with SessionLocal() as session:
+        rows = (
+            await session.execute(_DUE_DELIVERIES, {"max_attempts": DELIVERY_MAX_ATTEMPTS, "limit": DELIVERY_BATCH})
+        ).all()
+        if not rows:
+            return {"sent": 0, "failed": 0}
+        bot = _bot()
+        try:
+            for delivery_id, tg_id, payload in rows:
+                body = (payload or {}).get("text")
+                try:
+                    if not body:
+                        raise ValueError("payload has no text")
+                    await bot.send_message(chat_id=int(tg_id), text=str(body))
+                    await session.execute(_MARK_SENT, {"id": delivery_id})
+                    sent += 1
+                except Exception as e:
+                    await session.execute(_MARK_FAILED, {"id": delivery_id, "error": str(e)[:200]})
+                    failed += 1
+                await asyncio.sleep(0.05)  # stay under Telegram's ~30 messages/s
+        finally:
+            await session.commit()
+            await bot.session.close()
+    return {"sent": sent, "failed": failed}
+
+
+@job("weekly_digest", cron="0 10 * * 1", timeout_sec=3600)
+async def weekly_digest() -> dict[str, int]:
+    """Weekly summary (average kcal, compliance) with a WebApp button, to every user.
+
+    Each user is marked in Redis before the send, so a retried run skips who already got it.
+    """
+    from sqlalchemy import select
+
+    from domain.calculations import bmr_mifflin, target_kcal_from_goal, tdee_from_activity
+    from infra.db.models import User as UserModel
+    from infra.db.repositories.daily_summary_repo import DailySummaryRepo
+    from infra.db.repositories.profile_repo import ProfileRepo
+    from infra.db.session import SessionLocal
+
+    week = "{}-W{:02d}".format(*D.today().isocalendar()[:2])
+    sent = skipped = failed = 0
+    bot = _bot()
+    try:
+        async with SessionLocal() as session:
+            rows = (await session.execute(select(UserModel.id, UserModel.telegram_id))).all()
+            end = D.today()
+            start = end - timedelta(days=6)
+            summaries = DailySummaryRepo(session)
+            profiles = ProfileRepo(session)
+            for uid, tg_id in rows:
+                mark = f"digest:weekly:{week}:{uid}"
+                if not await redis_client.set(mark, 1, nx=True, ex=DIGEST_MARK_TTL_SEC):
+                    skipped += 1
+                    continue
+                try:
+                    items = await summaries.list_between(user_id=uid, start=start, end=end)
+                    n = max(1, len(items))
+                    kcal_avg = round(sum(i["kcal"] for i in items) / n, 0) if items else 0
+                    comp = None
+                    try:
+                        prof = await profiles.get_by_user_id(uid)
+                        if prof:
+                            age = 30
+                            bmr = bmr_mifflin(prof["sex"], age, float(prof["height_cm"]), float(prof["weight_kg"]))
+                            target_kcal = target_kcal_from_goal(tdee_from_activity(bmr, prof["activity_level"]), prof["goal"])
+                            lo, hi = 0.9 * target_kcal, 1.1 * target_kcal
+                            comp = int(100 * sum(1 for i in items if lo <= i["kcal"] <= hi) / n)
+                    except Exception:
+                        comp = None
+                    body = (
+                        "Ваш недельный дайджест:\n"
+                        f"Средние калории: {int(kcal_avg)} ккал/день\n"
+                        + (f"Комплаенс: {comp}% дней в цели\n" if comp is not None else "")
+                        + "Откройте WebApp для подробностей."
+                    )
+                    kb = {"inline_keyboard": [[{"text": "Открыть WebApp", "web_app": {"url": settings.webapp_url or ""}}]]}
+                    await bot.send_message(chat_id=int(tg_id), text=body, reply_markup=kb)
+                    sent += 1
+                except Exception as e:
+                    # not delivered: let the next attempt (or a manual re-run) try this user again
+                    await redis_client.delete(mark)
+                    failed += 1
+                    log.warning("digest_send_failed", user_id=uid, error=str(e))
+                await asyncio.sleep(0.05)
+    finally:
+        await bot.session.close()
+    return {"sent": sent, "skipped": skipped, "failed": failed}
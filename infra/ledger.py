@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+import structlog
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
+from infra.cache.redis import pipeline
+
+
+log = structlog.get_logger("ledger")
+
+# Rollup hashes: ledger:{YYYY-MM-DD}:feature:{feature} and ledger:{YYYY-MM-DD}:user:{user_id}
+ROLLUP_TTL_SEC = 40 * 24 * 3600
+
+
+@dataclass(slots=True)
+class InferenceRecord:
+    feature: str  # normalize | vision | coach | stt | tts
+    model: str
+    provider: str = "openai"
+    user_id: int | None = None  # users.id, not the Telegram id
+    meal_id: int | None = None
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    latency_ms: int | None = None
+    cost_usd: float | None = None
+    ok: bool = True
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def as_row(self) -> dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "meal_id": self.meal_id,
+            "provider": self.provider,
+            "model": self.model,
+            "purpose": self.feature,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_ms": self.latency_ms,
+            "cost_usd": self.cost_usd,
+            "ok": self.ok,
+            "created_at": self.created_at,
+        }
+
+
+# Provider calls run in the event loop and in worker threads alike; deque append/popleft are
+# atomic, so record() needs no lock. When full, the oldest records are dropped, never the caller.
+_buffer: deque[InferenceRecord] = deque(maxlen=max(1, settings.ledger_buffer_size))
+_task: asyncio.Task | None = None
+
+
+def record(rec: InferenceRecord) -> None:
+    """Queue a provider call for the background writer; never blocks, never raises."""
+    _buffer.append(rec)
+
+
+def chat_cost(input_tokens: int | None, output_tokens: int | None) -> float:
+    return (input_tokens or 0) / 1000.0 * settings.openai_cost_input_per_1k + (
+        output_tokens or 0
+    ) / 1000.0 * settings.openai_cost_output_per_1k
+
+
+class _Call:
+    """Mutable record handed out by ``track``; the caller fills in usage/cost as it learns them."""
+
+    __slots__ = ("rec",)
+
+    def __init__(self, rec: InferenceRecord) -> None:
+        self.rec = rec
+
+    def usage(self, resp: Any, *, cost: float | None = None) -> None:
+        """Take token counts from an OpenAI response; cost defaults to the per-1k chat prices."""
+        usage = getattr(resp, "usage", None)
+        in_t = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        out_t = getattr(usage, "completion_tokens", None) if usage is not None else None
+        if in_t is not None:
+            self.rec.input_tokens = (self.rec.input_tokens or 0) + int(in_t)
+        if out_t is not None:
+            self.rec.output_tokens = (self.rec.output_tokens or 0) + int(out_t)
+        self.rec.cost_usd = (self.rec.cost_usd or 0.0) + (chat_cost(in_t, out_t) if cost is None else cost)
+
+    def cost(self, value: float) -> None:
+        self.rec.cost_usd = (self.rec.cost_usd or 0.0) + float(value)
+
+
+@contextmanager
+def track(feature: str, *, model: str, user_id: int | None = None, meal_id: int | None = None) -> Iterator[_Call]:
+    """Time a provider call and queue its record on exit (``ok=False`` if the block raised)."""
+    call = _Call(InferenceRecord(feature=feature, model=model, user_id=user_id, meal_id=meal_id))
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.rec.ok = False
+        raise
+    finally:
+        call.rec.latency_ms = int((time.perf_counter() - started) * 1000)
+        record(call.rec)
+
+
+def _drain(limit: int) -> list[InferenceRecord]:
+    out: list[InferenceRecord] = []
+    while len(out) < limit:
+        try:
+            out.append(_buffer.popleft())
+        except IndexError:
+            break
+    return out
+
+
+async def _write_rows(batch: list[InferenceRecord]) -> None:
+    from infra.db.models import LLMInference
+    from infra.db.session import engine
+
+    rows = [r.as_row() for r in batch]
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(insert(LLMInference).values(rows))
+    except IntegrityError:
+        # a stale/foreign user_id must not cost the whole batch
+        for row in rows:
+            row["user_id"] = None
+        async with engine.begin() as conn:
+            await conn.execute(insert(LLMInference).values(rows))
+
+
+async def _write_rollups(batch: list[InferenceRecord]) -> None:
+    pipe = pipeline()
+    keys: set[str] = set()
+    for r in batch:
+        day = r.created_at.date().isoformat()
+        targets = [(f"ledger:{day}:feature:{r.feature}", "")]
+        if r.user_id is not None:
+            targets.append((f"ledger:{day}:user:{r.user_id}", f"{r.feature}:"))
+        for key, prefix in targets:
+            keys.add(key)
+            pipe.hincrby(key, f"{prefix}calls", 1)
+            if not r.ok:
+                pipe.hincrby(key, f"{prefix}errors", 1)
+            if r.cost_usd:
+                pipe.hincrbyfloat(key, f"{prefix}cost_usd", r.cost_usd)
+            if r.input_tokens:
+                pipe.hincrby(key, f"{prefix}input_tokens", r.input_tokens)
+            if r.output_tokens:
+                pipe.hincrby(key, f"{prefix}output_tokens", r.output_tokens)
+            if r.latency_ms is not None:
+                pipe.hincrby(key, f"{prefix}latency_ms", r.latency_ms)
+    for key in keys:
+        pipe.expire(key, ROLLUP_TTL_SEC)
+    await pipe.execute()
+
+
+async def flush() -> int:
+    """Write everything queued so far: multi-row INSERTs into llm_inferences plus Redis rollups."""
+    written = 0
+    while True:
+        batch = _drain(max(1, settings.ledger_batch_size))
+        if not batch:
+            return written
+        try:
+            await _write_rows(batch)
+        except Exception as e:
+            log.warning("ledger_db_write_failed", error=str(e), dropped=len(batch))
+        try:
+            await _write_rollups(batch)
+        except Exception as e:
+            log.warning("ledger_rollup_failed", error=str(e))
+        written += len(batch)
+
+
+async def _run(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await flush()
+
+
+def start() -> None:
+    """Start the per-process writer task (idempotent); call from the running event loop."""
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.get_running_loop().create_task(_run(max(0.05, settings.ledger_flush_interval_sec)))
+
+
+async def stop() -> None:
+    """Stop the writer and flush what is left."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    await flush()
@@ -1,41 +1,94 @@
 from __future__ import annotations
 
+import asyncio
+import io
 import os
-from typing import Optional
+import threading
+from typing import Any, AsyncIterator, Optional
 
 from core.config import settings
-from typing import Optional
-try:
-    import boto3  # type: ignore
-except Exception:
-    boto3 = None  # optional
+
+
+def _load_boto3():
+    # boto3/botocore take ~0.3 s to import; only pay for it when S3 is configured
+    try:
+        import boto3  # type: ignore
+    except Exception:
+        return None  # optional
+    return boto3
+
+
+_MB = 1024 * 1024
 
 
 class ObjectStorage:
+    """S3/MinIO when ``S3_ENDPOINT_URL`` and ``S3_BUCKET`` are set, else files under ``data/objects``.
+
+    The sync methods are thread-safe (one boto3 client, whose pool holds S3_MAX_CONNECTIONS
+    connections); the async ones run them in worker threads so the event loop never blocks.
+    Use :func:`get_storage` for the process-wide instance instead of constructing one per call.
+    """
+
     def __init__(self) -> None:
-        # S3/MinIO if configured, else local
-        self._use_s3 = bool(settings.s3_endpoint_url and settings.s3_bucket and boto3)
+        boto3 = _load_boto3() if (settings.s3_endpoint_url and settings.s3_bucket) else None
+        self._use_s3 = bool(boto3)
         if self._use_s3:
-            self._s3 = boto3.client(
+            from boto3.s3.transfer import TransferConfig  # type: ignore
+            from botocore.config import Config  # type: ignore
+
+            self._s3 = boto3.session.Session().client(
                 "s3",
                 endpoint_url=settings.s3_endpoint_url,
                 aws_access_key_id=settings.s3_access_key_id,
                 aws_secret_access_key=settings.s3_secret_access_key,
+                region_name=settings.s3_region,
+                config=Config(
+                    max_pool_connections=settings.s3_max_connections,
+                    connect_timeout=5,
+                    read_timeout=30,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                    # MinIO (and most S3 stand-ins) serve buckets by path, not by virtual host
+                    s3={"addressing_style": "path"},
+                ),
             )
             self._bucket = settings.s3_bucket  # type: ignore
+            self._transfer = TransferConfig(
+                multipart_threshold=settings.s3_multipart_threshold_mb * _MB,
+                multipart_chunksize=settings.s3_multipart_chunk_mb * _MB,
+                max_concurrency=4,
+            )
         else:
             base_dir = os.path.abspath(os.path.join(os.getcwd(), "data", "objects"))
             os.makedirs(base_dir, exist_ok=True)
             self.base_dir = base_dir
 
-    def put_bytes(self, object_key: str, data: bytes) -> str:
+    def ensure_bucket(self) -> None:
+        """Create the bucket if it is missing (a fresh MinIO); no-op for local files."""
+        if not self._use_s3:
+            return
+        try:
+            self._s3.head_bucket(Bucket=self._bucket)
+        except Exception:
+            self._s3.create_bucket(Bucket=self._bucket)
+
+    def put_bytes(self, object_key: str, data: bytes, content_type: Optional[str] = None) -> str:
         if self._use_s3:
-            self._s3.put_object(Bucket=self._bucket, Key=object_key, Body=data)
+            extra: dict[str, Any] = {"ContentType": content_type} if content_type else {}
+            if len(data) >= self._transfer.multipart_threshold:
+                # parts are uploaded in parallel and retried one by one
+                self._s3.upload_fileobj(
+                    io.BytesIO(data), self._bucket, object_key, ExtraArgs=extra or None, Config=self._transfer
+                )
+            else:
+                self._s3.put_object(Bucket=self._bucket, Key=object_key, Body=data, **extra)
             return object_key
         path = os.path.join(self.base_dir, object_key)
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "wb") as f:
+        # write aside and rename: a concurrent reader never sees a half-written file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
             f.write(data)
+        os.replace(tmp, path)
         return object_key
 
     def get_path(self, object_key: str) -> str:
@@ -46,4 +99,65 @@ class ObjectStorage:
             return tmp
         return os.path.join(self.base_dir, object_key)
 
+    def get_bytes(self, object_key: str) -> bytes:
+        if self._use_s3:
+            return self._s3.get_object(Bucket=self._bucket, Key=object_key)["Body"].read()
+        with open(os.path.join(self.base_dir, object_key), "rb") as f:
+            return f.read()
+
+    def _open(self, object_key: str, start: int | None = None, end: int | None = None):  # type: ignore[no-untyped-def]
+        # readable stream positioned at ``start``; ``end`` is inclusive (HTTP Range semantics)
+        if self._use_s3:
+            extra = {"Range": f"bytes={start or 0}-{'' if end is None else end}"} if start or end is not None else {}
+            return self._s3.get_object(Bucket=self._bucket, Key=object_key, **extra)["Body"]
+        f = open(os.path.join(self.base_dir, object_key), "rb")
+        if start:
+            f.seek(start)
+        return f
+
+    def size(self, object_key: str) -> int:
+        if self._use_s3:
+            return int(self._s3.head_object(Bucket=self._bucket, Key=object_key)["ContentLength"])
+        return os.path.getsize(os.path.join(self.base_dir, object_key))
+
+    async def put(self, object_key: str, data: bytes, *, content_type: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.put_bytes, object_key, data, content_type)
+
+    async def get(self, object_key: str) -> bytes:
+        return await asyncio.to_thread(self.get_bytes, object_key)
+
+    async def stat(self, object_key: str) -> int:
+        """Object size in bytes."""
+        return await asyncio.to_thread(self.size, object_key)
+
+    async def stream(
+        self, object_key: str, *, start: int | None = None, end: int | None = None, chunk_size: int = 256 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Yield the object (or the inclusive byte range ``start``-``end``) in chunks, never whole."""
+        body = await asyncio.to_thread(self._open, object_key, start, end)
+        remaining = None if self._use_s3 or end is None else end - (start or 0) + 1
+        try:
+            while remaining is None or remaining > 0:
+                n = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(body.read, n)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(body.close)
+
+
+_storage: ObjectStorage | None = None
+_storage_lock = threading.Lock()
+
 
+def get_storage() -> ObjectStorage:
+    """Process-wide storage: one client, one connection pool, credentials resolved once."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = ObjectStorage()
+    return _storage
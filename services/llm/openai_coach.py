@@ -5,7 +5,7 @@ import json
 from pathlib import Path
 
 from core.config import settings
-from infra.cache.redis import redis_client
+from infra import ledger
 
 
 PERSONA_SYSTEM_PROMPT = (
@@ -42,34 +42,16 @@ def chat_coach(context: dict[str, Any], user_text: str) -> str:
 
     client = OpenAI(api_key=settings.openai_api_key)
     msgs = build_context_messages(context, user_text)
-    resp = client.chat.completions.create(
-        model=settings.openai_model_normalize or "gpt-4o-mini",
-        messages=msgs,
-        temperature=0.3,
-    )
-    out = resp.choices[0].message.content or ""
-    # crude token accounting if available
-    try:
-        usage = getattr(resp, "usage", None)
-        if usage:
-            in_t = getattr(usage, "prompt_tokens", 0) or 0
-            out_t = getattr(usage, "completion_tokens", 0) or 0
-            cost = (in_t / 1000.0) * settings.openai_cost_input_per_1k + (out_t / 1000.0) * settings.openai_cost_output_per_1k
-            # per-user daily cost
-            # context may hold user_id
-            uid = context.get("user_id")
-            if uid:
-                from datetime import date as D
-                key = f"cost:coach:{uid}:{D.today().isoformat()}"
-                awaitable = redis_client.incrbyfloat(key, float(cost))  # type: ignore
-                try:
-                    # for sync func, fire and forget; most redis clients return awaitable when async
-                    pass
-                except Exception:
-                    pass
-    except Exception:
-        pass
-    return out
+    model = settings.openai_model_normalize or "gpt-4o-mini"
+    # tokens/cost go to the inference ledger (per-user daily rollup when context carries user_id)
+    with ledger.track("coach", model=model, user_id=context.get("user_id")) as call:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=msgs,
+            temperature=0.3,
+        )
+        call.usage(resp)
+    return resp.choices[0].message.content or ""
 
 
 def _load_dietology_snippets(max_chars: int = 1800) -> str:
@@ -102,12 +84,15 @@ def chat_coach_structured(context: dict[str, Any], user_text: str) -> dict[str,
     if diet:
         msgs.insert(1, {"role": "system", "content": f"Краткие выдержки из методологии:\n{diet}"})
     msgs.insert(1, {"role": "system", "content": tools_spec})
-    resp = client.chat.completions.create(
-        model=settings.openai_model_normalize or "gpt-4o-mini",
-        messages=msgs,
-        temperature=0.2,
-        response_format={"type": "json_object"},
-    )
+    model = settings.openai_model_normalize or "gpt-4o-mini"
+    with ledger.track("coach", model=model, user_id=context.get("user_id")) as call:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=msgs,
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        )
+        call.usage(resp)
     txt = resp.choices[0].message.content or "{}"
     try:
         data = json.loads(txt)
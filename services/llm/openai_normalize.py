@@ -4,11 +4,7 @@ from typing import Any, Dict
 import structlog
 
 from core.config import settings
-
-try:
-    from openai import OpenAI
-except Exception:  # pragma: no cover - optional import guard
-    OpenAI = None  # type: ignore
+from infra import ledger
 
 
 log = structlog.get_logger(__name__)
@@ -130,22 +126,38 @@ FEW_SHOTS_EN = [
 ]
 
 
-def normalize_with_openai(text: str, locale: str = "ru") -> dict | None:
-    if not settings.openai_api_key or OpenAI is None:
+def _openai_client_cls():
+    # The OpenAI SDK costs ~0.6 s to import; load it on the first cache miss
+    # instead of at API/bot start-up.
+    try:
+        from openai import OpenAI
+    except Exception:  # pragma: no cover - optional import guard
+        return None
+    return OpenAI
+
+
+def normalize_with_openai(text: str, locale: str = "ru", *, model: str | None = None, user_id: int | None = None) -> dict | None:
+    if not settings.openai_api_key:
+        return None
+    model = model or settings.openai_model_normalize
+    OpenAI = _openai_client_cls()
+    if OpenAI is None:
         return None
     try:
         client = OpenAI(api_key=settings.openai_api_key)
         # STEP 1: food check
         step1_sys = STEP1_PROMPT_RU if locale == "ru" else STEP1_PROMPT_EN
-        ch1 = client.chat.completions.create(
-            model=settings.openai_model_normalize,
-            messages=[
-                {"role": "system", "content": step1_sys},
-                {"role": "user", "content": text},
-            ],
-            temperature=0.1,
-            response_format={"type": "json_object"},
-        )
+        with ledger.track("normalize", model=model, user_id=user_id) as call:
+            ch1 = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": step1_sys},
+                    {"role": "user", "content": text},
+                ],
+                temperature=0.1,
+                response_format={"type": "json_object"},
+            )
+            call.usage(ch1)
         import json as _json
         s1_txt = (ch1.choices[0].message.content or "{}").strip()
         try:
@@ -171,15 +183,17 @@ def normalize_with_openai(text: str, locale: str = "ru") -> dict | None:
             "user_text: " + text + "\n" +
             "check_json: " + _json.dumps(s1, ensure_ascii=False)
         )
-        ch2 = client.chat.completions.create(
-            model=settings.openai_model_normalize,
-            messages=[
-                {"role": "system", "content": step2_sys},
-                {"role": "user", "content": user_payload},
-            ],
-            temperature=0.2,
-            response_format={"type": "json_object"},
-        )
+        with ledger.track("normalize", model=model, user_id=user_id) as call:
+            ch2 = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": step2_sys},
+                    {"role": "user", "content": user_payload},
+                ],
+                temperature=0.2,
+                response_format={"type": "json_object"},
+            )
+            call.usage(ch2)
         s2_txt = (ch2.choices[0].message.content or "{}").strip()
         try:
             content = _json.loads(s2_txt)
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Optional
 
 from core.config import settings
+from infra import ledger
 
 
 def _get_openai_client():
@@ -13,7 +14,9 @@ def _get_openai_client():
     return OpenAI(api_key=settings.openai_api_key)
 
 
-def transcribe_audio_bytes(audio_bytes: bytes, filename: str = "audio.ogg", language: Optional[str] = "ru") -> str:
+def transcribe_audio_bytes(
+    audio_bytes: bytes, filename: str = "audio.ogg", language: Optional[str] = "ru", *, user_id: int | None = None
+) -> str:
     """Transcribe audio bytes using OpenAI Whisper (or 4o-mini-transcribe if configured)."""
     client = _get_openai_client()
     # The SDK requires a file-like object
@@ -23,18 +26,22 @@ def transcribe_audio_bytes(audio_bytes: bytes, filename: str = "audio.ogg", lang
         f.name = filename
         try:
             # Prefer whisper-1; fallback to gpt-4o-mini-transcribe for new API
-            resp = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f,
-                language=language or "ru",
-            )
+            with ledger.track("stt", model="whisper-1", user_id=user_id) as call:
+                resp = client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=f,
+                    language=language or "ru",
+                )
+                call.cost(settings.openai_cost_stt_per_req)
         except Exception:
             f.seek(0)
-            resp = client.audio.transcriptions.create(
-                model="gpt-4o-mini-transcribe",
-                file=f,
-                language=language or "ru",
-            )
+            with ledger.track("stt", model="gpt-4o-mini-transcribe", user_id=user_id) as call:
+                resp = client.audio.transcriptions.create(
+                    model="gpt-4o-mini-transcribe",
+                    file=f,
+                    language=language or "ru",
+                )
+                call.cost(settings.openai_cost_stt_per_req)
     text = getattr(resp, "text", None) or (resp.get("text") if isinstance(resp, dict) else None)
     return text or ""
 
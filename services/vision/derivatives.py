@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import posixpath
+
+import structlog
+
+from core.config import settings
+from infra.cache.disk_lru import DiskLRU
+from infra.storage.object_storage import get_storage
+from services.vision.processing import render_webp, run_processing
+
+
+log = structlog.get_logger("derivatives")
+
+WEBP = "image/webp"
+
+
+def _sizes(raw: str) -> tuple[int, ...]:
+    return tuple(sorted({int(x) for x in raw.split(",") if x.strip()}))
+
+
+# Sizes (longest side, px) the image endpoint serves; the ingest subset is rendered at upload
+SIZES = _sizes(settings.image_derivative_sizes)
+INGEST_SIZES = tuple(s for s in _sizes(settings.image_ingest_sizes) if s in SIZES)
+
+_cache = DiskLRU(settings.image_cache_dir, settings.image_cache_max_mb * 1024 * 1024)
+# keep background renders referenced until they finish
+_pending: set[asyncio.Task] = set()
+
+
+def derivative_key(object_key: str, sha256: str, size: int) -> str:
+    """Content-addressed, next to the original: ``.../<sha>.jpg`` -> ``.../<sha>.w<size>.webp``."""
+    return posixpath.join(posixpath.dirname(object_key), f"{sha256}.w{size}.webp")
+
+
+def _render_all(data: bytes, sizes: tuple[int, ...]) -> dict[int, bytes]:
+    return {size: render_webp(data, size) for size in sizes}
+
+
+async def _store(object_key: str, sha256: str, rendered: dict[int, bytes]) -> None:
+    storage = get_storage()
+    for size, blob in rendered.items():
+        key = derivative_key(object_key, sha256, size)
+        await storage.put(key, blob, content_type=WEBP)
+        await _cache.put(key, blob)
+
+
+async def generate_at_ingest(object_key: str, sha256: str, data: bytes) -> None:
+    """Render INGEST_SIZES from the just-stored original; failures only log (served on demand later)."""
+    try:
+        rendered = await run_processing(_render_all, data, INGEST_SIZES)
+        await _store(object_key, sha256, rendered)
+    except Exception as e:
+        log.warning("derivatives_ingest_failed", object_key=object_key, error=str(e))
+
+
+def schedule_ingest(object_key: str, sha256: str, data: bytes) -> None:
+    """Fire-and-forget :func:`generate_at_ingest`, so the upload response does not wait on it."""
+    if not INGEST_SIZES:
+        return
+    task = asyncio.get_running_loop().create_task(generate_at_ingest(object_key, sha256, data))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def get_derivative(object_key: str, sha256: str, size: int) -> bytes:
+    """WebP of ``size``: disk LRU, then object storage, else rendered from the original and stored."""
+    key = derivative_key(object_key, sha256, size)
+    blob = await _cache.get(key)
+    if blob is not None:
+        return blob
+    storage = get_storage()
+    try:
+        blob = await storage.get(key)
+    except Exception:
+        blob = None
+    if blob is not None:
+        await _cache.put(key, blob)
+        return blob
+    rendered = await run_processing(_render_all, await storage.get(object_key), (size,))
+    await _store(object_key, sha256, rendered)
+    return rendered[size]
@@ -5,6 +5,7 @@ import json
 from typing import Any
 
 from core.config import settings
+from infra import ledger
 
 
 VISION_PROMPT = (
@@ -29,7 +30,7 @@ VISION_PROMPT = (
 )
 
 
-def infer_foods_from_image_bytes(image_bytes: bytes) -> dict[str, Any]:
+def infer_foods_from_image_bytes(image_bytes: bytes, *, user_id: int | None = None) -> dict[str, Any]:
     from openai import OpenAI
 
     client = OpenAI(api_key=settings.openai_api_key)
@@ -43,12 +44,14 @@ def infer_foods_from_image_bytes(image_bytes: bytes) -> dict[str, Any]:
             ],
         }
     ]
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=msgs,
-        temperature=0.2,
-        response_format={"type": "json_object"},
-    )
+    with ledger.track("vision", model="gpt-4o-mini", user_id=user_id) as call:
+        resp = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=msgs,
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        )
+        call.usage(resp, cost=settings.openai_cost_vision_per_image)
     txt = resp.choices[0].message.content or "{}"
     try:
         data = json.loads(txt)
@@ -82,7 +85,7 @@ def infer_foods_from_image_bytes(image_bytes: bytes) -> dict[str, Any]:
     return {"items": items, "quality": quality}
 
 
-def infer_foods_from_images_bytes(images: list[bytes]) -> dict[str, Any]:
+def infer_foods_from_images_bytes(images: list[bytes], *, user_id: int | None = None) -> dict[str, Any]:
     from openai import OpenAI
 
     if not images:
@@ -93,12 +96,14 @@ def infer_foods_from_images_bytes(images: list[bytes]) -> dict[str, Any]:
         b64 = base64.b64encode(b).decode("ascii")
         content.append({"type": "input_image", "image_data": b64})
     msgs = [{"role": "user", "content": content}]
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=msgs,
-        temperature=0.2,
-        response_format={"type": "json_object"},
-    )
+    with ledger.track("vision", model="gpt-4o-mini", user_id=user_id) as call:
+        resp = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=msgs,
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        )
+        call.usage(resp, cost=settings.openai_cost_vision_per_image * min(len(images), 5))
     txt = resp.choices[0].message.content or "{}"
     try:
         data = json.loads(txt)
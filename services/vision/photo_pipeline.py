@@ -4,7 +4,7 @@ import hashlib
 from dataclasses import dataclass
 from typing import Literal, Optional
 
-from infra.storage.object_storage import ObjectStorage
+from infra.storage.object_storage import get_storage
 
 
 @dataclass
@@ -27,7 +27,7 @@ def compute_sha256(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
-def save_photo(user_id: int, photo: PhotoIn) -> PhotoResult:
+async def save_photo(user_id: int, photo: PhotoIn) -> PhotoResult:
     sha = compute_sha256(photo.bytes)
     ext = {
         "image/jpeg": "jpg",
@@ -35,8 +35,7 @@ def save_photo(user_id: int, photo: PhotoIn) -> PhotoResult:
         "image/webp": "webp",
     }.get(photo.content_type, "bin")
     object_key = f"users/{user_id}/images/{sha[:2]}/{sha}.{ext}"
-    storage = ObjectStorage()
-    storage.put_bytes(object_key, photo.bytes)
+    await get_storage().put(object_key, photo.bytes, content_type=photo.content_type)
     return PhotoResult(object_key=object_key, sha256=sha, width=photo.width, height=photo.height)
 
 
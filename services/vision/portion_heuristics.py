@@ -39,7 +39,8 @@ def _load_priors() -> dict:
                 return json.load(f)
     except Exception:
         pass
-    return _DEFAULT_PRIORS
+    # fresh copy: callers merge a user's overrides into it
+    return {k: dict(v) for k, v in _DEFAULT_PRIORS.items()}
 
 
 def apply_portion_heuristics(items: list[dict[str, Any]], user_priors: dict | None = None) -> list[dict[str, Any]]:
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any
+
+from domain.dietary_rules import rules_for
+from services.vision.portion_heuristics import apply_portion_heuristics
+from services.vision.qc import validate_items
+
+
+# Tiers whose stored ``raw`` is a real provider answer, safe to reuse for identical bytes
+# (``manual`` is the budget placeholder with no items; ``reuse`` carries the source's raw)
+REUSABLE_TIERS = ("llm", "llm_small_image", "cache", "reuse")
+
+
+def finalize(raw: dict[str, Any], prefs: dict, tier: str) -> dict[str, Any]:
+    """Per-user result from a raw provider answer: portion priors, diet/allergen warnings, QC.
+
+    ``raw`` is kept under ``"raw"`` so the same bytes can be re-finalized for another user
+    without leaking this user's priors or warnings.
+    """
+    # copies: the heuristics and annotate() must not write into the reusable raw answer
+    items = [dict(i) for i in raw.get("items") or []]
+    items = apply_portion_heuristics(items, user_priors=prefs.get("portion_priors") or {})
+    items = rules_for(prefs).annotate(items)
+    qc = validate_items(items)
+    quality = raw.get("quality") or {}
+    merged_quality = {
+        "not_food_probability": float(quality.get("not_food_probability", 0.0) or 0.0),
+        "unrealistic_scene_probability": float(quality.get("unrealistic_scene_probability", 0.0) or 0.0),
+        "needs_clarification": bool(quality.get("needs_clarification", False)) or bool(qc.get("needs_clarification", False)),
+        "clarifications": list(set([*(quality.get("clarifications") or []), *(qc.get("clarifications") or [])])),
+        "issues": list(set([*(quality.get("issues") or []), *(qc.get("issues") or [])])),
+    }
+    result = {k: v for k, v in raw.items() if k not in ("items", "quality", "raw", "tier")}
+    result.update({"items": items, "quality": merged_quality, "tier": tier, "raw": raw})
+    return result
@@ -1,10 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Optional, TypeVar
 
-from PIL import Image as PILImage, ImageOps
-import io
+from core.config import settings
+
+
+T = TypeVar("T")
+
+# Pillow releases the GIL while decoding/resizing/encoding, so a small thread pool keeps image
+# work off the event loop without process start-up or pickling costs.
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=max(1, settings.image_pool_workers), thread_name_prefix="imgproc")
+    return _pool
+
+
+async def run_processing(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run CPU-bound image work in the process-wide preprocessing pool."""
+    return await asyncio.get_running_loop().run_in_executor(_executor(), functools.partial(fn, *args, **kwargs))
 
 
 @dataclass
@@ -16,6 +42,9 @@ class ProcessedImage:
 
 
 def preprocess_photo(raw_bytes: bytes, content_type: str) -> ProcessedImage:
+    # Pillow is imported on first use so API/bot start-up does not pay for it
+    from PIL import Image as PILImage, ImageOps
+
     # Basic orientation/resize and compression
     with PILImage.open(io.BytesIO(raw_bytes)) as im:
         im = ImageOps.exif_transpose(im)
@@ -36,3 +65,29 @@ def preprocess_photo(raw_bytes: bytes, content_type: str) -> ProcessedImage:
         return ProcessedImage(bytes=data, width=im.width, height=im.height, content_type=ct)
 
 
+def render_webp(raw_bytes: bytes, max_side: int, quality: int = 80) -> bytes:
+    """WebP whose longer side is at most ``max_side`` (never upscaled)."""
+    from PIL import Image as PILImage
+
+    with PILImage.open(io.BytesIO(raw_bytes)) as im:
+        im.draft("RGB", (max_side, max_side))  # JPEG: decode at a reduced scale when possible
+        im = im.convert("RGBA" if im.mode in ("RGBA", "LA", "P") else "RGB")
+        im.thumbnail((max_side, max_side))
+        buf = io.BytesIO()
+        im.save(buf, format="WEBP", quality=quality, method=4)
+        return buf.getvalue()
+
+
+def downscale_for_inference(raw_bytes: bytes, max_side: int) -> bytes:
+    """Smaller JPEG for budget-limited vision calls (fewer image tokens); unchanged if already small."""
+    from PIL import Image as PILImage
+
+    with PILImage.open(io.BytesIO(raw_bytes)) as im:
+        w, h = im.size
+        if max(w, h) <= max_side:
+            return raw_bytes
+        scale = max_side / max(w, h)
+        im = im.convert("RGB").resize((max(1, int(w * scale)), max(1, int(h * scale))))
+        buf = io.BytesIO()
+        im.save(buf, format="JPEG", quality=80, optimize=True)
+        return buf.getvalue()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
-from typing import Literal, Optional
+from typing import Any, Literal, Optional
 
-from infra.cache.redis import redis_client
+from core.config import settings
+from infra.cache.redis import pipeline, redis_client
 
 
 @dataclass
@@ -14,23 +16,79 @@ class VisionTask:
 
 
 QUEUE_KEY = "vision:queue"
+# Task hash: user_id, status, tier and, once finished, ``result`` (JSON of compact_result)
 TASK_KEY = "vision:task:{}"
 
 
+def compact_result(items: list[dict[str, Any]], quality: dict[str, Any]) -> dict[str, Any]:
+    """What status polls return for a ready task: items plus flattened clarifications/quality flags."""
+    out: dict[str, Any] = {
+        "items": items,
+        "needs_clarification": bool(quality.get("needs_clarification", False)),
+        "not_food_probability": float(quality.get("not_food_probability", 0.0) or 0.0),
+        "unrealistic_scene_probability": float(quality.get("unrealistic_scene_probability", 0.0) or 0.0),
+    }
+    clar = list(set([*(quality.get("clarifications") or []), *(quality.get("issues") or [])]))
+    if clar:
+        out["clarifications"] = clar
+    return out
+
+
 async def enqueue(task: VisionTask) -> None:
-    await redis_client.rpush(QUEUE_KEY, task.image_id)
-    await redis_client.hset(TASK_KEY.format(task.image_id), mapping={
-        "user_id": task.user_id,
-        "status": task.status,
-    })
+    # one MULTI/EXEC: the task hash exists before a worker can pop the id
+    async with pipeline(transaction=True) as pipe:
+        pipe.hset(TASK_KEY.format(task.image_id), mapping={
+            "user_id": task.user_id,
+            "status": task.status,
+        })
+        pipe.rpush(QUEUE_KEY, task.image_id)
+        await pipe.execute()
+
+
+async def set_status(image_id: int, status: str, **extra: str) -> None:
+    await redis_client.hset(TASK_KEY.format(image_id), mapping={"status": status, **extra})
+
+
+async def pop_batch(size: int) -> list[int]:
+    """Up to ``size`` queued image ids in one LPOP ... COUNT round trip."""
+    ids = await redis_client.lpop(QUEUE_KEY, max(1, size))
+    return [int(i) for i in ids or []]
+
+
+async def set_statuses(updates: dict[int, dict[str, str]], *, ttl_sec: int | None = None) -> None:
+    """Several ``set_status`` calls in one pipeline; each value holds ``status`` plus extra fields.
+
+    With ``ttl_sec`` the task hashes expire (finished tasks; Postgres stays the record).
+    """
+    if not updates:
+        return
+    async with pipeline() as pipe:
+        for image_id, fields in updates.items():
+            pipe.hset(TASK_KEY.format(image_id), mapping=fields)
+            if ttl_sec:
+                pipe.expire(TASK_KEY.format(image_id), ttl_sec)
+        await pipe.execute()
 
 
-async def set_status(image_id: int, status: str) -> None:
-    await redis_client.hset(TASK_KEY.format(image_id), mapping={"status": status})
+async def set_result(image_id: int, result: dict[str, Any], *, tier: str | None = None) -> None:
+    """Store a ready task's compact result (e.g. rebuilt from Postgres) for the next polls."""
+    fields = {"status": "ready", "result": json.dumps(result, ensure_ascii=False)}
+    if tier:
+        fields["tier"] = tier
+    await set_statuses({image_id: fields}, ttl_sec=settings.vision_result_ttl_sec)
 
 
 async def get_status(image_id: int) -> dict | None:
+    """Task hash with ``result`` unpacked into the top level (items, clarifications, flags)."""
     data = await redis_client.hgetall(TASK_KEY.format(image_id))
-    return data or None
+    if not data:
+        return None
+    raw = data.pop("result", None)
+    if raw:
+        try:
+            data.update(json.loads(raw))
+        except ValueError:
+            pass
+    return data
 
 
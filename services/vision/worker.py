@@ -1,89 +1,141 @@
 from __future__ import annotations
 
 import asyncio
-import os
+import json
 from typing import Any
 
-from infra.cache.redis import redis_client
+from infra import ledger
+from infra.cost_governor import REDUCED, TIER_KEY, budget_for
+from infra.cache.redis import pipeline as redis_pipeline
 from core.config import settings
-from services.vision.queue import QUEUE_KEY, set_status
-from services.vision.openai_vision import infer_foods_from_image_bytes, infer_foods_from_images_bytes
-from infra.storage.object_storage import ObjectStorage
-from infra.db.session import get_session
+from services.vision.queue import compact_result, pop_batch, set_statuses
+from services.vision.openai_vision import infer_foods_from_images_bytes
+from infra.storage.object_storage import ObjectStorage, get_storage
+from infra.db.session import SessionLocal
 from infra.db.repositories.image_repo import ImageRepo
 from infra.db.repositories.user_settings_repo import UserSettingsRepo
-from infra.db.repositories.meal_repo import MealRepo
 from infra.db.repositories.vision_inference_repo import VisionInferenceRepo
-from services.vision.portion_heuristics import apply_portion_heuristics
-from services.vision.qc import validate_items
+from services.vision.postprocess import finalize
 from services.vision.cache import get_cached_vision, set_cached_vision
+from services.vision.processing import downscale_for_inference
+
+
+def _manual_result() -> dict[str, Any]:
+    # answer of the manual tier, when the budget allows no provider call
+    return {
+        "items": [],
+        "quality": {
+            "needs_clarification": True,
+            "clarifications": ["Распознавание фото сейчас недоступно — опишите блюдо текстом"],
+            "issues": ["budget"],
+        },
+    }
+
+
+async def _infer(img: dict[str, Any], prefs: dict, storage: ObjectStorage) -> tuple[dict[str, Any], str]:
+    """Vision result (items + merged quality) and the tier that produced it, for one image."""
+    user_id_for_img = img.get("user_id")
+    # TODO: group by media_group_id; for now single image inference
+    img_bytes = await storage.get(img["object_key"])
+    cached = await get_cached_vision(img_bytes)
+    if cached:
+        result = cached
+        tier = "cache"
+    else:
+        # Cost governor: smaller image past the soft threshold, no provider call past the hard one
+        budget = await budget_for(int(user_id_for_img) if user_id_for_img is not None else None)
+        if not budget.allows_llm:
+            result = _manual_result()
+            tier = "manual"
+        elif budget.level >= REDUCED:
+            small = downscale_for_inference(img_bytes, settings.vision_reduced_max_px)
+            # provider SDK is blocking: run it off the loop so the batch's calls overlap
+            result = await asyncio.to_thread(infer_foods_from_images_bytes, [small], user_id=user_id_for_img)
+            tier = "llm_small_image"
+        else:
+            result = await asyncio.to_thread(infer_foods_from_images_bytes, [img_bytes], user_id=user_id_for_img)
+            tier = "llm"
+        if tier != "manual":
+            await set_cached_vision(img_bytes, result)
+    # raw answer stays in the stored response; the per-user layer is rebuilt on reuse
+    return finalize(result, prefs, tier), tier
+
+
+async def process_batch(image_ids: list[int], storage: ObjectStorage) -> dict[int, str]:
+    """Run a batch of dequeued tasks; returns the final status per image id.
+
+    One session for the batch: image rows and user settings are read with one query each,
+    results go in with one multi-row INSERT and one commit, and every status change of the
+    batch is a single Redis pipeline.
+    """
+    await set_statuses({i: {"status": "processing"} for i in image_ids})
+    final: dict[int, dict[str, str]] = {i: {"status": "failed"} for i in image_ids}
+    tiers: list[str] = []
+    try:
+        async with SessionLocal() as session:
+            imgs = {img["id"]: img for img in await ImageRepo(session).get_by_ids(image_ids)}
+            user_ids = {int(img["user_id"]) for img in imgs.values() if img.get("user_id") is not None}
+            prefs = await UserSettingsRepo(session).get_many(user_ids) if user_ids else {}
+            # end the read transaction: no connection is held while the provider calls run
+            await session.commit()
+            todo = [i for i in image_ids if i in imgs]
+            outcomes = await asyncio.gather(
+                *(_infer(imgs[i], prefs.get(imgs[i].get("user_id")) or {}, storage) for i in todo),
+                return_exceptions=True,
+            )
+            rows = []
+            done: dict[int, str] = {}
+            results: dict[int, str] = {}
+            for image_id, outcome in zip(todo, outcomes):
+                if isinstance(outcome, BaseException):
+                    continue
+                result, tier = outcome
+                rows.append(
+                    {
+                        "image_id": image_id,
+                        "provider": "openai",
+                        "model": "gpt-4o-mini",
+                        "response": result,
+                        "confidence": result.get("confidence"),
+                    }
+                )
+                done[image_id] = tier
+                results[image_id] = json.dumps(compact_result(result["items"], result["quality"]), ensure_ascii=False)
+            await VisionInferenceRepo(session).create_many(rows)
+        for image_id, tier in done.items():
+            final[image_id] = {"status": "ready", "tier": tier, "result": results[image_id]}
+            tiers.append(tier)
+    finally:
+        # polls read the finished record straight from Redis until it expires
+        await set_statuses(final, ttl_sec=settings.vision_result_ttl_sec)
+    try:
+        # metrics: cost and counts, tiers
+        async with redis_pipeline() as pipe:
+            llm_calls = sum(1 for t in tiers if t.startswith("llm"))
+            if llm_calls:
+                pipe.incrby("metrics:vision:count", llm_calls)
+                pipe.incrbyfloat("metrics:vision:cost_total", llm_calls * settings.openai_cost_vision_per_image)
+            for tier in tiers:
+                pipe.incr(TIER_KEY.format(feature="vision", tier=tier))
+            await pipe.execute()
+    except Exception:
+        pass
+    return {i: v["status"] for i, v in final.items()}
 
 
 async def worker_loop(poll_interval: float = 1.0) -> None:
-    storage = ObjectStorage()
+    storage = get_storage()
+    ledger.start()
     while True:
-        image_id = await redis_client.lpop(QUEUE_KEY)
-        if not image_id:
+        image_ids = await pop_batch(settings.vision_worker_batch)
+        if not image_ids:
             await asyncio.sleep(poll_interval)
             continue
-        await set_status(int(image_id), "processing")
-        # Fetch image info
-        async with get_session() as session:  # type: ignore
-            repo = ImageRepo(session)
-            imgs = await repo.get_by_ids([int(image_id)])
-            if not imgs:
-                await set_status(int(image_id), "failed")
-                continue
-            img = imgs[0]
-            path = storage.get_path(img["object_key"])
-            user_id_for_img = img.get("user_id")
-        # Run vision inference via OpenAI (supports multi‑image aggregation)
         try:
-            # TODO: group by media_group_id; for now single image inference
-            with open(path, "rb") as f:
-                img_bytes = f.read()
-            cached = await get_cached_vision(img_bytes)
-            if cached:
-                result = cached
-            else:
-                result = infer_foods_from_images_bytes([img_bytes])
-                await set_cached_vision(img_bytes, result)
-                try:
-                    # metrics: cost and counts
-                    await redis_client.incr("metrics:vision:count")
-                    await redis_client.incrbyfloat("metrics:vision:cost_total", settings.openai_cost_vision_per_image)
-                except Exception:
-                    pass
-            items = result.get("items", [])
-            # Load user-specific priors if available
-            user_priors = {}
-            try:
-                if user_id_for_img is not None:
-                    async with get_session() as session2:  # type: ignore
-                        srepo = UserSettingsRepo(session2)
-                        prefs = await srepo.get(int(user_id_for_img)) or {}
-                        user_priors = prefs.get("portion_priors") or {}
-            except Exception:
-                user_priors = {}
-            items = apply_portion_heuristics(items, user_priors=user_priors)
-            # QC validation and clarifications merge
-            qc = validate_items(items)
-            quality = result.get("quality") or {}
-            merged_quality = {
-                "not_food_probability": float(quality.get("not_food_probability", 0.0) or 0.0),
-                "unrealistic_scene_probability": float(quality.get("unrealistic_scene_probability", 0.0) or 0.0),
-                "needs_clarification": bool(quality.get("needs_clarification", False)) or bool(qc.get("needs_clarification", False)),
-                "clarifications": list(set([*(quality.get("clarifications") or []), *(qc.get("clarifications") or [])])),
-                "issues": list(set([*(quality.get("issues") or []), *(qc.get("issues") or [])])),
-            }
-            result["items"] = items
-            result["quality"] = merged_quality
-            async with get_session() as session:  # type: ignore
-                vrepo = VisionInferenceRepo(session)
-                await vrepo.create(image_id=int(image_id), provider="openai", model="gpt-4o-mini", response=result, confidence=result.get("confidence"))
-            await set_status(int(image_id), "ready")
+            await process_batch(image_ids, storage)
         except Exception:
-            await set_status(int(image_id), "failed")
+            # statuses are already set to failed by process_batch; keep the worker alive
+            pass
 
 
 def run_worker_forever() -> None:
@@ -2,9 +2,8 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from openai import OpenAI
-
 from core.config import settings
+from infra import ledger
 
 
 def synthesize_speech(
@@ -13,6 +12,7 @@ def synthesize_speech(
     voice: str | None = None,
     model: str = "gpt-4o-mini-tts",
     api_key: str | None = None,
+    user_id: int | None = None,
 ) -> bytes:
     """Return synthesized speech bytes using the most compatible API path.
 
@@ -20,15 +20,21 @@ def synthesize_speech(
     object with ``content`` or a ``read()`` method. We avoid passing a
     non-portable ``format`` argument to keep compatibility across SDK versions.
     """
+    from openai import OpenAI
+
     client = OpenAI(api_key=api_key or settings.openai_api_key)
 
+    cost = len(text) / 1000.0 * settings.openai_cost_tts_per_1k_chars
+
     # Try the non-streaming variant first
     try:
-        result = client.audio.speech.create(
-            model=model,
-            voice=voice or settings.openai_tts_voice,
-            input=text,
-        )
+        with ledger.track("tts", model=model, user_id=user_id) as call:
+            result = client.audio.speech.create(
+                model=model,
+                voice=voice or settings.openai_tts_voice,
+                input=text,
+            )
+            call.cost(cost)
         if hasattr(result, "content") and result.content is not None:
             return result.content  # type: ignore[attr-defined]
         if hasattr(result, "read"):
@@ -38,11 +44,12 @@ def synthesize_speech(
         pass
 
     # Fallback: use streaming response and capture bytes
-    with client.audio.speech.with_streaming_response.create(
+    with ledger.track("tts", model=model, user_id=user_id) as call, client.audio.speech.with_streaming_response.create(
         model=model,
         voice=voice or settings.openai_tts_voice,
         input=text,
     ) as response:
+        call.cost(cost)
         return response.read()  # type: ignore[no-any-return]
 
 
@@ -53,23 +60,27 @@ def synthesize_to_file(
     voice: str | None = None,
     model: str = "gpt-4o-mini-tts",
     api_key: str | None = None,
+    user_id: int | None = None,
 ) -> Path:
     """Synthesize speech and write to ``target_path``.
 
     Prefer the streaming helper to avoid memory overhead and to work across SDK
     versions; gracefully fall back to a non-streaming call if needed.
     """
+    from openai import OpenAI
+
     client = OpenAI(api_key=api_key or settings.openai_api_key)
     path = Path(target_path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        with client.audio.speech.with_streaming_response.create(
+        with ledger.track("tts", model=model, user_id=user_id) as call, client.audio.speech.with_streaming_response.create(
             model=model,
             voice=voice or settings.openai_tts_voice,
             input=text,
         ) as response:
             response.stream_to_file(path)
+            call.cost(len(text) / 1000.0 * settings.openai_cost_tts_per_1k_chars)
             return path
     except Exception:
         # Fallback to non-streaming
@@ -78,6 +89,7 @@ def synthesize_to_file(
             voice=voice,
             model=model,
             api_key=api_key,
+            user_id=user_id,
         )
         path.write_bytes(audio)
         return path
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from datetime import datetime, timezone
+
+from conftest import needs_db
+
+
+TZ = "UTC"
+
+
+@needs_db
+def test_rebuild_waits_for_a_concurrent_meal_write() -> None:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from core.config import settings
+    from infra.db.repositories.diary_repo import DiaryRepo
+    from infra.db.repositories.meal_repo import MealRepo
+    from infra.db.repositories.user_repo import UserRepo
+
+    async def run() -> None:
+        engine = create_async_engine(settings.database_url, poolclass=NullPool)
+        try:
+            at = datetime.now(timezone.utc).replace(microsecond=0)
+            day = at.date()
+            async with AsyncSession(engine) as setup:
+                user_id = await UserRepo(setup).get_or_create_by_telegram_id(random.randint(10**12, 10**13))
+                await setup.commit()
+
+            async with AsyncSession(engine) as writer, AsyncSession(engine) as reader:
+                # meal write + refresh, not committed yet: holds the user's snapshot lock
+                await MealRepo(writer).create_meal(
+                    user_id=user_id,
+                    at=at,
+                    meal_type="lunch",
+                    items=[{"name": "суп", "unit": "g", "amount": 300, "kcal": 150, "protein_g": 8, "fat_g": 5, "carb_g": 18}],
+                    autocommit=False,
+                )
+                await DiaryRepo(writer).refresh(user_id=user_id, days=[day], tz=TZ, autocommit=False)
+
+                # a GET / warm-up rebuild that starts now would read the day without the meal
+                racer = asyncio.create_task(DiaryRepo(reader).rebuild(user_id=user_id, day=day, tz=TZ))
+                await asyncio.sleep(0.3)
+                assert not racer.done()
+
+                await writer.commit()
+                data, _ = await asyncio.wait_for(racer, 5)
+                # it built after the commit, so the stored snapshot still has the meal
+                assert len(data["meals"]) == 1
+
+            async with AsyncSession(engine) as check:
+                stored, _ = await DiaryRepo(check).get(user_id=user_id, day=day)
+                assert len(stored["meals"]) == 1
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from datetime import date
+
+from conftest import needs_db
+
+
+TZ = "America/Los_Angeles"
+# 05:30 UTC on Mar 10 is 22:30 on Mar 9 in Los Angeles (and 06:30 on Mar 10 in Madrid)
+AT = "2026-03-10T05:30:00+00:00"
+LOCAL_DAY = date(2026, 3, 9)
+UTC_DAY = date(2026, 3, 10)
+
+
+def _item(kcal: float, item_id: int | None = None) -> dict:
+    item = {"name": "овсянка", "unit": "g", "amount": 100, "kcal": kcal, "protein_g": 10, "fat_g": 5, "carb_g": 60}
+    if item_id is not None:
+        item["id"] = item_id
+    return item
+
+
+def _summary_kcal(telegram_id: int) -> dict[date, float]:
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from core.config import settings
+
+    async def run() -> dict[date, float]:
+        engine = create_async_engine(settings.database_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as conn:
+                res = await conn.execute(
+                    text(
+                        "SELECT s.date, s.kcal FROM daily_summaries s JOIN users u ON u.id = s.user_id "
+                        "WHERE u.telegram_id = :tid AND s.date BETWEEN :a AND :b"
+                    ),
+                    {"tid": telegram_id, "a": LOCAL_DAY, "b": UTC_DAY},
+                )
+                return {d: float(k) for d, k in res.all()}
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+@needs_db
+def test_create_update_delete_book_the_same_local_day() -> None:
+    from fastapi.testclient import TestClient
+
+    from infra.api.app import create_app
+
+    telegram_id = random.randint(10**12, 10**13)
+    with TestClient(create_app()) as client:
+        r = client.post(f"/api/meals?telegram_id={telegram_id}&tz={TZ}", json={"at": AT, "items": [_item(300)], "status": "confirmed"})
+        meal_id = r.json()["data"]["id"]
+        assert _summary_kcal(telegram_id) == {LOCAL_DAY: 300.0}
+
+        item_id = client.get(f"/api/meals/{meal_id}?telegram_id={telegram_id}").json()["data"]["items"][0]["id"]
+        r = client.patch(f"/api/meals/{meal_id}?telegram_id={telegram_id}&tz={TZ}", json={"items": [_item(450, item_id)]})
+        assert r.json()["ok"]
+        # the delta lands on the row create_meal wrote, not on the UTC (or Madrid) day
+        assert _summary_kcal(telegram_id).get(LOCAL_DAY) == 450.0
+        assert not _summary_kcal(telegram_id).get(UTC_DAY)
+
+        r = client.delete(f"/api/meals/{meal_id}?telegram_id={telegram_id}&tz={TZ}")
+        assert r.json()["ok"]
+        assert _summary_kcal(telegram_id).get(LOCAL_DAY) == 0.0
+        assert not _summary_kcal(telegram_id).get(UTC_DAY)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+
+import domain.use_cases.normalize_text as nt
+from infra.cost_governor import FULL, REDUCED, Budget
+
+
+class _MemoryRedis:
+    """The handful of commands normalize_text uses, in memory (TTLs ignored)."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+
+    async def get(self, key):  # type: ignore[no-untyped-def]
+        return self.strings.get(key)
+
+    async def setex(self, key, ttl, value):  # type: ignore[no-untyped-def]
+        self.strings[key] = value
+
+    async def incr(self, key):  # type: ignore[no-untyped-def]
+        return 0
+
+    async def hmget(self, key, fields):  # type: ignore[no-untyped-def]
+        h = self.hashes.get(key, {})
+        return [h.get(f) for f in fields]
+
+    def pipeline(self):  # type: ignore[no-untyped-def]
+        return _MemoryPipeline(self)
+
+
+class _MemoryPipeline:
+    def __init__(self, r: _MemoryRedis) -> None:
+        self.r = r
+
+    async def __aenter__(self):  # type: ignore[no-untyped-def]
+        return self
+
+    async def __aexit__(self, *exc):  # type: ignore[no-untyped-def]
+        return None
+
+    def hset(self, key, mapping):  # type: ignore[no-untyped-def]
+        self.r.hashes.setdefault(key, {}).update(mapping)
+
+    def incr(self, key):  # type: ignore[no-untyped-def]
+        pass
+
+    def incrbyfloat(self, key, value):  # type: ignore[no-untyped-def]
+        pass
+
+    def expire(self, key, ttl):  # type: ignore[no-untyped-def]
+        pass
+
+    async def execute(self):  # type: ignore[no-untyped-def]
+        return []
+
+
+def test_identical_request_is_answered_from_the_learned_foods(monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    r = _MemoryRedis()
+    level = {"value": FULL}
+    llm_calls: list[str] = []
+
+    def fake_llm(text, *, locale, model, user_id):  # type: ignore[no-untyped-def]
+        llm_calls.append(text)
+        # the model renames both foods: its names never appear in the user's text
+        return {"items": [
+            {"name": "Гречка отварная", "category": "carbohydrate", "unit": "g", "amount": 200,
+             "kcal": 220, "protein_g": 8, "fat_g": 2, "carb_g": 42},
+            {"name": "Куриная грудка запечённая", "category": "protein", "unit": "g", "amount": 150,
+             "kcal": 240, "protein_g": 45, "fat_g": 5, "carb_g": 0},
+        ]}
+
+    async def fake_budget(user_id):  # type: ignore[no-untyped-def]
+        return Budget(level=level["value"], user_spend_usd=0.0, global_spend_usd=0.0)
+
+    async def fake_note_tier(feature, tier):  # type: ignore[no-untyped-def]
+        return None
+
+    monkeypatch.setattr(nt, "redis_client", r)
+    monkeypatch.setattr(nt, "redis_pipeline", r.pipeline)
+    monkeypatch.setattr(nt, "normalize_with_openai", fake_llm)
+    monkeypatch.setattr(nt, "budget_for", fake_budget)
+    monkeypatch.setattr(nt, "note_tier", fake_note_tier)
+    monkeypatch.setattr(nt.settings, "openai_model_normalize", "gpt-test")
+    monkeypatch.setattr(nt.settings, "openai_model_normalize_cheap", "gpt-test-mini")
+
+    text = "гречка 200 г, курица 150 г"
+    first = asyncio.run(nt.normalize_text_async(text, user_id=1))
+    assert first.tier == "llm"
+
+    # the exact-text answer has expired and the user is past the soft budget
+    r.strings.clear()
+    level["value"] = REDUCED
+    second = asyncio.run(nt.normalize_text_async(text, user_id=1))
+
+    assert llm_calls == [text]
+    assert second.tier == "cache_nearest"
+    assert [(i.name, i.amount, i.kcal) for i in second.items] == [("гречка", 200.0, 220.0), ("курица", 150.0, 240.0)]
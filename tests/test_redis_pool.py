@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from redis.asyncio.connection import Connection
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from infra.cache.redis import _pool
+
+
+class _OfflineConnection(Connection):
+    # pool bookkeeping only: no socket
+    async def connect(self) -> None:
+        return None
+
+    async def can_read_destructive(self) -> bool:
+        return False
+
+    async def disconnect(self, nowait: bool = False) -> None:
+        return None
+
+
+def test_exhausted_pool_waits_for_a_released_connection() -> None:
+    async def run() -> None:
+        pool = _pool(max_connections=1, timeout=2, connection_class=_OfflineConnection)
+        held = await pool.get_connection()
+        waiter = asyncio.create_task(pool.get_connection())
+        await asyncio.sleep(0.05)
+        # the plain pool would have raised "Too many connections" by now
+        assert not waiter.done()
+        await pool.release(held)
+        assert await asyncio.wait_for(waiter, 1) is held
+
+    asyncio.run(run())
+
+
+def test_exhausted_pool_gives_up_after_the_pool_timeout() -> None:
+    async def run() -> None:
+        pool = _pool(max_connections=1, timeout=0.1, connection_class=_OfflineConnection)
+        await pool.get_connection()
+        with pytest.raises(RedisConnectionError):
+            await pool.get_connection()
+
+    asyncio.run(run())
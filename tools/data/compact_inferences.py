@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+
+async def run(args: argparse.Namespace) -> dict[str, int]:
+    from infra.db.retention import compact_inferences
+    from infra.db.session import engine
+
+    try:
+        return await compact_inferences(
+            engine,
+            older_than_days=args.older_than_days,
+            batch_size=args.batch_size,
+            pause_ms=args.pause_ms,
+            max_batches=args.max_batches,
+            tables=tuple(args.table or ("vision_inferences", "llm_inferences")),
+        )
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compact old vision/llm inferences: archive raw rows to object storage, keep hot columns"
+    )
+    parser.add_argument("--older-than-days", type=int, default=None, help="Default: INFERENCE_RETENTION_DAYS")
+    parser.add_argument("--batch-size", type=int, default=None, help="Default: INFERENCE_COMPACT_BATCH")
+    parser.add_argument("--pause-ms", type=int, default=None, help="Default: INFERENCE_COMPACT_PAUSE_MS")
+    parser.add_argument("--max-batches", type=int, default=None, help="Default: INFERENCE_COMPACT_MAX_BATCHES")
+    parser.add_argument("--table", action="append", choices=("vision_inferences", "llm_inferences"))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    done = asyncio.run(run(args))
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{k}={v}" for k, v in done.items()) + f" in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, TextIO
+
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+
+async def _lines(fh: TextIO) -> AsyncIterator[str]:
+    for line in fh:
+        yield line
+
+
+async def run(path: Path, telegram_id: int, fmt: str, tz: str, skip_existing: bool, dry_run: bool) -> dict[str, int]:
+    from domain.meal_import import aparse_lines
+    from infra.db.repositories.meal_import_repo import MealImportRepo
+    from infra.db.repositories.user_repo import UserRepo
+    from infra.db.session import SessionLocal, engine
+
+    try:
+        async with SessionLocal() as session:
+            user_id = await UserRepo(session).get_or_create_by_telegram_id(telegram_id)
+            with path.open(encoding="utf-8", newline="") as fh:
+                stats = await MealImportRepo(session).import_rows(
+                    user_id=user_id,
+                    rows=aparse_lines(_lines(fh), fmt=fmt, tz=tz),  # type: ignore[arg-type]
+                    tz=tz,
+                    skip_existing=skip_existing,
+                    autocommit=False,
+                )
+            if dry_run:
+                await session.rollback()
+            else:
+                await session.commit()
+        return stats.as_dict()
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk-import meals from a meals_export.csv-shaped CSV or JSONL file (COPY + set-wise inserts)"
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--telegram-id", type=int, required=True, help="Owner of the imported meals")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default=None, help="Default: from the file extension")
+    parser.add_argument("--tz", default="Europe/Madrid", help="Time zone of the date/time columns")
+    parser.add_argument("--no-skip-existing", action="store_true", help="Import meals even if one exists at the same moment")
+    parser.add_argument("--dry-run", action="store_true", help="Run the whole import, then roll back")
+    args = parser.parse_args()
+
+    from domain.errors import InvalidInputError
+    from domain.meal_import import guess_format
+
+    fmt = args.format or guess_format(args.path.name)
+    started = time.perf_counter()
+    try:
+        stats = asyncio.run(run(args.path, args.telegram_id, fmt, args.tz, not args.no_skip_existing, args.dry_run))
+    except InvalidInputError as e:
+        raise SystemExit(f"{args.path}: {e}")
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{k}={v}" for k, v in stats.items())
+    print(f"{'[dry run] ' if args.dry_run else ''}{summary} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
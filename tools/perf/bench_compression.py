@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from infra.api.compression import CompressionMiddleware  # noqa: E402
+
+
+# name -> (downlink Mbit/s, RTT ms); roughly what the WebApp sees inside Telegram on the road
+NETWORKS: dict[str, tuple[float, float]] = {
+    "3g": (1.6, 300.0),
+    "4g-weak": (4.0, 150.0),
+    "4g": (12.0, 70.0),
+}
+# TCP: initial congestion window of 10 segments, doubling every round trip (slow start)
+_INIT_CWND = 10 * 1460
+
+
+def transfer_ms(nbytes: int, mbps: float, rtt_ms: float) -> float:
+    """Request RTT + slow-start round trips + serialization at ``mbps``, for a fresh connection."""
+    rounds, cwnd, sent = 0, _INIT_CWND, _INIT_CWND
+    while sent < nbytes:
+        cwnd *= 2
+        sent += cwnd
+        rounds += 1
+    return rtt_ms * (1 + rounds) + nbytes * 8 / (mbps * 1000)
+
+
+def _days(n: int) -> list[str]:
+    start = date.today() - timedelta(days=n - 1)
+    return [(start + timedelta(days=i)).isoformat() for i in range(n)]
+
+
+def _summaries(days: list[str], rnd: random.Random) -> list[dict]:
+    return [
+        {
+            "date": d,
+            "kcal": round(rnd.gauss(2100, 250), 1),
+            "protein_g": round(rnd.gauss(110, 20), 1),
+            "fat_g": round(rnd.gauss(70, 12), 1),
+            "carb_g": round(rnd.gauss(230, 40), 1),
+        }
+        for d in days
+    ]
+
+
+def _ma(vals: list[float], w: int) -> list[float]:
+    return [round(statistics.fmean(vals[max(0, i - w + 1): i + 1]), 1) for i in range(len(vals))]
+
+
+def monthly_payload(rnd: random.Random) -> dict:
+    """Shape of GET /api/summary/monthly for a user who logged every day."""
+    items = _summaries(_days(31), rnd)
+    kcal = [i["kcal"] for i in items]
+    classes = [{"date": i["date"], "class": rnd.choice(["within", "within", "undereating", "overeating"])} for i in items]
+    return {"ok": True, "data": {
+        "items": items,
+        "classes": classes,
+        "compliance": {"score": 61, "days_within": 19, "total_days": 31},
+        "streaks": {"longest": 6, "current": 2},
+        "trends": {"dates": [i["date"] for i in items], "kcal_ma7": _ma(kcal, 7), "kcal_ma30": _ma(kcal, 30)},
+    }, "error": None}
+
+
+def trends_payload(rnd: random.Random, window: int) -> dict:
+    """Shape of GET /api/trends?window=N with daily weigh-ins and weekly body-fat readings."""
+    days = _days(window)
+    items = _summaries(days, rnd)
+    weights = [{"date": d, "weight_kg": round(82 - i * 0.05 + rnd.gauss(0, 0.4), 2)} for i, d in enumerate(days)]
+    w = [x["weight_kg"] for x in weights]
+    return {"ok": True, "data": {
+        "items": items,
+        "kcal_ma7": _ma([i["kcal"] for i in items], 7),
+        "weights": weights,
+        "weights_filtered": weights,
+        "weight_ma7": _ma(w, 7),
+        "weight_median7": [round(statistics.median(w[max(0, i - 6): i + 1]), 2) for i in range(len(w))],
+        "weight_forecast_7d": 78.4,
+        "weight_forecast_ci95": [77.6, 79.2],
+        "bodyfat": [{"date": d, "percent": round(rnd.gauss(22, 0.5), 1)} for d in days[::7]],
+        "bodyfat_forecast_7d": 21.6,
+        "bodyfat_forecast_ci95": [20.9, 22.3],
+    }, "error": None}
+
+
+def meals_csv(rnd: random.Random, days: int) -> bytes:
+    """Shape of GET /api/meals/export.csv: ~12 items a day."""
+    foods = ["Овсянка", "Банан", "Куриная грудка", "Рис отварной", "Гречка", "Творог 5%", "Яблоко", "Салат овощной"]
+    lines = ["date,time,name,amount,unit,kcal,protein_g,fat_g,carb_g"]
+    for d in _days(days):
+        for h in sorted(rnd.sample(range(7, 23), 12)):
+            lines.append(f"{d},{h:02d}:{rnd.randrange(60):02d},{rnd.choice(foods)},{rnd.randrange(50, 350)},g,"
+                         f"{rnd.uniform(40, 600):.1f},{rnd.uniform(0, 40):.1f},{rnd.uniform(0, 25):.1f},{rnd.uniform(0, 80):.1f}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def _through(mw: CompressionMiddleware, body: bytes, media_type: str, coding: str) -> bytes:
+    async def app(scope, receive, send):  # type: ignore[no-untyped-def]
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", media_type.encode()), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    out: list[bytes] = []
+
+    async def send(message):  # type: ignore[no-untyped-def]
+        if message["type"] == "http.response.body":
+            out.append(message.get("body", b""))
+
+    async def receive():  # type: ignore[no-untyped-def]
+        return {"type": "http.request", "body": b""}
+
+    mw.app = app
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", coding.encode())]}
+    await mw(scope, receive, send)
+    return b"".join(out)
+
+
+async def bench(runs: int) -> None:
+    rnd = random.Random(42)
+    payloads = {
+        "summary/monthly": (json.dumps(monthly_payload(rnd)).encode(), "application/json"),
+        "trends?window=30": (json.dumps(trends_payload(rnd, 30)).encode(), "application/json"),
+        "trends?window=90": (json.dumps(trends_payload(rnd, 90)).encode(), "application/json"),
+        "meals/export.csv (90d)": (meals_csv(rnd, 90), "text/csv"),
+    }
+    mw = CompressionMiddleware(lambda *a: None)  # type: ignore[arg-type]
+    codings = ["identity", "gzip"] + (["br"] if mw._brotli is not None else [])
+    if "br" not in codings:
+        print("brotli is not installed: gzip only (pip install brotli)\n")
+    nets = " ".join(f"{n:>9}" for n in NETWORKS)
+    print(f"{'payload':24} {'coding':8} {'bytes':>8} {'ratio':>6} {'cpu ms':>7} {nets}  (transfer ms)")
+    for name, (body, media_type) in payloads.items():
+        for coding in codings:
+            wire = await _through(mw, body, media_type, coding)
+            samples = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                await _through(mw, body, media_type, coding)
+                samples.append((time.perf_counter() - t0) * 1000)
+            cpu = statistics.median(samples)
+            net = " ".join(f"{transfer_ms(len(wire), *NETWORKS[n]) + cpu:9.0f}" for n in NETWORKS)
+            print(f"{name:24} {coding:8} {len(wire):8d} {len(body) / len(wire):6.1f} {cpu:7.2f} {net}")
+        print()
+
+
+async def bench_live(base_url: str, telegram_id: int, runs: int) -> None:
+    import httpx
+
+    paths = [
+        f"/api/summary/monthly?telegram_id={telegram_id}",
+        f"/api/trends?telegram_id={telegram_id}&window=30",
+        f"/api/trends?telegram_id={telegram_id}&window=90",
+        f"/api/meals/export.csv?telegram_id={telegram_id}",
+    ]
+    print(f"{'path':52} {'coding':8} {'bytes':>8} {'p50 ms':>8}")
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for path in paths:
+            for coding in ("identity", "gzip", "br"):
+                wire, samples = 0, []
+                for _ in range(runs):
+                    t0 = time.perf_counter()
+                    async with client.stream("GET", path, headers={"Accept-Encoding": coding}) as r:
+                        # raw: bytes as they came over the wire, before httpx decodes them
+                        wire = sum([len(c) async for c in r.aiter_raw()])
+                    samples.append((time.perf_counter() - t0) * 1000)
+                print(f"{path:52} {coding:8} {wire:8d} {statistics.median(samples):8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Wire size and latency of typical monthly/trends/CSV responses with gzip and brotli"
+    )
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per payload and coding (median is shown)")
+    parser.add_argument("--url", help="Measure a running API instead, e.g. http://localhost:8000")
+    parser.add_argument("--telegram-id", type=int, default=0, help="User for --url")
+    args = parser.parse_args()
+    if args.url:
+        asyncio.run(bench_live(args.url, args.telegram_id, args.runs))
+    else:
+        asyncio.run(bench(args.runs))
+
+
+if __name__ == "__main__":
+    main()
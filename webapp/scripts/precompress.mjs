@@ -0,0 +1,35 @@
+// Writes .br and .gz siblings for compressible build output, served by infra/api/static.py
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'node:fs'
+import { join } from 'node:path'
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib'
+
+const dir = process.argv[2] || 'dist'
+const COMPRESSIBLE = /\.(html|js|mjs|css|json|svg|txt|map|webmanifest|xml|wasm)$/
+const MIN_BYTES = 512
+
+function* walk(d) {
+  for (const name of readdirSync(d)) {
+    const p = join(d, name)
+    if (statSync(p).isDirectory()) yield* walk(p)
+    else yield p
+  }
+}
+
+let count = 0
+for (const file of walk(dir)) {
+  if (!COMPRESSIBLE.test(file)) continue
+  const raw = readFileSync(file)
+  if (raw.length < MIN_BYTES) continue
+  const br = brotliCompressSync(raw, {
+    params: {
+      [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+      [constants.BROTLI_PARAM_SIZE_HINT]: raw.length,
+    },
+  })
+  const gz = gzipSync(raw, { level: 9 })
+  // a variant that does not beat the original is useless on the wire
+  if (br.length < raw.length) writeFileSync(`${file}.br`, br)
+  if (gz.length < raw.length) writeFileSync(`${file}.gz`, gz)
+  count++
+}
+console.log(`precompressed ${count} files in ${dir}`)
@@ -489,7 +489,7 @@ const CaloriesProteinWidget: React.FC<{ weekly?: { d: string; kcal: number; prot
 };
 
 interface Food { name: string; kcal: number; protein?: number; weight?: number; mealId?: number; itemId?: number; unit?: string; fat_g?: number; carb_g?: number; }
-type FavItem = { id: string; name: string; unit: string; amount: number; kcal: number; protein_g: number; fat_g: number; carb_g: number };
+type FavItem = { id: string; name: string; unit: string; amount: number; kcal: number; protein_g: number; fat_g: number; carb_g: number; use_count?: number };
 type DaySummary = { kcal: number; protein_g: number; fat_g: number; carb_g: number };
 
 const FoodListWidget: React.FC<{
@@ -1061,6 +1061,7 @@ export default function TelegramWebAppMainMockup() {
       carb_g: Number(tmpFoodCarb)||0,
     };
     const itemsForMeal = foodList.filter(x => x.mealId === edited.mealId).map(x => ({
+      id: x.itemId,
       name: x === edited ? updatedItem.name : x.name,
       unit: x.unit || 'g',
       amount: x === edited ? (updatedItem.weight||0) : (x.weight||0),
@@ -1069,7 +1070,7 @@ export default function TelegramWebAppMainMockup() {
       fat_g: x === edited ? (updatedItem.fat_g||0) : (x.fat_g||0),
       carb_g: x === edited ? (updatedItem.carb_g||0) : (x.carb_g||0),
     }));
-    await apiFetch(`/api/meals/${edited.mealId}?telegram_id=${tgId}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items: itemsForMeal }) });
+    await apiFetch(`/api/meals/${edited.mealId}?telegram_id=${tgId}&tz=${encodeURIComponent(tz)}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items: itemsForMeal }) });
     close();
     await fetchAll();
   };
@@ -1083,10 +1084,10 @@ export default function TelegramWebAppMainMockup() {
     if (!tgId) { close(); return; }
     const remaining = foodList.filter(x => x.mealId === del.mealId && x.itemId !== del.itemId);
     if (remaining.length === 0) {
-      await apiFetch(`/api/meals/${del.mealId}?telegram_id=${tgId}`, { method: 'DELETE' });
+      await apiFetch(`/api/meals/${del.mealId}?telegram_id=${tgId}&tz=${encodeURIComponent(tz)}`, { method: 'DELETE' });
     } else {
-      const items = remaining.map(x => ({ name: x.name, unit: x.unit || 'g', amount: x.weight||0, kcal: x.kcal||0, protein_g: x.protein||0, fat_g: x.fat_g||0, carb_g: x.carb_g||0 }));
-      await apiFetch(`/api/meals/${del.mealId}?telegram_id=${tgId}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items }) });
+      const items = remaining.map(x => ({ id: x.itemId, name: x.name, unit: x.unit || 'g', amount: x.weight||0, kcal: x.kcal||0, protein_g: x.protein||0, fat_g: x.fat_g||0, carb_g: x.carb_g||0 }));
+      await apiFetch(`/api/meals/${del.mealId}?telegram_id=${tgId}&tz=${encodeURIComponent(tz)}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items }) });
     }
     close();
     await fetchAll();
@@ -1209,10 +1210,11 @@ export default function TelegramWebAppMainMockup() {
           } catch {}
           setWfSeries(wf);
         // Meals for selected date
-        const r2 = await apiFetch(`/api/meals?telegram_id=${tgId}&date=${reqDate}&tz=${encodeURIComponent(tz)}&_=${Date.now()}`);
+        // day snapshot: one read; no cache-buster, the browser revalidates with If-None-Match
+        const r2 = await apiFetch(`/api/day?telegram_id=${tgId}&date=${reqDate}&tz=${encodeURIComponent(tz)}`);
         const b2 = await r2.json();
-        if (b2?.ok && Array.isArray(b2?.data?.items)) {
-          const meals = b2.data.items as any[];
+        if (b2?.ok && Array.isArray(b2?.data?.meals)) {
+          const meals = b2.data.meals as any[];
           const list: Food[] = [];
           meals.forEach((m: any) => {
             (m.items || []).forEach((it: any) => list.push({ name: it.name, kcal: Number(it.kcal||0), protein: Number(it.protein_g||0), weight: Number(it.amount||0), mealId: m.id, itemId: it.id, unit: it.unit || 'g', fat_g: Number(it.fat_g||0), carb_g: Number(it.carb_g||0) }));
@@ -1770,7 +1772,7 @@ export default function TelegramWebAppMainMockup() {
                   <div className="mono mr-1">{nf(f.kcal)}{'\u00A0'}ккал</div>
                   <div className="flex items-center gap-1">
                     <button className="tab" aria-label={`Добавить ${f.name} сегодня`} onClick={async()=>{
-                      try { const tgId = getTelegramId(); if (!tgId) return; const it = { name: f.name, unit: f.unit||'g', amount: Number(f.amount||0), kcal: Number(f.kcal||0), protein_g: Number(f.protein_g||0), fat_g: Number(f.fat_g||0), carb_g: Number(f.carb_g||0) }; await apiFetch(`/api/meals?telegram_id=${tgId}&tz=${encodeURIComponent(tz)}`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ at: new Date(new Date().getTime()-new Date().getTimezoneOffset()*60000).toISOString(), type: null, items: [it], notes: 'fav:add', status: 'confirmed', source_chat_id: null, source_message_id: null, source_update_id: null }) }); close(); setTimeout(()=>{ fetchAll(); }, 100); } catch {}
+                      try { const tgId = getTelegramId(); if (!tgId) return; const it = { name: f.name, unit: f.unit||'g', amount: Number(f.amount||0), kcal: Number(f.kcal||0), protein_g: Number(f.protein_g||0), fat_g: Number(f.fat_g||0), carb_g: Number(f.carb_g||0) }; await apiFetch(`/api/meals?telegram_id=${tgId}&tz=${encodeURIComponent(tz)}`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ at: new Date(new Date().getTime()-new Date().getTimezoneOffset()*60000).toISOString(), type: null, items: [it], notes: 'fav:add', status: 'confirmed', source_chat_id: null, source_message_id: null, source_update_id: null }) }); apiFetch(`/api/favorites/${encodeURIComponent(f.id)}/use?telegram_id=${tgId}`, { method: 'POST' }).catch(()=>{}); close(); setTimeout(()=>{ fetchAll(); }, 100); } catch {}
                     }}>+</button>
                     <button className="tab" aria-label={`Удалить ${f.name} из избранного`} onClick={async()=>{ await deleteFavorite(f.id); }}>🗑</button>
                   </div>